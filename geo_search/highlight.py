@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+検索結果の強調表示
+
+レイヤの選択（selectByIds）を使うと selectionChanged が QGIS 全体
+（属性テーブル・他のプラグイン）に通知され、レイヤの再描画も発生する。
+ResultHighlight は検索結果のジオメトリを1つにまとめ、1本の QgsRubberBand として
+キャンバス上に重ねて描く。ジオメトリは現在の縮尺の1ピクセル以下の許容値で
+単純化したもの（結果ダイアログの縮尺バケット別キャッシュ）を使うため、
+数万件の地物でも描画が軽い。
+QGIS に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+
+def layer_pixel_size(canvas, transform=None) -> float:
+    """キャンバスの1ピクセルがレイヤ CRS で何単位かを返す。
+
+    transform はレイヤ CRS → キャンバス CRS の変換（同じ CRS なら None）。
+    """
+    mupp = canvas.mapUnitsPerPixel()
+    if transform is None:
+        return mupp
+    try:
+        from qgis.core import QgsCoordinateTransform
+
+        try:
+            direction = QgsCoordinateTransform.ReverseTransform
+        except AttributeError:
+            from qgis.core import Qgis
+
+            direction = Qgis.TransformDirection.Reverse
+        rect = transform.transformBoundingBox(canvas.extent(), direction)
+        return rect.width() / max(1, canvas.width())
+    except Exception:
+        return 0.0
+
+
+def simplify_geometry(geom, tolerance: float):
+    """ジオメトリを GEOS で単純化する。点や単純化で消える小さな図形は元のまま返す"""
+    if tolerance <= 0:
+        return geom
+    try:
+        simplified = geom.simplify(tolerance)
+        if simplified is None or simplified.isEmpty():
+            return geom
+        return simplified
+    except Exception:
+        return geom
+
+
+class ResultHighlight(object):
+    """検索結果を1本の QgsRubberBand でまとめて強調表示する。
+
+    extent は最後に強調表示したジオメトリの範囲（レイヤ CRS）、
+    feature_count はその地物数、bucket は使った単純化の縮尺バケット。
+    ids は呼び出し側が縮尺変更時に作り直すために保持する地物ID。
+    """
+
+    FILL_ALPHA = 60
+    WIDTH = 2
+
+    def __init__(self, canvas=None):
+        self.canvas = canvas
+        self.extent = None
+        self.feature_count = 0
+        self.layer = None
+        self.bucket = None
+        self.ids = []
+        self._band = None
+        self._geometry_type = None
+
+    def show(self, layer, geometries: Iterable, canvas=None, bucket=None) -> bool:
+        """単純化済みのジオメトリ（レイヤ CRS）をまとめて強調表示する。表示できたら True
+
+        bucket は geometries を作った縮尺バケット（縮尺が変わったときの作り直し判定用）。
+        """
+        from qgis.core import QgsGeometry
+
+        canvas = canvas if canvas is not None else self.canvas
+        geometries = [g for g in geometries if g is not None]
+        if canvas is None or layer is None or not geometries:
+            self.clear()
+            return False
+        self.canvas = canvas
+        merged = QgsGeometry.collectGeometry(geometries)
+        band = self._band_for(canvas, layer.geometryType())
+        band.setToGeometry(merged, layer)
+        band.show()
+        self.extent = merged.boundingBox()
+        self.feature_count = len(geometries)
+        self.layer = layer
+        self.bucket = bucket
+        return True
+
+    def _band_for(self, canvas, geometry_type):
+        from qgis.gui import QgsRubberBand
+        from qgis.PyQt.QtGui import QColor
+
+        if self._band is not None and self._geometry_type == geometry_type:
+            self._band.reset(geometry_type)
+            return self._band
+        self.clear()
+        band = QgsRubberBand(canvas, geometry_type)
+        color = QColor(canvas.selectionColor())
+        color.setAlpha(255)
+        fill = QColor(color)
+        fill.setAlpha(self.FILL_ALPHA)
+        band.setStrokeColor(color)
+        band.setFillColor(fill)
+        band.setWidth(self.WIDTH)
+        try:
+            band.setIcon(QgsRubberBand.ICON_CIRCLE)
+            band.setIconSize(8)
+        except Exception:
+            pass
+        self._band = band
+        self._geometry_type = geometry_type
+        return band
+
+    def clear(self, *args) -> None:
+        # QDialog.finished などのシグナルから呼ばれるため引数は無視する
+        if self._band is not None:
+            try:
+                self._band.reset(self._geometry_type)
+                if self.canvas is not None:
+                    self.canvas.scene().removeItem(self._band)
+            except Exception:
+                pass
+            self._band = None
+            self._geometry_type = None
+        self.extent = None
+        self.feature_count = 0
+        self.layer = None
+        self.bucket = None
+        self.ids = []
+
+    def is_active(self) -> bool:
+        return self._band is not None
+
+
+__all__ = [
+    "ResultHighlight",
+    "layer_pixel_size",
+    "simplify_geometry",
+]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+レイヤツリーの索引
+
+LayerTreeIndex はレイヤID → レイヤツリーノード（と親グループの並び）の索引を持つ。
+ズームのたびに root.findLayer() や root.findLayers() でツリー全体を探す代わりに
+索引を引く。索引はレイヤツリーの addedChildren / willRemoveChildren シグナルで
+差分更新する。
+QGIS に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+_shared_index = None
+
+
+def _is_layer_node(node) -> bool:
+    from qgis.core import QgsLayerTree
+
+    try:
+        return QgsLayerTree.isLayer(node)
+    except Exception:
+        return hasattr(node, 'layerId')
+
+
+class LayerTreeIndex(object):
+    """レイヤID → レイヤツリーノードの索引"""
+
+    def __init__(self, root):
+        self.root = root
+        self._nodes: Dict[str, List] = {}
+        self._ancestors: Dict[int, List] = {}
+        self.rebuild()
+        root.addedChildren.connect(self._on_added)
+        root.willRemoveChildren.connect(self._on_will_remove)
+
+    def disconnect(self) -> None:
+        try:
+            self.root.addedChildren.disconnect(self._on_added)
+            self.root.willRemoveChildren.disconnect(self._on_will_remove)
+        except Exception:
+            pass
+
+    def rebuild(self) -> None:
+        self._nodes = {}
+        self._ancestors = {}
+        for node in self.root.findLayers():
+            self._add_node(node)
+
+    def _add_node(self, node) -> None:
+        try:
+            self._nodes.setdefault(node.layerId(), []).append(node)
+        except Exception:
+            pass
+
+    def _walk(self, node):
+        """node 以下のレイヤノードを返す"""
+        if _is_layer_node(node):
+            return [node]
+        try:
+            return list(node.findLayers())
+        except Exception:
+            return []
+
+    def _on_added(self, parent, index_from, index_to):
+        children = parent.children()
+        for child in children[index_from:index_to + 1]:
+            for node in self._walk(child):
+                self._add_node(node)
+        # グループの移動で親が変わることがあるため親の並びは作り直す
+        self._ancestors = {}
+
+    def _on_will_remove(self, parent, index_from, index_to):
+        children = parent.children()
+        removed = []
+        for child in children[index_from:index_to + 1]:
+            removed.extend(self._walk(child))
+        for node in removed:
+            try:
+                nodes = self._nodes.get(node.layerId())
+            except Exception:
+                continue
+            if not nodes:
+                continue
+            nodes[:] = [n for n in nodes if n is not node]
+            if not nodes:
+                del self._nodes[node.layerId()]
+        self._ancestors = {}
+
+    def nodes(self, layer_id) -> List:
+        """レイヤのノード（ツリー順）。同じレイヤが複数ノードにあれば全て返す"""
+        return list(self._nodes.get(layer_id) or [])
+
+    def node(self, layer_id):
+        """最初のノード（root.findLayer と同じ）"""
+        nodes = self._nodes.get(layer_id)
+        return nodes[0] if nodes else None
+
+    def ancestors(self, node) -> List:
+        """node から root の直下までの親グループ（近い順）"""
+        key = id(node)
+        chain = self._ancestors.get(key)
+        if chain is None:
+            chain = []
+            cur = node.parent()
+            while cur is not None and cur is not self.root:
+                chain.append(cur)
+                cur = cur.parent()
+            self._ancestors[key] = chain
+        return chain
+
+    def ensure_visible(self, layer_id) -> bool:
+        """レイヤのノードと親グループを表示にする。変更したら True
+
+        すでに表示されていれば何もしない（シグナルも発生しない）。
+        """
+        node = self.node(layer_id)
+        if node is None:
+            return False
+        chain = [node] + self.ancestors(node)
+        if all(n.itemVisibilityChecked() for n in chain):
+            return False
+        try:
+            # ノードと親をまとめて表示にする（QGIS 3.x）
+            node.setItemVisibilityCheckedParentRecursive(True)
+        except Exception:
+            for n in chain:
+                if not n.itemVisibilityChecked():
+                    n.setItemVisibilityChecked(True)
+        return True
+
+
+def shared_layer_tree_index(root=None) -> Optional[LayerTreeIndex]:
+    """プロジェクトのレイヤツリーの索引（プラグイン全体で1つ）を返す"""
+    global _shared_index
+    if root is None:
+        from qgis.core import QgsProject
+
+        root = QgsProject.instance().layerTreeRoot()
+    if _shared_index is None or _shared_index.root is not root:
+        release_shared_layer_tree_index()
+        _shared_index = LayerTreeIndex(root)
+    return _shared_index
+
+
+def release_shared_layer_tree_index() -> None:
+    """共有の索引を破棄する（プラグインのアンロード時）"""
+    global _shared_index
+    if _shared_index is not None:
+        _shared_index.disconnect()
+        _shared_index = None
+
+
+__all__ = [
+    "LayerTreeIndex",
+    "shared_layer_tree_index",
+    "release_shared_layer_tree_index",
+]
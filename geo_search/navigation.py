@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+検索結果へのナビゲーション（地図キャンバスの表示変更）
+
+このモジュールには以下を含む:
+- NavigationCompositor: 表示範囲・縮尺・回転をまとめて適用し、描画を1回にする
+- ImagePanAnimation: 直前に描画したキャンバス画像を平行移動させるパンアニメーション
+- NavigationScheduler: 連続した選択変更をまとめ、最後の選択にだけズームする
+- set_canvas_center: QGIS のバージョン差を吸収した中心移動
+
+キャンバスを freeze した状態で表示範囲・縮尺・回転を変更すると、
+各 API が内部で要求する refresh() は無視される。最後に freeze を解除して
+refresh() を1回だけ呼ぶことで、1回のナビゲーションにつき描画は1回になる。
+パンアニメーションは途中のフレームで地図を描画しない。キャンバスを freeze し、
+直前の描画結果の画像をオーバーレイ上でずらすだけなので、1フレームの処理時間は
+プロジェクトの重さ（WMS・陰影図など）に依存しない。描画は移動先の1回だけ。
+qgis.core に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+from qgis.PyQt.QtCore import QElapsedTimer, QPoint, QTimer
+from qgis.PyQt.QtGui import QPainter
+from qgis.PyQt.QtWidgets import QWidget
+
+
+def set_canvas_center(canvas, center) -> None:
+    """キャンバスの中心を移動する（縮尺は変えない）"""
+    if hasattr(canvas, 'setCenter'):
+        canvas.setCenter(center)
+        return
+    try:
+        canvas.centerAt(center)
+    except Exception:
+        canvas.centerAt(center.x(), center.y())
+
+
+def set_canvas_rotation(canvas, angle: float) -> None:
+    """キャンバスの回転角を設定する（QGIS の API 差を吸収）"""
+    if hasattr(canvas, 'setRotation'):
+        canvas.setRotation(angle)
+    elif hasattr(canvas, 'setMapRotation'):
+        canvas.setMapRotation(angle)
+    else:
+        setattr(canvas, 'rotation', angle)
+
+
+def set_canvas_scale(canvas, scale: float) -> None:
+    """キャンバスの縮尺を設定する（中心は変えない）"""
+    try:
+        canvas.zoomScale(float(scale))
+    except Exception:
+        canvas.zoomScale(int(scale))
+
+
+class NavigationCompositor(object):
+    """表示範囲・縮尺・回転を1回の描画で適用する。
+
+    render_count は実際に要求した描画回数、navigation_count は apply() で
+    適用したナビゲーションの回数。通常は両者が等しくなる（テスト・ログ用）。
+    """
+
+    def __init__(self, canvas=None):
+        self.canvas = canvas
+        self.render_count = 0
+        self.navigation_count = 0
+
+    def apply(self, view: Optional[Callable] = None, scale: Optional[float] = None,
+              rotation: Optional[float] = None, canvas=None) -> bool:
+        """view(canvas) で表示範囲を変更し、縮尺・回転を適用してから1回だけ描画する。
+
+        view の例外は freeze を解除したうえで呼び出し元に送る。
+        キャンバスがもともと freeze されていた場合は描画しない。
+        """
+        canvas = canvas if canvas is not None else self.canvas
+        if canvas is None:
+            return False
+        try:
+            was_frozen = bool(canvas.isFrozen())
+        except Exception:
+            was_frozen = False
+        canvas.freeze(True)
+        try:
+            if view is not None:
+                view(canvas)
+            if scale is not None:
+                set_canvas_scale(canvas, scale)
+            if rotation is not None:
+                set_canvas_rotation(canvas, rotation)
+        finally:
+            canvas.freeze(was_frozen)
+        self.navigation_count += 1
+        if not was_frozen:
+            canvas.refresh()
+            self.render_count += 1
+        return True
+
+    def reset_counts(self) -> None:
+        self.render_count = 0
+        self.navigation_count = 0
+
+
+class _PanOverlay(QWidget):
+    """キャンバスのビューポートを覆い、保存した画像を offset だけずらして描く"""
+
+    def __init__(self, parent, pixmap, background):
+        QWidget.__init__(self, parent)
+        self._pixmap = pixmap
+        self._background = background
+        self.offset = QPoint(0, 0)
+        self.setGeometry(parent.rect())
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self._background)
+        painter.drawPixmap(self.offset, self._pixmap)
+        painter.end()
+
+
+class ImagePanAnimation(object):
+    """キャンバスの画像を平行移動させて center へのパンを表現する。
+
+    アニメーション中はキャンバスを freeze して描画させない。終了時に
+    on_finished(canvas) を呼び、移動先の描画（1回）が終わったらオーバーレイを外す。
+    cancel() で途中終了した場合は on_finished を呼ばない。
+    """
+
+    FRAME_MS = 16
+
+    def __init__(self, canvas, center, duration_ms: int = 800, on_finished: Optional[Callable] = None):
+        self.canvas = canvas
+        self.center = center
+        self.duration_ms = max(int(duration_ms), 1)
+        self.on_finished = on_finished
+        self.frame_count = 0
+        self._overlay = None
+        self._timer = None
+        self._clock = QElapsedTimer()
+        self._delta = (0, 0)
+        self._was_frozen = False
+
+    def is_running(self) -> bool:
+        return self._timer is not None
+
+    def start(self) -> bool:
+        """アニメーションを開始する。画像を取得できなければ False"""
+        canvas = self.canvas
+        viewport = canvas.viewport()
+        try:
+            # 移動先の中心がビューポート中心に来るまでの画面上のずれ（回転も考慮される）
+            pixel = canvas.getCoordinateTransform().transform(self.center)
+            rect = viewport.rect()
+            self._delta = (rect.width() / 2.0 - pixel.x(), rect.height() / 2.0 - pixel.y())
+            pixmap = viewport.grab()
+        except Exception:
+            return False
+        if pixmap is None or pixmap.isNull():
+            return False
+        self._overlay = _PanOverlay(viewport, pixmap, canvas.canvasColor())
+        self._overlay.show()
+        try:
+            self._was_frozen = bool(canvas.isFrozen())
+        except Exception:
+            self._was_frozen = False
+        canvas.freeze(True)
+        self._timer = QTimer()
+        self._timer.setInterval(self.FRAME_MS)
+        self._timer.timeout.connect(self._tick)
+        self._clock.start()
+        self._timer.start()
+        return True
+
+    def _tick(self):
+        t = min(1.0, self._clock.elapsed() / float(self.duration_ms))
+        # smoothstep で加減速
+        eased = t * t * (3.0 - 2.0 * t)
+        self._overlay.offset = QPoint(int(round(self._delta[0] * eased)), int(round(self._delta[1] * eased)))
+        self._overlay.update()
+        self.frame_count += 1
+        if t >= 1.0:
+            self._finish()
+
+    def _stop(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self.canvas.freeze(self._was_frozen)
+
+    def _finish(self):
+        self._stop()
+        if self.on_finished is None:
+            self._remove_overlay()
+            return
+        # 移動先の描画が終わるまでオーバーレイを残してちらつきを防ぐ
+        try:
+            self.canvas.mapCanvasRefreshed.connect(self._remove_overlay)
+        except Exception:
+            pass
+        try:
+            self.on_finished(self.canvas)
+        finally:
+            QTimer.singleShot(5000, self._remove_overlay)
+
+    def cancel(self) -> None:
+        """途中で止める（移動先への描画はしない）"""
+        if self._timer is None:
+            return
+        self._stop()
+        self._remove_overlay()
+
+    def _remove_overlay(self, *args):
+        try:
+            self.canvas.mapCanvasRefreshed.disconnect(self._remove_overlay)
+        except Exception:
+            pass
+        if self._overlay is not None:
+            self._overlay.hide()
+            self._overlay.deleteLater()
+            self._overlay = None
+
+
+class NavigationScheduler(object):
+    """選択変更が続く間はナビゲーションを待ち、最後の要求だけを実行する。
+
+    request() のたびにアイドルタイマーを再始動し、idle_ms の間新しい要求が
+    なければ callback(*args) を呼ぶ。置き換えられた要求は捨てる（superseded）。
+    新しい要求が来た時点で、実行中のナビゲーション（on_cancel）は中止する。
+    """
+
+    def __init__(self, callback: Callable, idle_ms: int = 120, on_cancel: Optional[Callable] = None):
+        self.callback = callback
+        self.on_cancel = on_cancel
+        self.idle_ms = max(int(idle_ms), 0)
+        self.requested = 0
+        self.executed = 0
+        self.superseded = 0
+        self._pending = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def request(self, *args) -> None:
+        self.requested += 1
+        if self._pending is not None:
+            self.superseded += 1
+        self._pending = args
+        if self.on_cancel is not None:
+            try:
+                self.on_cancel()
+            except Exception:
+                pass
+        self._timer.start(self.idle_ms)
+
+    def flush(self) -> None:
+        """待っている要求があればすぐに実行する"""
+        self._timer.stop()
+        args, self._pending = self._pending, None
+        if args is None:
+            return
+        self.executed += 1
+        self.callback(*args)
+
+    def cancel(self) -> None:
+        """待っている要求を捨てる"""
+        self._timer.stop()
+        self._pending = None
+
+    def is_pending(self) -> bool:
+        return self._pending is not None
+
+
+__all__ = [
+    "NavigationCompositor",
+    "ImagePanAnimation",
+    "NavigationScheduler",
+    "set_canvas_center",
+    "set_canvas_rotation",
+    "set_canvas_scale",
+]
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+検索結果の概観表示（グリッドクラスタ）
+
+大量の検索結果（全レイヤ検索で数万件など）を全体表示すると、地図が読めず描画も重い。
+ClusterOverview は結果の中心点（キャンバス CRS）を画面上の一定サイズの格子で集計し、
+格子ごとに件数付きの記号を1つだけ描く。記号をクリックするとその格子の結果にズームする。
+ズームすると格子が細かくなり、クラスタは分かれていく。
+
+集計は numpy があればベクトル演算、なければ辞書による1パスで行う
+（10 万点でどちらも 100 ms 未満）。
+ベンチマーク: ``python -m geo_search.overview`` （QGIS 不要）。
+qgis.core / qgis.gui に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+import math
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# (中心 x, 中心 y, 件数, 格子キー)
+Cluster = Tuple[float, float, int, Tuple[int, int]]
+
+CLUSTER_CELL_PX = 64
+
+
+def _grid_cluster_numpy(np, xs, ys, cell_size: float) -> List[Cluster]:
+    x = np.asarray(xs, dtype=float)
+    y = np.asarray(ys, dtype=float)
+    ix = np.floor(x / cell_size).astype(np.int64)
+    iy = np.floor(y / cell_size).astype(np.int64)
+    cells, inverse, counts = np.unique(np.stack((ix, iy), axis=1), axis=0,
+                                       return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    sx = np.bincount(inverse, weights=x, minlength=len(cells))
+    sy = np.bincount(inverse, weights=y, minlength=len(cells))
+    return [(float(a / c), float(b / c), int(c), (int(k[0]), int(k[1])))
+            for a, b, c, k in zip(sx, sy, counts, cells)]
+
+
+def _grid_cluster_python(xs, ys, cell_size: float) -> List[Cluster]:
+    inv = 1.0 / cell_size
+    cells = {}
+    get = cells.get
+    for x, y in zip(xs, ys):
+        key = ((x * inv) // 1, (y * inv) // 1)
+        c = get(key)
+        if c is None:
+            cells[key] = [1, x, y]
+        else:
+            c[0] += 1
+            c[1] += x
+            c[2] += y
+    return [(sx / n, sy / n, n, (int(k[0]), int(k[1]))) for k, (n, sx, sy) in cells.items()]
+
+
+def grid_cluster(xs: Sequence[float], ys: Sequence[float], cell_size: float,
+                 use_numpy: Optional[bool] = None) -> List[Cluster]:
+    """点を cell_size の格子で集計し、格子ごとの (重心 x, 重心 y, 件数, 格子キー) を返す"""
+    if not xs or cell_size <= 0:
+        return []
+    if use_numpy is not False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:
+            return _grid_cluster_numpy(np, xs, ys, cell_size)
+    return _grid_cluster_python(xs, ys, cell_size)
+
+
+def cell_members_extent(xs, ys, cell_size: float, key) -> Optional[Tuple[float, float, float, float]]:
+    """格子 key に入る点の範囲 (xmin, ymin, xmax, ymax) を返す"""
+    inv = 1.0 / cell_size
+    kx, ky = key
+    members = [(x, y) for x, y in zip(xs, ys)
+               if math.floor(x * inv) == kx and math.floor(y * inv) == ky]
+    if not members:
+        return None
+    mx = [p[0] for p in members]
+    my = [p[1] for p in members]
+    return (min(mx), min(my), max(mx), max(my))
+
+
+def _cluster_item_class():
+    """QgsMapCanvasItem のサブクラスを返す（qgis.gui は使うときに import する）"""
+    from qgis.core import QgsPointXY
+    from qgis.gui import QgsMapCanvasItem
+    from qgis.PyQt.QtCore import QPointF, QRectF, Qt
+    from qgis.PyQt.QtGui import QBrush, QColor, QPainter, QPen
+
+    class ClusterCanvasItem(QgsMapCanvasItem):
+        """クラスタの記号（円と件数）をまとめて描くキャンバスアイテム"""
+
+        def __init__(self, canvas):
+            QgsMapCanvasItem.__init__(self, canvas)
+            self.clusters = []
+            self.color = QColor(canvas.selectionColor())
+            self.color.setAlpha(200)
+            self.setZValue(1000)
+
+        def set_clusters(self, clusters, extent):
+            self.clusters = clusters
+            self.setRect(extent)
+            self.update()
+
+        def radius(self, count):
+            return 8.0 + 4.0 * math.log10(max(1, count))
+
+        def paint(self, painter, option=None, widget=None):
+            painter.setRenderHint(QPainter.Antialiasing, True)
+            painter.setPen(QPen(QColor(255, 255, 255), 1.5))
+            painter.setBrush(QBrush(self.color))
+            # toCanvasCoordinates はシーン座標なので、アイテムの位置（rect の左上）を引いて描く
+            origin = self.pos()
+            for cx, cy, count, _ in self.clusters:
+                pt = self.toCanvasCoordinates(QgsPointXY(cx, cy)) - origin
+                r = self.radius(count)
+                painter.drawEllipse(QPointF(pt.x(), pt.y()), r, r)
+                painter.drawText(QRectF(pt.x() - r, pt.y() - r, 2 * r, 2 * r), Qt.AlignCenter, str(count))
+
+    return ClusterCanvasItem
+
+
+class ClusterOverview(object):
+    """検索結果のクラスタ表示とクリックによるズームを管理する。
+
+    表示中はキャンバスの表示範囲が変わると集計し直す（連続した変更は IdleCoalescer で
+    まとめて1回。last_ms に所要時間）。マップツールとキャンバスアイテムは一度だけ作って使い回し、
+    dispose() で破棄する。
+    on_zoom(QgsRectangle) はクリックしたクラスタの範囲（キャンバス CRS）で呼ばれる。
+    on_closed() は別のマップツールに切り替えられて表示を終えたときに呼ばれる。
+    """
+
+    RECLUSTER_DELAY_MS = 50
+
+    def __init__(self, canvas, on_zoom: Callable, on_closed: Optional[Callable] = None,
+                 cell_px: int = CLUSTER_CELL_PX):
+        self.canvas = canvas
+        self.on_zoom = on_zoom
+        self.on_closed = on_closed
+        self.cell_px = cell_px
+        self.clusters: List[Cluster] = []
+        self.last_ms = 0.0
+        self._xs = []
+        self._ys = []
+        self._cell_size = 0.0
+        self._item = None
+        self._tool = None
+        self._previous_tool = None
+        self._scheduler = None
+        self._active = False
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def _ensure_objects(self) -> None:
+        from qgis.gui import QgsMapToolEmitPoint
+        from .utils import IdleCoalescer
+
+        if self._item is None:
+            self._item = _cluster_item_class()(self.canvas)
+        if self._tool is None:
+            self._tool = QgsMapToolEmitPoint(self.canvas)
+            self._tool.canvasClicked.connect(self._on_clicked)
+            self._tool.deactivated.connect(self._on_tool_deactivated)
+        if self._scheduler is None:
+            self._scheduler = IdleCoalescer(self.recluster, self.RECLUSTER_DELAY_MS)
+
+    def show(self, xs, ys) -> None:
+        self._ensure_objects()
+        self._xs = list(xs)
+        self._ys = list(ys)
+        if not self._active:
+            self._active = True
+            self.canvas.extentsChanged.connect(self._scheduler.request)
+            current = self.canvas.mapTool()
+            if current is not self._tool:
+                self._previous_tool = current
+                self.canvas.setMapTool(self._tool)
+        self._item.show()
+        self.recluster()
+
+    def recluster(self) -> None:
+        import time
+
+        if not self._active or self._item is None:
+            return
+        self._cell_size = self.cell_px * self.canvas.mapUnitsPerPixel()
+        t0 = time.perf_counter()
+        self.clusters = grid_cluster(self._xs, self._ys, self._cell_size)
+        self.last_ms = (time.perf_counter() - t0) * 1000.0
+        self._item.set_clusters(self.clusters, self.canvas.extent())
+
+    def _on_clicked(self, point, button=None):
+        if not self.clusters or not self._active:
+            return
+        # クリック位置から記号の半径内で最も近いクラスタ
+        px = self.canvas.getCoordinateTransform().transform(point)
+        best = None
+        best_d = None
+        for cluster in self.clusters:
+            from qgis.core import QgsPointXY
+
+            cp = self._item.toCanvasCoordinates(QgsPointXY(cluster[0], cluster[1]))
+            d = math.hypot(cp.x() - px.x(), cp.y() - px.y())
+            if d <= self._item.radius(cluster[2]) and (best_d is None or d < best_d):
+                best, best_d = cluster, d
+        if best is None:
+            return
+        box = cell_members_extent(self._xs, self._ys, self._cell_size, best[3])
+        if box is None:
+            return
+        from qgis.core import QgsRectangle
+
+        self.on_zoom(QgsRectangle(*box))
+
+    def _on_tool_deactivated(self):
+        # 利用者が別のマップツールを選んだら概観表示を終える。
+        # キャンバスは setMapTool の途中なので、ここではマップツールを切り替えない
+        if not self._active:
+            return
+        self._previous_tool = None
+        self._hide()
+        if self.on_closed is not None:
+            self.on_closed()
+
+    def _hide(self) -> None:
+        """表示を隠してシグナルを切る（マップツールとアイテムは残す）"""
+        self._active = False
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            try:
+                self.canvas.extentsChanged.disconnect(self._scheduler.request)
+            except Exception:
+                pass
+        if self._item is not None:
+            self._item.set_clusters([], self.canvas.extent())
+            self._item.hide()
+        self.clusters = []
+        self._xs = []
+        self._ys = []
+
+    def clear(self, *args) -> None:
+        """表示を終え、概観表示の前のマップツールに戻す"""
+        if not self._active:
+            return
+        self._hide()
+        tool = self._tool
+        if tool is not None and self.canvas.mapTool() is tool:
+            if self._previous_tool is not None:
+                self.canvas.setMapTool(self._previous_tool)
+            else:
+                self.canvas.unsetMapTool(tool)
+        self._previous_tool = None
+
+    def dispose(self) -> None:
+        """表示を終え、マップツールとキャンバスアイテムを破棄する"""
+        self.clear()
+        item, self._item = self._item, None
+        if item is not None:
+            try:
+                self.canvas.scene().removeItem(item)
+            except Exception:
+                pass
+        tool, self._tool = self._tool, None
+        if tool is not None:
+            try:
+                tool.canvasClicked.disconnect(self._on_clicked)
+                tool.deactivated.disconnect(self._on_tool_deactivated)
+            except Exception:
+                pass
+            tool.deleteLater()
+
+
+def benchmark_grid_cluster(n: int = 100000, cells: int = 40) -> dict:
+    """grid_cluster のベンチマーク（ミリ秒）。n 点を cells x cells 程度の格子で集計する"""
+    import random
+    import time
+
+    xs = [random.uniform(0, 50000) for _ in range(n)]
+    ys = [random.uniform(-30000, 20000) for _ in range(n)]
+    cell = 50000.0 / cells
+    result = {}
+    modes = [("python", False)]
+    try:
+        import numpy  # noqa: F401
+        modes.append(("numpy", True))
+    except ImportError:
+        pass
+    for name, use_numpy in modes:
+        t0 = time.perf_counter()
+        clusters = grid_cluster(xs, ys, cell, use_numpy=use_numpy)
+        result[name] = (time.perf_counter() - t0) * 1000.0
+        assert sum(c[2] for c in clusters) == n
+    return result
+
+
+__all__ = [
+    "grid_cluster",
+    "cell_members_extent",
+    "ClusterOverview",
+    "benchmark_grid_cluster",
+]
+
+
+if __name__ == "__main__":
+    for name, ms in benchmark_grid_cluster().items():
+        print(f"{name:>8}: {ms:8.1f} ms")
@@ -25,7 +25,10 @@ from .searchfeature import (
     SearchOwnerFeature,
 )
 from .searchdialog import SearchDialog
-from .theme import apply_theme
+from .theme import ThemeBatch, apply_theme, theme_fingerprint
+from .themeregistry import shared_theme_registry
+from .themerender import ThemeRenderCache, ThemeThumbnailer, prerender_enabled, thumbnails_enabled
+from .utils import IdleCoalescer
 
 # TODO: Fieldの確認
 # TODO: 表示テーブルの順番変更
@@ -55,6 +58,9 @@ class plugin(object):
         self._last_missing_combobox_warning = 0.0
         # diagnostic call counter for update_theme_combobox
         self._theme_update_call_count = 0
+        # テーマコレクションのシグナルが続けて届いてもコンボボックスの作り直しは
+        # イベントループが空いたときに1回だけ行う（theme_update_scheduler.executed が回数）
+        self.theme_update_scheduler = IdleCoalescer(self.update_theme_combobox)
         self._init_language()
         self.current_feature = None
         self._current_group_widget = None
@@ -127,6 +133,11 @@ class plugin(object):
         self.action.setObjectName("地図検索")
         self.iface.addToolBarIcon(self.action)
         self.iface.addPluginToMenu("地図検索", self.action)
+        # 保存した検索結果を検索せずに開く（メニューのみ）
+        self.open_results_action = QAction("保存した検索結果を開く...", self.iface.mainWindow())
+        self.open_results_action.setObjectName("保存した検索結果を開く")
+        self.open_results_action.triggered.connect(self.open_saved_results)
+        self.iface.addPluginToMenu("地図検索", self.open_results_action)
         # 追加表示切替アクション（検索アイコンの直後に置く）
         # reload 時に重複して追加されないよう既存チェックを行う
         try:
@@ -192,6 +203,12 @@ class plugin(object):
         self.theme_combobox = QComboBox()
         self.theme_combobox.setToolTip("レイヤの表示/非表示を設定するマップテーマを選択（「テーマ選択」で基本表示に戻す）")
         self.theme_combobox.setMinimumWidth(180)
+        # テーマの縮図（有効な場合）はドロップダウンの一覧でだけ大きく表示する
+        try:
+            from qgis.PyQt.QtCore import QSize
+            self.theme_combobox.view().setIconSize(QSize(64, 64))
+        except Exception:
+            pass
 
         # テーマ選択の右側に設定アイコンを表示するためのコンテナウィジェットを作成
         try:
@@ -312,6 +329,11 @@ class plugin(object):
             # テーマコレクションの変更を検知（重要：テーマが追加/削除された時に自動更新）
             project = QgsProject.instance()
             theme_collection = project.mapThemeCollection()
+            # テーマ登録簿を先に接続しておき、下のハンドラより先に無効化されるようにする
+            try:
+                shared_theme_registry(theme_collection)
+            except Exception:
+                pass
             # Connect theme collection signals only once to avoid duplicate handlers
             try:
                 if not getattr(self, '_theme_signals_connected', False):
@@ -352,6 +374,25 @@ class plugin(object):
             except:
                 pass
 
+        # 最近使ったテーマの事前描画（QSettings で有効にした場合のみ）
+        self.theme_render_cache = None
+        try:
+            if prerender_enabled():
+                self.theme_render_cache = ThemeRenderCache(self.iface.mapCanvas())
+                self.theme_render_cache.start()
+        except Exception:
+            self.theme_render_cache = None
+
+        # テーマの縮図（QSettings で有効にした場合のみ）。描画はタスクマネージャで行う
+        self.theme_thumbnailer = None
+        try:
+            if thumbnails_enabled():
+                self.theme_thumbnailer = ThemeThumbnailer(self.iface.mapCanvas(), on_ready=self._on_theme_thumbnail_ready)
+                self.theme_thumbnailer.start()
+                self._request_theme_thumbnails()
+        except Exception:
+            self.theme_thumbnailer = None
+
         # GUI is now ready for warnings/updates
         try:
             self._gui_ready = True
@@ -477,6 +518,7 @@ class plugin(object):
                     self.theme_combobox.blockSignals(False)
                 except Exception:
                     pass
+            self._request_theme_thumbnails()
         except Exception:
             try:
                 from qgis.core import QgsMessageLog
@@ -484,6 +526,31 @@ class plugin(object):
             except Exception:
                 pass
 
+    def _request_theme_thumbnails(self):
+        """コンボボックスに並んでいるテーマの縮図を要求する（できたものから _on_theme_thumbnail_ready）"""
+        thumbnailer = getattr(self, 'theme_thumbnailer', None)
+        combo = getattr(self, 'theme_combobox', None)
+        if thumbnailer is None or combo is None:
+            return
+        try:
+            names = [combo.itemText(i) for i in range(1, combo.count())]
+            thumbnailer.request(names)
+        except Exception:
+            pass
+
+    def _on_theme_thumbnail_ready(self, theme_name, path):
+        """縮図ができたテーマのコンボボックスの項目にアイコンを付ける"""
+        combo = getattr(self, 'theme_combobox', None)
+        if combo is None:
+            return
+        try:
+            index = combo.findText(theme_name)
+            if index > 0:
+                from qgis.PyQt.QtGui import QIcon
+                combo.setItemIcon(index, QIcon(path))
+        except Exception:
+            pass
+
     def update_theme_combobox(self):
         """マップテーマのコンボボックスを更新する"""
         try:
@@ -510,33 +577,10 @@ class plugin(object):
                 except Exception:
                     pass
                 return
-            from qgis.core import QgsProject, QgsMessageLog
-            project = QgsProject.instance()
-            theme_collection = project.mapThemeCollection()
-            try:
-                raw_themes = theme_collection.mapThemes()
-            except Exception:
-                raw_themes = []
-
-            # normalize to list of names (mapThemes may return strings or theme objects)
-            themes = []
-            for t in (raw_themes or []):
-                try:
-                    if isinstance(t, str):
-                        themes.append(t)
-                    else:
-                        if hasattr(t, 'name') and callable(getattr(t, 'name')):
-                            themes.append(t.name())
-                        elif hasattr(t, 'name'):
-                            themes.append(getattr(t, 'name'))
-                        elif hasattr(t, 'displayName') and callable(getattr(t, 'displayName')):
-                            themes.append(t.displayName())
-                        elif hasattr(t, 'displayName'):
-                            themes.append(getattr(t, 'displayName'))
-                        else:
-                            themes.append(str(t))
-                except Exception:
-                    continue
+            from qgis.core import QgsMessageLog
+            # 正規化済みのテーマ名とグループ分けは登録簿から読む
+            registry = shared_theme_registry()
+            themes = registry.names()
             # safety: theme_combobox may not exist (initGui not yet run or unloaded)
             if not hasattr(self, 'theme_combobox') or self.theme_combobox is None:
                 # During startup/unload the combobox may legitimately be absent.
@@ -585,9 +629,7 @@ class plugin(object):
 
             # マップテーマをグループ化して管理（グループ名は括弧で囲まれた部分を抽出）
             try:
-                from .theme import group_themes
-
-                grouped = group_themes(themes)
+                grouped = registry.groups()
                 # 保存
                 self._theme_groups = grouped
 
@@ -648,6 +690,7 @@ class plugin(object):
             QgsMessageLog.logMessage(f"テーマリスト更新: {', '.join(themes)}", "GEO-search-plugin", 0)
                 
             self.theme_combobox.blockSignals(False)
+            self._request_theme_thumbnails()
         except Exception as e:
             try:
                 from qgis.core import QgsMessageLog
@@ -726,26 +769,36 @@ class plugin(object):
             except Exception:
                 pass
 
-            # apply theme: if additive mode is requested use centralized helper
-            # which implements the union logic; otherwise perform a simple
-            # theme switch using the theme collection API (equivalent to
-            # changing the theme selection in the UI).
+            # apply theme through the centralized helper: additive mode implements
+            # the union logic, the normal mode applies only the differences from
+            # the current view; both render the canvas once (ThemeBatch).
+            render_cache = getattr(self, 'theme_render_cache', None)
+            refreshes_before = ThemeBatch.total_refreshes
             try:
-                if bool(getattr(self, '_theme_additive_mode', False)):
-                    from .theme import apply_theme
-                    apply_theme(theme_collection, theme_name, root, model, additive=True)
-                else:
+                additive = bool(getattr(self, '_theme_additive_mode', False))
+                # 事前描画した画像があれば、本来の描画が終わるまでそれを重ねて見せる
+                # （加算表示は結果がテーマ単体と異なるため使わない）
+                if render_cache is not None and not additive:
                     try:
-                        # prefer applyTheme with root+model when available
-                        try:
-                            theme_collection.applyTheme(theme_name, root, model)
-                        except Exception:
-                            theme_collection.applyTheme(theme_name)
+                        render_cache.show_cached(theme_name)
                     except Exception:
-                        # fallback to centralized helper if direct call fails
-                        from .theme import apply_theme
-                        apply_theme(theme_collection, theme_name, root, model, additive=False)
+                        pass
+                try:
+                    apply_theme(theme_collection, theme_name, root, model, additive=additive)
+                except Exception:
+                    if additive:
+                        raise
+                    # fallback to the theme collection API (equivalent to the UI selection)
+                    theme_collection.applyTheme(theme_name)
             finally:
+                if render_cache is not None:
+                    try:
+                        render_cache.note_used(theme_name)
+                        # 表示が変わらず描画されなかった場合は重ねた画像をすぐ外す
+                        if ThemeBatch.total_refreshes == refreshes_before:
+                            render_cache.hide()
+                    except Exception:
+                        pass
                 # フラグを解除
                 try:
                     self._suppress_theme_update = False
@@ -859,7 +912,7 @@ class plugin(object):
         except Exception:
             pass
         try:
-            self.update_theme_combobox()
+            self._request_theme_update()
         except Exception:
             try:
                 from qgis.core import QgsMessageLog
@@ -867,6 +920,13 @@ class plugin(object):
             except Exception:
                 pass
 
+    def _request_theme_update(self):
+        """コンボボックスの作り直しを予約する（連続したシグナルは1回にまとめる）"""
+        # apply_selected_theme 実行中のシグナルは従来どおり無視する
+        if getattr(self, '_suppress_theme_update', False):
+            return
+        self.theme_update_scheduler.request()
+
     def _on_theme_collection_changed(self, *args, **kwargs):
         """Wrapper for legacy theme collection 'changed' signal."""
         try:
@@ -875,7 +935,7 @@ class plugin(object):
         except Exception:
             pass
         try:
-            self.update_theme_combobox()
+            self._request_theme_update()
         except Exception:
             try:
                 from qgis.core import QgsMessageLog
@@ -890,6 +950,43 @@ class plugin(object):
             self._gui_ready = False
         except Exception:
             pass
+        # release the shared layer-tree index (it is connected to the layer tree root)
+        try:
+            from .layertree import release_shared_layer_tree_index
+            release_shared_layer_tree_index()
+        except Exception:
+            pass
+        # release the theme registry (it is connected to the theme collection)
+        try:
+            from .themeregistry import release_shared_theme_registry
+            release_shared_theme_registry()
+        except Exception:
+            pass
+        # release the legend-state cache (it is connected to layer signals)
+        try:
+            from .theme import release_legend_state_cache
+            release_legend_state_cache()
+        except Exception:
+            pass
+        # stop the theme pre-render cache (it is connected to canvas signals)
+        try:
+            if getattr(self, 'theme_render_cache', None) is not None:
+                self.theme_render_cache.stop()
+                self.theme_render_cache = None
+        except Exception:
+            pass
+        # cancel pending theme thumbnail tasks
+        try:
+            if getattr(self, 'theme_thumbnailer', None) is not None:
+                self.theme_thumbnailer.stop()
+                self.theme_thumbnailer = None
+        except Exception:
+            pass
+        # drop a pending combobox rebuild
+        try:
+            self.theme_update_scheduler.cancel()
+        except Exception:
+            pass
         # disconnect theme collection signals if we connected them
         try:
             if getattr(self, '_theme_signals_connected', False):
@@ -929,6 +1026,12 @@ class plugin(object):
             self.iface.removePluginMenu("地図検索", self.action)
         except:
             pass
+        try:
+            if getattr(self, 'open_results_action', None) is not None:
+                self.iface.removePluginMenu("地図検索", self.open_results_action)
+                self.open_results_action = None
+        except Exception:
+            pass
             
         # コンボボックスの削除も例外処理
         try:
@@ -997,6 +1100,38 @@ class plugin(object):
         except:
             pass
 
+    def _saved_results_dialog(self):
+        """保存した検索結果を表示する結果ダイアログ。
+
+        検索タブの結果ダイアログ（ズーム・強調表示が接続済み）を使い、
+        検索タブがなければ表示専用の結果ダイアログを作る。
+        """
+        feature = getattr(self, 'current_feature', None)
+        if feature is None and getattr(self, '_search_features', None):
+            feature = self._search_features[0]
+        dialog = getattr(feature, 'result_dialog', None)
+        if dialog is not None:
+            return dialog
+        if getattr(self, '_standalone_result_dialog', None) is None:
+            from .resultdialog import ResultDialog
+            self._standalone_result_dialog = ResultDialog(self.iface.mainWindow())
+            try:
+                self._standalone_result_dialog.canvas = self.iface.mapCanvas()
+            except Exception:
+                pass
+        return self._standalone_result_dialog
+
+    def open_saved_results(self, *args):
+        """保存した検索結果ファイルを選んで、検索せずに結果ダイアログで開く"""
+        try:
+            self._saved_results_dialog().open_result_set_dialog()
+        except Exception as e:
+            try:
+                from qgis.core import QgsMessageLog
+                QgsMessageLog.logMessage(f"保存した検索結果を開けませんでした: {e}", "GEO-search-plugin", 2)
+            except Exception:
+                pass
+
     def create_search_dialog(self):
         # メッセージ表示
         # QMessageBox.information(None, "create_search_dialog", "ダイヤログ構築", QMessageBox.Yes)
@@ -1526,42 +1661,21 @@ class plugin(object):
             # レイヤーツリーを取得
             root = project.layerTreeRoot()
             
-            # 最初に既存の同名テーマを削除（あれば）。mapThemes() の返り値は
-            # 文字列リストかテーマオブジェクトのリストか環境により異なるため
-            # 安全に名前を比較する。
-            try:
-                raw_tm = theme_collection.mapThemes()
-            except Exception:
-                raw_tm = []
-            exists = False
-            for t in (raw_tm or []):
-                try:
-                    if isinstance(t, str):
-                        tname = t
-                    else:
-                        if hasattr(t, 'name') and callable(getattr(t, 'name')):
-                            tname = t.name()
-                        elif hasattr(t, 'name'):
-                            tname = getattr(t, 'name')
-                        elif hasattr(t, 'displayName') and callable(getattr(t, 'displayName')):
-                            tname = t.displayName()
-                        elif hasattr(t, 'displayName'):
-                            tname = getattr(t, 'displayName')
-                        else:
-                            tname = str(t)
-                    if tname == theme_name:
-                        exists = True
-                        break
-                except Exception:
-                    continue
-            if exists:
-                theme_collection.removeMapTheme(theme_name)
-            
+            # 既存の同名テーマがあるか（正規化済みの名前は登録簿から読む）
+            registry = shared_theme_registry(theme_collection)
+            exists = registry.has(theme_name)
+
             # レイヤーツリーモデルを取得してテーマを作成
             model = self.iface.layerTreeView().layerTreeModel()
             theme_state = theme_collection.createThemeFromCurrentState(root, model)
-            theme_collection.insert(theme_name, theme_state)
-            QgsMessageLog.logMessage(f"テーマ「{theme_name}」を保存しました", "GEO-search-plugin", 0)
+            # 表示（レイヤの表示・凡例・スタイル）が前回保存時と同じなら書き換えない
+            if exists and registry.fingerprint(theme_name) == theme_fingerprint(theme_state):
+                QgsMessageLog.logMessage(f"テーマ「{theme_name}」は変更がないため保存を省略しました", "GEO-search-plugin", 0)
+            else:
+                if exists:
+                    theme_collection.removeMapTheme(theme_name)
+                theme_collection.insert(theme_name, theme_state)
+                QgsMessageLog.logMessage(f"テーマ「{theme_name}」を保存しました", "GEO-search-plugin", 0)
             
         except Exception as e:
             from qgis.core import QgsMessageLog
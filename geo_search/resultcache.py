@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+検索結果のキャッシュ
+
+このモジュールには以下を含む:
+- PageCache: 先読みしたページの表示文字列を保持する小さな LRU
+- ExtentCache: 検索結果の地物範囲をキャンバス CRS に変換済みで保持する
+- TransformCache: レイヤ CRS → キャンバス CRS の座標変換を使い回す
+- GeometryCache: 強調表示用に単純化したジオメトリを縮尺バケットごとに保持する
+- simplify_features: 地物ジオメトリの単純化（QgsTask のワーカーでもメインスレッドでも使う）
+- compute_boxes: 地物範囲の計算（QgsTask のワーカーでもメインスレッドでも使う）
+- fetch_boxes: 地物IDの範囲だけをレイヤから読む（属性は読まない）
+- prefetch_page: 1ページ分の表示文字列と地物範囲を作る（QgsTask のワーカーで実行）
+- unique_ids / merge_boxes / format_ids: 大量の地物IDを扱うズーム処理用の一括処理
+
+ベンチマーク: ``python -m geo_search.resultcache`` で 10 万件の ID に対する
+重複除去・範囲取得・範囲結合の所要時間を表示する（QGIS 不要）。
+
+地物範囲は (xmin, ymin, xmax, ymax) のタプルで保持する。
+QGIS に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+Box = Tuple[float, float, float, float]
+
+
+class PageCache(object):
+    """ページ単位の先読み結果を保持する LRU キャッシュ"""
+
+    def __init__(self, max_pages: int = 4):
+        self.max_pages = max(1, int(max_pages))
+        self._pages: "OrderedDict[Hashable, Dict]" = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._pages
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, key) -> Optional[Dict]:
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key, page: Dict) -> None:
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def values(self):
+        return list(self._pages.values())
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+
+class ExtentCache(object):
+    """検索結果の地物範囲をキャンバス CRS で保持する。
+
+    (レイヤID, キャンバス CRS キー) ごとに {fid: (xmin, ymin, xmax, ymax)} を持つ。
+    ResultDialog はキーに変換コンテキストの世代も含めるため、キャンバス CRS や
+    データム変換が変わると古い範囲が使われることはない。
+    """
+
+    def __init__(self):
+        self._boxes: Dict[Tuple, Dict[int, Box]] = {}
+
+    def get_many(self, layer_id, crs_key, ids) -> Tuple[Dict[int, Box], list]:
+        """(見つかった範囲, 見つからなかった fid のリスト) を返す"""
+        boxes = self._boxes.get((layer_id, crs_key)) or {}
+        found = {}
+        missing = []
+        for fid in ids:
+            box = boxes.get(fid)
+            if box is None:
+                missing.append(fid)
+            else:
+                found[fid] = box
+        return found, missing
+
+    def update(self, layer_id, crs_key, boxes: Dict[int, Box]) -> None:
+        if boxes:
+            self._boxes.setdefault((layer_id, crs_key), {}).update(boxes)
+
+    def count(self, layer_id, crs_key) -> int:
+        return len(self._boxes.get((layer_id, crs_key)) or {})
+
+    def clear(self) -> None:
+        self._boxes.clear()
+
+
+class TransformCache(object):
+    """座標変換を (変換元 CRS, 変換先 CRS, 変換コンテキスト) ごとに保持する。
+
+    QgsCoordinateTransform の生成は PROJ の初期化を伴うため、結果を1件ずつ
+    ズームする操作で毎回作り直さないようにする。変換コンテキストは世代番号で
+    表し、プロジェクトの transformContextChanged で clear() を呼んで進める。
+    """
+
+    def __init__(self):
+        self._transforms: Dict[Tuple, object] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, src_crs, dst_crs, project=None):
+        """変換を返す。同じ CRS どうしなら None"""
+        if src_crs is None or dst_crs is None or src_crs == dst_crs:
+            return None
+        key = (crs_key(src_crs), crs_key(dst_crs), self._generation)
+        transform = self._transforms.get(key)
+        if transform is not None:
+            self.hits += 1
+            return transform
+        from qgis.core import QgsCoordinateTransform, QgsProject
+
+        if project is None:
+            project = QgsProject.instance()
+        transform = QgsCoordinateTransform(src_crs, dst_crs, project.transformContext())
+        self._transforms[key] = transform
+        self.misses += 1
+        return transform
+
+    def __len__(self) -> int:
+        return len(self._transforms)
+
+    @property
+    def generation(self) -> int:
+        """変換コンテキストの世代番号（変換した結果のキャッシュのキーに含める）"""
+        return self._generation
+
+    def clear(self, *args) -> None:
+        # シグナルから呼ばれるため引数は無視する
+        self._transforms.clear()
+        self._generation += 1
+
+
+class GeometryCache(object):
+    """単純化したジオメトリを (レイヤID, 縮尺バケット) ごとに {fid: QgsGeometry} で保持する。
+
+    縮尺バケットは scale_bucket() で決める。保持するバケットはレイヤごとに
+    max_buckets 個までで、古いものから捨てる。complete はそのバケットで
+    検索結果の全地物を単純化し終えたかどうか。
+    """
+
+    def __init__(self, max_buckets: int = 3):
+        self.max_buckets = max(1, int(max_buckets))
+        self._geoms: "OrderedDict[Tuple, Dict[int, object]]" = OrderedDict()
+        self._complete = set()
+
+    def get_many(self, layer_id, bucket, ids) -> Tuple[Dict[int, object], list]:
+        """(見つかったジオメトリ, 見つからなかった fid のリスト) を返す"""
+        key = (layer_id, bucket)
+        geoms = self._geoms.get(key)
+        if geoms is None:
+            return {}, list(ids)
+        self._geoms.move_to_end(key)
+        found = {}
+        missing = []
+        for fid in ids:
+            geom = geoms.get(fid)
+            if geom is None:
+                missing.append(fid)
+            else:
+                found[fid] = geom
+        return found, missing
+
+    def update(self, layer_id, bucket, geoms: Dict[int, object], complete: bool = False) -> None:
+        key = (layer_id, bucket)
+        self._geoms.setdefault(key, {}).update(geoms or {})
+        self._geoms.move_to_end(key)
+        if complete:
+            self._complete.add(key)
+        buckets = [k for k in self._geoms if k[0] == layer_id]
+        for old in buckets[:-self.max_buckets]:
+            del self._geoms[old]
+            self._complete.discard(old)
+
+    def is_complete(self, layer_id, bucket) -> bool:
+        return (layer_id, bucket) in self._complete
+
+    def clear(self) -> None:
+        self._geoms.clear()
+        self._complete.clear()
+
+
+def scale_bucket(pixel_size: float) -> Optional[int]:
+    """1ピクセルの大きさ（レイヤ CRS の単位）から縮尺バケットを返す。
+
+    バケット b の単純化の許容値は 4**b で、1ピクセル以下になる。
+    縮尺が 4 倍変わるまでは同じバケットを使う。
+    """
+    if not pixel_size or pixel_size <= 0:
+        return None
+    return int(math.floor(math.log(pixel_size, 4)))
+
+
+def bucket_tolerance(bucket: Optional[int]) -> float:
+    return 0.0 if bucket is None else 4.0 ** bucket
+
+
+def simplify_features(task, features, tolerance: float, source=None, fids=None) -> Optional[Dict[int, object]]:
+    """地物ジオメトリを GEOS で単純化して {fid: QgsGeometry} を返す。
+
+    ジオメトリを持たない地物と fids の地物は ``source`` からジオメトリだけを読む。
+    task がキャンセルされた場合は None を返す。
+    """
+    from .highlight import simplify_geometry
+
+    geoms: Dict[int, object] = {}
+    missing = list(fids or [])
+    for feat in features:
+        if task is not None and task.isCanceled():
+            return None
+        try:
+            if feat.hasGeometry():
+                geoms[feat.id()] = simplify_geometry(feat.geometry(), tolerance)
+                continue
+        except Exception:
+            pass
+        missing.append(feat.id())
+    if missing and source is not None:
+        from qgis.core import QgsFeatureRequest
+
+        request = QgsFeatureRequest().setFilterFids(missing)
+        request.setNoAttributes()
+        for feat in source.getFeatures(request):
+            if task is not None and task.isCanceled():
+                return None
+            if feat.hasGeometry():
+                geoms[feat.id()] = simplify_geometry(feat.geometry(), tolerance)
+    return geoms
+
+
+def worker_transform(transform):
+    """ワーカースレッドに渡す変換のコピーを返す（変換オブジェクトはスレッド間で共有しない）"""
+    if transform is None:
+        return None
+    from qgis.core import QgsCoordinateTransform
+
+    return QgsCoordinateTransform(transform)
+
+
+def crs_key(crs) -> str:
+    """CRS を辞書キーに使える文字列にする"""
+    try:
+        return crs.authid() or crs.toWkt()
+    except Exception:
+        return str(crs)
+
+
+def feature_box(feature) -> Optional[Box]:
+    """地物ジオメトリの範囲を返す。ジオメトリがなければ None"""
+    try:
+        if not feature.hasGeometry():
+            return None
+        r = feature.geometry().boundingBox()
+        return (r.xMinimum(), r.yMinimum(), r.xMaximum(), r.yMaximum())
+    except Exception:
+        return None
+
+
+def transform_box(box: Box, transform) -> Optional[Box]:
+    """範囲を座標変換する（transform が None ならそのまま）"""
+    if transform is None:
+        return box
+    from qgis.core import QgsRectangle
+
+    try:
+        r = transform.transformBoundingBox(QgsRectangle(*box))
+        return (r.xMinimum(), r.yMinimum(), r.xMaximum(), r.yMaximum())
+    except Exception:
+        return None
+
+
+def compute_boxes(task, features, transform=None, source=None) -> Optional[Dict[int, Box]]:
+    """地物の範囲を変換先 CRS で計算して {fid: box} を返す。
+
+    ジオメトリを持たない地物は ``source`` (QgsVectorLayerFeatureSource) から
+    ジオメトリだけを読み直す。task がキャンセルされた場合は None を返す。
+    """
+    boxes: Dict[int, Box] = {}
+    missing = []
+    for feat in features:
+        if task is not None and task.isCanceled():
+            return None
+        box = feature_box(feat)
+        if box is None:
+            missing.append(feat.id())
+            continue
+        box = transform_box(box, transform)
+        if box is not None:
+            boxes[feat.id()] = box
+    if missing and source is not None:
+        fetched = fetch_boxes(task, source, missing, transform)
+        if fetched is None:
+            return None
+        boxes.update(fetched)
+    return boxes
+
+
+def fetch_boxes(task, source, ids, transform=None) -> Optional[Dict[int, Box]]:
+    """ids の地物の範囲（変換先 CRS）を ``source`` から読んで {fid: box} を返す。
+
+    属性は読まず、地物オブジェクトも保持しない。task がキャンセルされた場合は None を返す。
+    """
+    from qgis.core import QgsFeatureRequest
+
+    boxes: Dict[int, Box] = {}
+    request = QgsFeatureRequest().setFilterFids(list(ids))
+    request.setNoAttributes()
+    for feat in source.getFeatures(request):
+        if task is not None and task.isCanceled():
+            return None
+        box = feature_box(feat)
+        if box is not None:
+            box = transform_box(box, transform)
+        if box is not None:
+            boxes[feat.id()] = box
+    return boxes
+
+
+def prefetch_page(task, features, field_names, transform=None, source=None) -> Optional[Dict]:
+    """1ページ分の表示文字列と地物範囲（変換先 CRS）を作る。
+
+    QgsTask.fromFunction から呼ばれ、ワーカースレッドで実行される。
+    キャンセルされた場合は None を返す。
+    """
+    from .resultdialog import format_attribute_value
+
+    texts = []
+    for feat in features:
+        if task is not None and task.isCanceled():
+            return None
+        row = []
+        for name in field_names:
+            try:
+                row.append(format_attribute_value(feat.attribute(name)))
+            except Exception:
+                row.append('')
+        texts.append(row)
+    boxes = compute_boxes(task, features, transform, source)
+    if boxes is None:
+        return None
+    return {"texts": texts, "boxes": boxes}
+
+
+def unique_ids(values: Iterable) -> List[int]:
+    """ID を int に正規化し、順序を保ったまま重複を除く（集合で O(n)）"""
+    try:
+        # 生の値で先に重複を除き、int 変換を一意な値だけにする
+        values = dict.fromkeys(values)
+    except TypeError:
+        pass
+    seen = set()
+    out = []
+    for value in values:
+        try:
+            fid = int(value)
+        except Exception:
+            continue
+        if fid not in seen:
+            seen.add(fid)
+            out.append(fid)
+    return out
+
+
+def merge_boxes(boxes: Iterable[Box]) -> Optional[Box]:
+    """範囲のリストを1つの範囲にまとめる（列ごとに min/max を一括で取る）"""
+    boxes = list(boxes)
+    if not boxes:
+        return None
+    return (min(map(itemgetter(0), boxes)), min(map(itemgetter(1), boxes)),
+            max(map(itemgetter(2), boxes)), max(map(itemgetter(3), boxes)))
+
+
+def format_ids(ids, limit: int = 20) -> str:
+    """ログ用に ID リストを先頭 limit 件に切り詰めた文字列にする"""
+    ids = list(ids)
+    if len(ids) <= limit:
+        return str(ids)
+    return f"{str(ids[:limit])[:-1]}, ...] (total {len(ids)})"
+
+
+def benchmark_zoom_ids(n: int = 100000, columns: int = 5) -> Dict[str, float]:
+    """複数地物ズームの一括処理のベンチマーク（ミリ秒）。
+
+    選択行の全セルから ID を集めた状況を想定し、n 件の ID を columns 回
+    重複させた入力で 重複除去 → 範囲キャッシュ参照 → 範囲結合 を計測する。
+    """
+    import random
+    import time
+
+    cache = ExtentCache()
+    boxes = {}
+    for fid in range(n):
+        x = random.uniform(0, 100000)
+        y = random.uniform(0, 100000)
+        boxes[fid] = (x, y, x + 10.0, y + 10.0)
+    cache.update("layer", "EPSG:6677", boxes)
+    raw = [fid for fid in range(n) for _ in range(columns)]
+
+    result = {}
+    t0 = time.perf_counter()
+    ids = unique_ids(raw)
+    t1 = time.perf_counter()
+    found, missing = cache.get_many("layer", "EPSG:6677", ids)
+    t2 = time.perf_counter()
+    merged = merge_boxes(found.values())
+    t3 = time.perf_counter()
+    format_ids(ids)
+    t4 = time.perf_counter()
+    assert len(ids) == n and not missing and merged is not None
+    result["unique_ids"] = (t1 - t0) * 1000.0
+    result["extent_lookup"] = (t2 - t1) * 1000.0
+    result["merge_boxes"] = (t3 - t2) * 1000.0
+    result["format_ids"] = (t4 - t3) * 1000.0
+    result["total"] = (t4 - t0) * 1000.0
+    return result
+
+
+__all__ = [
+    "unique_ids",
+    "merge_boxes",
+    "format_ids",
+    "benchmark_zoom_ids",
+    "PageCache",
+    "ExtentCache",
+    "TransformCache",
+    "GeometryCache",
+    "scale_bucket",
+    "bucket_tolerance",
+    "simplify_features",
+    "worker_transform",
+    "crs_key",
+    "feature_box",
+    "transform_box",
+    "compute_boxes",
+    "fetch_boxes",
+    "prefetch_page",
+]
+
+
+if __name__ == "__main__":
+    for name, ms in benchmark_zoom_ids().items():
+        print(f"{name:>14}: {ms:8.1f} ms")
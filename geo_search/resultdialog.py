@@ -1,27 +1,175 @@
 # -*- coding: utf-8 -*-
 import os
 import math
+import time
+import functools
 
-from qgis.PyQt.QtCore import QDate, pyqtSignal
-from qgis.PyQt.QtWidgets import QDialog, QTableWidgetItem, QTabWidget, QTableWidget, QHeaderView
+from qgis.PyQt.QtCore import QDate, Qt, QAbstractListModel, QModelIndex, pyqtSignal
+from qgis.PyQt.QtWidgets import QDialog, QTableWidgetItem, QTabWidget, QTableWidget, QHeaderView, QWidget, QVBoxLayout
 from qgis.PyQt import uic
+from qgis.core import QgsApplication, QgsProject, QgsTask, QgsVectorLayerFeatureSource
+
+from .resultcache import (
+    PageCache, ExtentCache, TransformCache, GeometryCache, crs_key, compute_boxes, fetch_boxes, prefetch_page,
+    worker_transform, scale_bucket, bucket_tolerance, simplify_features, merge_boxes,
+)
+from .highlight import layer_pixel_size
 
 
 UI_FILE = "result.ui"
 
+
+def format_attribute_value(val):
+    """属性値を表示用文字列に変換する"""
+    # 日付の場合の場合はも書式を指定して文字列に変換
+    if isinstance(val, QDate):
+        return QDate.toString(val, 'yyyy/M/d')
+    # その他はそのまま（Python3互換）
+    return str(val)
+
+
+def _role_value(role):
+    # Qt6 では列挙型、Qt5 では int で渡されるため値を揃える
+    return getattr(role, 'value', role)
+
+
+class FeatureListModel(QAbstractListModel):
+    """フォーム表示の地物リスト用モデル。
+    地物リストを保持するだけで、値は表示される行の分だけ data() で取得する。
+    """
+
+    def __init__(self, data_role, parent=None):
+        QAbstractListModel.__init__(self, parent)
+        self._data_role = data_role
+        self._display_role = _role_value(Qt.DisplayRole)
+        self._features = []
+        self._field_name = None
+
+    def set_features(self, features, field_name=None):
+        self.beginResetModel()
+        self._features = features or []
+        self._field_name = field_name
+        self.endResetModel()
+
+    def set_field_name(self, field_name):
+        self._field_name = field_name
+        if self._features:
+            self.dataChanged.emit(self.index(0), self.index(len(self._features) - 1))
+
+    def feature(self, row):
+        if 0 <= row < len(self._features):
+            return self._features[row]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._features)
+
+    def data(self, index, role=Qt.DisplayRole):
+        feature = self.feature(index.row()) if index.isValid() else None
+        if feature is None:
+            return None
+        role = _role_value(role)
+        if role == self._display_role:
+            try:
+                if self._field_name:
+                    return format_attribute_value(feature.attribute(self._field_name))
+                return str(feature.id())
+            except Exception:
+                return ''
+        if role == self._data_role:
+            try:
+                return feature.id()
+            except Exception:
+                return None
+        return None
+
+class AdaptivePager(object):
+    """描画コストからページサイズを決める。
+    列数ごとに最初に描画したページで 1 セル (行×列) あたりの描画時間（項目の作成・
+    列幅の調整・再描画まで。processEvents は含めない）を計測し、
+    1 ページの描画が target_ms に収まる行数を返す。hard_cap を超えることはない。
+    列数の違うタブは列幅の調整の重さが違うため計測し直す。
+    target_ms が 0 以下の場合は常に hard_cap 行（固定ページ）とする。
+    """
+    PROBE_ROWS = 50
+    MIN_ROWS = 20
+    MIN_MEASURE_ROWS = 10
+
+    def __init__(self, hard_cap=500, target_ms=50.0):
+        self.hard_cap = max(1, int(hard_cap))
+        self.target_ms = float(target_ms or 0)
+        # 最後に計測した 1 セルあたりの時間と、列数ごとの計測結果
+        self.cell_ms = None
+        self._cell_ms = {}
+
+    def is_measured(self, columns):
+        return self.target_ms <= 0 or max(1, columns) in self._cell_ms
+
+    def page_size(self, columns):
+        if self.target_ms <= 0:
+            return self.hard_cap
+        columns = max(1, columns)
+        cell_ms = self._cell_ms.get(columns)
+        if cell_ms is None:
+            return min(self.hard_cap, self.PROBE_ROWS)
+        rows = int(self.target_ms / (cell_ms * columns))
+        return max(min(self.MIN_ROWS, self.hard_cap), min(self.hard_cap, rows))
+
+    def record(self, rows, columns, elapsed):
+        """描画時間（秒）を記録する。列数ごとに最初の十分な大きさのページだけを使う"""
+        if self.is_measured(columns) or rows < self.MIN_MEASURE_ROWS:
+            return
+        columns = max(1, columns)
+        cells = rows * columns
+        self.cell_ms = max(elapsed * 1000.0 / cells, 1e-6)
+        self._cell_ms[columns] = self.cell_ms
+        try:
+            from qgis.core import QgsMessageLog
+            QgsMessageLog.logMessage(f"AdaptivePager: {cells} セルの描画に {elapsed * 1000.0:.1f} ms (1セル {self.cell_ms:.4f} ms)", "GEO-search-plugin", 0)
+        except Exception:
+            pass
+
+
 #検索結果表示ダイアログ
 class ResultDialog(QDialog):
     # dialog-level signals to decouple callers from concrete table widgets
     selectionChanged = pyqtSignal()
     itemPressed = pyqtSignal(object)
+    # clustered overview of all results on the map was switched on/off
+    overviewToggled = pyqtSignal(bool)
+    # simplified geometries of (layer id, scale bucket) were added to the geometry cache
+    geometriesReady = pyqtSignal(str, object)
 
-    def __init__(self, parent=None, page_limit=500):
+    def __init__(self, parent=None, page_limit=500, page_target_ms=50.0):
         QDialog.__init__(self, parent)
         directory = os.path.join(os.path.dirname(__file__), "ui")
         ui_file = os.path.join(directory, UI_FILE)
         uic.loadUi(ui_file, self)
         self.data_role = 15
+        # page_limit is the hard cap; the actual page size is chosen per tab by the pager
         self.page_limit = page_limit
+        self.pager = AdaptivePager(page_limit, page_target_ms)
+        # adjacent pages are prefetched in the background into a small cache
+        self.page_cache = PageCache()
+        self._prefetch_tasks = {}
+        # ids whose geometries were already requested in the background (per result set)
+        self._geometry_requests = set()
+        self._result_serial = 0
+        # per-feature extents in canvas CRS so zooming never re-queries the layer;
+        # canvas is set by the owning search feature
+        self.canvas = None
+        self.extent_cache = ExtentCache()
+        self._feature_index = {}
+        # result geometries simplified per scale bucket for highlighting, built in the background
+        self.geometry_cache = GeometryCache()
+        self.highlight_results = False
+        # layer CRS -> canvas CRS transforms are reused until the project transform context changes;
+        # the signal is connected only while the dialog is shown (see showEvent / hideEvent)
+        self.transform_cache = TransformCache()
+        self._transform_context = None
+        self._context_connected = False
         self.nextButton.clicked.connect(self.next_page)
         self.prevButton.clicked.connect(self.prev_page)
         self.pageBox.valueChanged.connect(self.move_page)
@@ -73,6 +221,23 @@ class ResultDialog(QDialog):
                     pass
         except Exception:
             pass
+        # form mode: one lazy model for the left list, wired once
+        self._form_model = FeatureListModel(self.data_role, self)
+        self._form_tab = None
+        self._form_layout_done = False
+        self.formFieldList.setModel(self._form_model)
+        self.formFieldList.selectionModel().currentChanged.connect(self._on_form_current_changed)
+        self.formFieldList.pressed.connect(lambda index: self.itemPressed.emit(index))
+        self.formAttributeCombo.currentIndexChanged.connect(self._on_form_attribute_changed)
+        # result set persistence: query_provider is set by the search feature
+        self.query = None
+        self.query_provider = None
+        self.saveResultButton.setText(self.tr('Save'))
+        self.openResultButton.setText(self.tr('Open'))
+        self.saveResultButton.clicked.connect(self.save_result_set_dialog)
+        self.openResultButton.clicked.connect(self.open_result_set_dialog)
+        self.overviewButton.setText(self.tr('Overview'))
+        self.overviewButton.toggled.connect(self.overviewToggled.emit)
 
     def next_page(self):
         value = self.pageBox.value()
@@ -92,8 +257,9 @@ class ResultDialog(QDialog):
             QgsMessageLog.logMessage(f"move_page: tab_index={idx} tab_layer={getattr(tab.get('layer'), 'name', lambda: None)() if tab.get('layer') else 'None'} features_total={len(features)} page={page}", "GEO-search-plugin", 0)
         except Exception:
             pass
-        s = (page - 1) * self.page_limit
-        e = page * self.page_limit
+        limit = self._page_limit(tab)
+        s = (page - 1) * limit
+        e = page * limit
         page_features = features[s:e]
         try:
             from qgis.core import QgsMessageLog
@@ -102,12 +268,321 @@ class ResultDialog(QDialog):
             pass
 
         rows = len(page_features)
-        if rows > self.page_limit:
-            rows = self.page_limit
-        table = tab.get("table") or self.current_table
+        if rows > limit:
+            rows = limit
+        table = self._ensure_tab_table(tab) or self.current_table
         table.setRowCount(rows)
         table.setVerticalHeaderLabels([f"{i}" for i in range(s, e)])
-        self.set_feature_items(page_features, table, tab.get("fields"))
+        cached = self.page_cache.get(self._page_key(tab, page, limit))
+        self.set_feature_items(page_features, table, tab.get("fields"), texts=cached["texts"] if cached else None)
+        if tab.get("page_limit") is None and self.pager.is_measured(len(tab.get("fields") or [])):
+            # 計測用の小さいページを描画した直後: 計測結果のページサイズで描画し直す
+            new_limit = self._page_limit(tab)
+            self._update_page_controls(tab)
+            if new_limit != limit and len(features) > rows:
+                self.move_page(1)
+                return
+        self._prefetch_neighbours(tab, page, limit)
+
+    def _page_key(self, tab, page, limit):
+        key = tab.get("key")
+        return None if key is None else (key, page, limit)
+
+    def _reset_result_caches(self):
+        """新しい検索結果をセットする前に先読み・範囲キャッシュとタスクを破棄する"""
+        self._result_serial += 1
+        self.page_cache.clear()
+        self.extent_cache.clear()
+        self.geometry_cache.clear()
+        self._geometry_requests = set()
+        for task in list(self._prefetch_tasks.values()):
+            try:
+                task.cancel()
+            except Exception:
+                pass
+        self._prefetch_tasks = {}
+
+    def _extent_target(self, layer):
+        """(キャンバス CRS キー, レイヤ CRS → キャンバス CRS の変換) を返す。キャンバスがなければ None
+
+        キーには変換コンテキストの世代を含めるため、データム変換が変わると古い範囲は使われない。
+        """
+        if self.canvas is None or layer is None:
+            return None
+        try:
+            canvas_crs = self.canvas.mapSettings().destinationCrs()
+            layer_crs = layer.crs()
+        except Exception:
+            return None
+        return (crs_key(canvas_crs), self.transform_cache.generation), self.transform_cache.get(layer_crs, canvas_crs)
+
+    def _on_transform_context_changed(self, *args):
+        """変換コンテキストが変わったら、変換とそれで作った範囲・ジオメトリを捨てて計算し直す"""
+        self.transform_cache.clear()
+        self.extent_cache.clear()
+        self.geometry_cache.clear()
+        self._geometry_requests = set()
+        try:
+            self._transform_context = QgsProject.instance().transformContext()
+        except Exception:
+            self._transform_context = None
+        if self._tabs:
+            self._cache_result_extents()
+
+    def showEvent(self, event):
+        # 表示中だけ transformContextChanged に接続する。隠している間に変わっていれば捨てる
+        if not self._context_connected:
+            try:
+                project = QgsProject.instance()
+                project.transformContextChanged.connect(self._on_transform_context_changed)
+                self._context_connected = True
+                if self._transform_context is not None and project.transformContext() != self._transform_context:
+                    self._on_transform_context_changed()
+                self._transform_context = project.transformContext()
+            except Exception:
+                pass
+        QDialog.showEvent(self, event)
+
+    def hideEvent(self, event):
+        # 閉じたダイアログ（破棄されるものを含む）にはシグナルを残さない
+        self._disconnect_transform_context()
+        QDialog.hideEvent(self, event)
+
+    def _disconnect_transform_context(self):
+        if not self._context_connected:
+            return
+        try:
+            QgsProject.instance().transformContextChanged.disconnect(self._on_transform_context_changed)
+        except Exception:
+            pass
+        self._context_connected = False
+
+    def _feature_source(self, layer, features):
+        # ジオメトリを持たない地物（保存した結果）はレイヤから範囲を読む
+        if layer is None or not features or hasattr(features[0], 'hasGeometry'):
+            return None
+        try:
+            return QgsVectorLayerFeatureSource(layer)
+        except Exception:
+            return None
+
+    def _add_task(self, key, description, func, *args):
+        task = QgsTask.fromFunction(description, func, *args,
+                                    on_finished=functools.partial(self._on_task_finished, key))
+        self._prefetch_tasks[key] = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _prefetch_neighbours(self, tab, page, limit):
+        """前後のページの表示文字列と地物範囲をバックグラウンドで読み込む"""
+        features = tab.get("features") or []
+        names = self._tab_field_names(tab)
+        if not names:
+            return
+        layer = tab.get("layer")
+        target = self._extent_target(layer)
+        for p in (page + 1, page - 1):
+            key = self._page_key(tab, p, limit)
+            if key is None or p < 1 or (p - 1) * limit >= len(features):
+                continue
+            task_key = ("page", key, layer.id() if target else None, target[0] if target else None)
+            if key in self.page_cache or task_key in self._prefetch_tasks:
+                continue
+            page_features = features[(p - 1) * limit:p * limit]
+            self._add_task(task_key, "検索結果の先読み", prefetch_page, page_features, names,
+                           worker_transform(target[1]) if target else None,
+                           self._feature_source(layer, page_features))
+
+    def _cache_result_extents(self):
+        """検索結果の全地物の範囲をキャンバス CRS でバックグラウンド計算する"""
+        for tab in self._tabs:
+            layer = tab.get("layer")
+            features = tab.get("features") or []
+            target = self._extent_target(layer)
+            if target is None or not features:
+                continue
+            key = ("extent", tab.get("key"), layer.id(), target[0])
+            self._add_task(key, "検索結果の範囲計算", compute_boxes, features, worker_transform(target[1]),
+                           self._feature_source(layer, features))
+            if self.highlight_results:
+                self._cache_result_geometries(layer, self.scale_bucket(layer))
+
+    def _on_task_finished(self, key, exception, result=None):
+        self._prefetch_tasks.pop(key, None)
+        kind, tab_key, layer_id, ckey = key
+        # 破棄済みの検索結果に対するタスクは捨てる
+        if exception is not None or not result:
+            return
+        if (tab_key[0][0] if kind == "page" else tab_key[0]) != self._result_serial:
+            return
+        if kind in ("geometry", "geometry_ids"):
+            self.geometry_cache.update(layer_id, ckey, result, complete=kind == "geometry")
+            self.geometriesReady.emit(layer_id, ckey)
+            return
+        if kind == "page":
+            self.page_cache.put(tab_key, result)
+            boxes = result.get("boxes")
+        else:
+            boxes = result
+        if layer_id is not None:
+            self.extent_cache.update(layer_id, ckey, boxes)
+
+    def feature_extents(self, layer, ids):
+        """地物範囲（キャンバス CRS）を返す: (キャンバス CRS キー, {fid: box}, 見つからない fid)。
+
+        範囲キャッシュになければメモリ上の検索結果の地物から計算してキャッシュする。
+        レイヤへの問い合わせは行わない。
+        """
+        target = self._extent_target(layer)
+        if target is None:
+            return None, {}, list(ids)
+        ckey, transform = target
+        layer_id = layer.id()
+        found, missing = self.extent_cache.get_many(layer_id, ckey, ids)
+        if missing:
+            by_id = self._features_by_id(layer_id)
+            feats = [by_id[fid] for fid in missing if fid in by_id]
+            boxes = compute_boxes(None, feats, transform) or {}
+            self.extent_cache.update(layer_id, ckey, boxes)
+            found.update(boxes)
+            missing = [fid for fid in missing if fid not in boxes]
+        return ckey, found, missing
+
+    def scale_bucket(self, layer):
+        """現在のキャンバス縮尺に対応する layer の縮尺バケットを返す。キャンバスがなければ None"""
+        target = self._extent_target(layer)
+        if target is None:
+            return None
+        return scale_bucket(layer_pixel_size(self.canvas, target[1]))
+
+    def simplified_geometries(self, layer, ids, bucket):
+        """ids の地物のジオメトリ {fid: QgsGeometry} をすぐに返す。
+
+        単純化済みのものはキャッシュから、まだのものはメモリ上の検索結果の単純化前の
+        ジオメトリを返す（メインスレッドでは単純化もレイヤの読み込みもしない）。
+        単純化はバックグラウンドで行い、終わったら geometriesReady を送る。
+        """
+        layer_id = layer.id()
+        found, missing = self.geometry_cache.get_many(layer_id, bucket, ids)
+        if missing:
+            by_id = self._features_by_id(layer_id)
+            others = []
+            for fid in missing:
+                feat = by_id.get(fid)
+                if feat is None:
+                    others.append(fid)
+                    continue
+                try:
+                    if feat.hasGeometry():
+                        found[fid] = feat.geometry()
+                except Exception:
+                    # ジオメトリを持たない地物（保存した結果）は結果全体の単純化で読む
+                    pass
+            self._request_geometries(layer, bucket, others)
+        self._cache_result_geometries(layer, bucket)
+        return found
+
+    def _request_geometries(self, layer, bucket, fids):
+        """検索結果にない地物のジオメトリをレイヤから読んでバックグラウンドで単純化する"""
+        fids = [fid for fid in fids if (layer.id(), bucket, fid) not in self._geometry_requests]
+        if not fids:
+            return
+        try:
+            source = QgsVectorLayerFeatureSource(layer)
+        except Exception:
+            return
+        self._geometry_requests.update((layer.id(), bucket, fid) for fid in fids)
+        key = ("geometry_ids", (self._result_serial, len(self._geometry_requests)), layer.id(), bucket)
+        self._add_task(key, "検索結果のジオメトリ単純化", simplify_features, [],
+                       bucket_tolerance(bucket), source, fids)
+
+    def _cache_result_geometries(self, layer, bucket):
+        """検索結果の全地物を bucket の許容値でバックグラウンド単純化する"""
+        if layer is None or bucket is None:
+            return
+        layer_id = layer.id()
+        key = ("geometry", (self._result_serial,), layer_id, bucket)
+        if self.geometry_cache.is_complete(layer_id, bucket) or key in self._prefetch_tasks:
+            return
+        features = list(self._features_by_id(layer_id).values())
+        if not features:
+            return
+        self._add_task(key, "検索結果のジオメトリ単純化", simplify_features, features,
+                       bucket_tolerance(bucket), self._feature_source(layer, features))
+
+    def result_centers(self):
+        """全タブの検索結果の中心点（キャンバス CRS）を列で返す: (xs, ys, 全体の範囲 box)"""
+        xs = []
+        ys = []
+        extents = []
+        for tab in self._tabs:
+            layer = tab.get("layer")
+            features = tab.get("features") or []
+            if layer is None or not features:
+                continue
+            _, found, _ = self.feature_extents(layer, [f.id() for f in features])
+            boxes = list(found.values())
+            if not boxes:
+                continue
+            xs.extend([(b[0] + b[2]) * 0.5 for b in boxes])
+            ys.extend([(b[1] + b[3]) * 0.5 for b in boxes])
+            extents.append(merge_boxes(boxes))
+        return xs, ys, merge_boxes(extents)
+
+    def store_extents(self, layer, features):
+        """レイヤから取得した地物の範囲（キャンバス CRS）をキャッシュに追加して返す"""
+        target = self._extent_target(layer)
+        if target is None:
+            return {}
+        boxes = compute_boxes(None, features, target[1]) or {}
+        self.extent_cache.update(layer.id(), target[0], boxes)
+        return boxes
+
+    def fetch_extents(self, layer, ids):
+        """ids の地物範囲（キャンバス CRS）をレイヤから属性なしで読み、キャッシュに追加して返す。
+        キャンバスがなければ None
+        """
+        target = self._extent_target(layer)
+        if target is None:
+            return None
+        boxes = fetch_boxes(None, layer, ids, target[1]) or {}
+        self.extent_cache.update(layer.id(), target[0], boxes)
+        return boxes
+
+    def _features_by_id(self, layer_id):
+        """検索結果の {fid: 地物}（レイヤ単位で一度だけ作る）"""
+        index = self._feature_index.get(layer_id) if self._feature_index.get("serial") == self._result_serial else None
+        if index is not None:
+            return index
+        if self._feature_index.get("serial") != self._result_serial:
+            self._feature_index = {"serial": self._result_serial}
+        index = {}
+        for tab in self._tabs:
+            layer = tab.get("layer")
+            try:
+                if layer is None or layer.id() != layer_id:
+                    continue
+            except Exception:
+                continue
+            for feat in tab.get("features") or []:
+                index[feat.id()] = feat
+        self._feature_index[layer_id] = index
+        return index
+
+    def _page_limit(self, tab):
+        """タブのページサイズ（計測後はタブごとに固定）"""
+        limit = tab.get("page_limit")
+        if limit is None:
+            columns = len(tab.get("fields") or [])
+            limit = self.pager.page_size(columns)
+            if self.pager.is_measured(columns):
+                tab["page_limit"] = limit
+        return limit
+
+    def _update_page_controls(self, tab):
+        features = tab.get("features") or []
+        max_page = math.ceil(len(features) / self._page_limit(tab)) if features else 1
+        self.pageBox.setMaximum(max_page)
+        self.pageLabel.setText(self.tr(" / {0}").format(max_page))
 
     def set_features(self, fields, features):
         """
@@ -116,9 +591,10 @@ class ResultDialog(QDialog):
         set_features_by_layer for per-layer tab display.
         """
         # simple single-table behavior
+        self._reset_result_caches()
         self._tabs = []
         # reuse existing table as a single tab
-        tab = {"layer": None, "fields": fields, "features": features, "table": self.tableWidget}
+        tab = {"layer": None, "fields": fields, "features": features, "table": self.tableWidget, "key": (self._result_serial, 0)}
         self._tabs.append(tab)
         # prepare table columns
         self.tableWidget.setColumnCount(len(fields) if fields else 0)
@@ -147,9 +623,7 @@ class ResultDialog(QDialog):
                 pass
 
         self.setWindowTitle(self.tr("Search Results: {0} items").format(len(features)))
-        max_page = math.ceil(len(features) / self.page_limit) if features else 1
-        self.pageBox.setMaximum(max_page)
-        self.pageLabel.setText(self.tr(" / {0}").format(max_page))
+        self._update_page_controls(tab)
         # ensure tabWidget has this single table
         # remove extra tabs and reset
         while self.tabWidget.count() > 1:
@@ -175,7 +649,17 @@ class ResultDialog(QDialog):
                     pass
         except Exception:
             pass
+        # drop the form model of the previous results
+        self._form_model.set_features([])
+        self._form_tab = None
+        # remember the query that produced these results (used when saving)
+        if self.query_provider is not None:
+            try:
+                self.query = self.query_provider()
+            except Exception:
+                self.query = None
         # clear existing tabs
+        self._reset_result_caches()
         self._tabs = []
         # remove all tabs
         while self.tabWidget.count() > 0:
@@ -200,38 +684,6 @@ class ResultDialog(QDialog):
             except Exception:
                 pass
 
-            # create a new table for this tab
-            table = QTableWidget(self)
-            table.setEditTriggers(self.tableWidget.editTriggers())
-            table.setSelectionMode(self.tableWidget.selectionMode())
-            table.setSelectionBehavior(self.tableWidget.selectionBehavior())
-            table.setSortingEnabled(self.tableWidget.isSortingEnabled())
-            # set columns
-            heads = len(fields) if fields else 0
-            table.setColumnCount(heads)
-            if fields:
-                table.setHorizontalHeaderLabels([self.tr(field.displayName()) for field in fields])
-                header = table.horizontalHeader()
-                try:
-                    header.setMinimumSectionSize(60)
-                except Exception:
-                    pass
-                for i in range(len(fields)):
-                    try:
-                        header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
-                    except Exception:
-                        try:
-                            header.setSectionResizeMode(i, QHeaderView.Stretch)
-                        except Exception:
-                            pass
-                try:
-                    header.setStretchLastSection(True)
-                except Exception:
-                    pass
-            # connect signals
-            table.itemSelectionChanged.connect(lambda: self.selectionChanged.emit())
-            table.itemPressed.connect(lambda item: self.itemPressed.emit(item))
-            # add tab
             # support layer being a (label, layer) tuple
             actual_layer = layer
             tab_label = None
@@ -249,61 +701,23 @@ class ResultDialog(QDialog):
                 QgsMessageLog.logMessage(f"set_features_by_layer: adding tab name={name} features={len(features)}", "GEO-search-plugin", 0)
             except Exception:
                 pass
-            self.tabWidget.addTab(table, self.tr(name))
-            self._tabs.append({"layer": actual_layer, "fields": fields, "features": features, "table": table})
-            # populate this tab's first page immediately so rows are visible
-            try:
-                # ensure row count is set before inserting items
-                rows = len(features)
-                if rows > self.page_limit:
-                    rows = self.page_limit
-                table.setRowCount(rows)
-                # populate first page directly
-                self.set_feature_items(features[:self.page_limit], table, fields)
-                # ensure row heights are reasonable and widget repainted
-                try:
-                    table.resizeRowsToContents()
-                except Exception:
-                    pass
-                try:
-                    table.repaint()
-                    table.setVisible(True)
-                except Exception:
-                    pass
-            except Exception:
-                pass
+            # テーブルはタブが初めて表示された時に作成する（ここではラベルと件数のみ）
+            page = QWidget(self)
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            self.tabWidget.addTab(page, self.tr("{0} ({1})").format(self.tr(name), len(features)))
+            self._tabs.append({"layer": actual_layer, "fields": fields, "features": features, "table": None, "page": page, "label": name,
+                               "key": (self._result_serial, len(self._tabs))})
 
         self.setWindowTitle(self.tr("Search Results: {0} items").format(total_count))
         # initialize first tab
         self.tabWidget.setCurrentIndex(0)
         # setup paging for first tab
-        first_features = self._tabs[0].get("features") or []
-        max_page = math.ceil(len(first_features) / self.page_limit) if first_features else 1
-        self.pageBox.setMaximum(max_page)
-        self.pageLabel.setText(self.tr(" / {0}").format(max_page))
+        self._update_page_controls(self._tabs[0])
         self.pageBox.setValue(1)
         self.move_page(1)
-        try:
-            # force-select each tab to ensure its table and viewport are initialized
-            from qgis.PyQt.QtCore import QCoreApplication
-            current = self.tabWidget.currentIndex()
-            for i in range(self.tabWidget.count()):
-                try:
-                    self.tabWidget.setCurrentIndex(i)
-                    # let Qt process events so the widget can layout
-                    QCoreApplication.processEvents()
-                    # call move_page to ensure the table for this tab is populated
-                    self.move_page(1)
-                except Exception:
-                    pass
-            # restore selection
-            try:
-                self.tabWidget.setCurrentIndex(current)
-            except Exception:
-                pass
-            QCoreApplication.processEvents()
-        except Exception:
-            pass
+        self.current_table = self._tabs[0].get("table") or self.current_table
+        self._cache_result_extents()
         # ensure the main tab widget is visible (hide any static form widget)
         try:
             if getattr(self, 'formWidget', None) is not None:
@@ -367,426 +781,224 @@ class ResultDialog(QDialog):
         except Exception:
             pass
 
-    def set_form(self, fields, features):
-        """Placeholder API: set results for 'form' display mode (single layer).
-        This stub records provided data and shows the dialog; UI rendering
-        for form mode is implemented later.
-        """
-        # For single-layer form mode, delegate to set_form_by_layer with single entry
-        try:
-            self.set_form_by_layer([(None, fields, features)])
-        except Exception:
-            # fallback minimal behavior
+    def _ensure_tab_table(self, tab):
+        """タブのテーブルを必要になった時点で作成して返す"""
+        table = tab.get("table")
+        if table is not None:
+            return table
+        page = tab.get("page")
+        if page is None:
+            return None
+        fields = tab.get("fields") or []
+        table = QTableWidget(page)
+        table.setEditTriggers(self.tableWidget.editTriggers())
+        table.setSelectionMode(self.tableWidget.selectionMode())
+        table.setSelectionBehavior(self.tableWidget.selectionBehavior())
+        table.setSortingEnabled(self.tableWidget.isSortingEnabled())
+        # set columns
+        table.setColumnCount(len(fields))
+        if fields:
+            table.setHorizontalHeaderLabels([self.tr(field.displayName()) for field in fields])
+            header = table.horizontalHeader()
             try:
-                self._form_tabs = [{"layer": None, "fields": fields, "features": features}]
-                self.setWindowTitle(self.tr("Search Results (Form): {0} items").format(len(features) if features else 0))
-                try:
-                    self.show()
-                except Exception:
-                    pass
+                header.setMinimumSectionSize(60)
             except Exception:
                 pass
-
-    def set_form_by_layer(self, layers_with_features):
-        """Placeholder API: set results for 'form' display mode with per-layer tabs.
-        Records the provided structures for later rendering.
-        """
-        # Concrete implementation: left = list of first-field values across features,
-        # right = attribute display for selected feature.
-        try:
-            self._form_tabs = []
-            total = 0
-            for layer, fields, features in layers_with_features:
-                try:
-                    features = list(features) if features is not None else []
-                except Exception:
-                    features = []
-                total += len(features) if features else 0
-                self._form_tabs.append({"layer": layer, "fields": fields, "features": features})
-
-            first_tab = self._form_tabs[0] if self._form_tabs else None
-            if not first_tab:
-                self.setWindowTitle(self.tr("Search Results (Form): 0 items"))
-                try:
-                    self.show()
-                except Exception:
-                    pass
-                return
-
-            features = first_tab.get('features') or []
-            fields = first_tab.get('fields') or []
-            if not features:
-                self.setWindowTitle(self.tr("Search Results (Form): 0 items"))
-                try:
-                    self.show()
-                except Exception:
-                    pass
-                return
-
-            # determine first field name
-            first_field_name = None
-            try:
-                if fields:
-                    f0 = fields[0]
-                    first_field_name = f0.name() if hasattr(f0, 'name') else str(f0)
-                else:
-                    # try derive from feature.fields()
-                    try:
-                        ff = list(features[0].fields())
-                        if ff:
-                            first_field_name = ff[0].name() if hasattr(ff[0], 'name') else str(ff[0])
-                    except Exception:
-                        first_field_name = None
-            except Exception:
-                first_field_name = None
-
-            # If the UI provides a `formWidget` with `formFieldList` and `formValueText`, prefer that.
-            try:
-                if getattr(self, 'formWidget', None) is not None and getattr(self, 'formFieldList', None) is not None and getattr(self, 'formValueText', None) is not None:
-                    list_widget = self.formFieldList
-                    value_widget = self.formValueText
-                    # ensure it's visible and hide the tabWidget
-                    try:
-                        self.tabWidget.setVisible(False)
-                    except Exception:
-                        pass
-                    try:
-                        self.formWidget.setVisible(True)
-                    except Exception:
-                        pass
-                    try:
-                        splitter = getattr(self, 'formWidget', None)
-                        if splitter is not None:
-                            try:
-                                # prefer stretch factors
-                                splitter.setStretchFactor(0, 2)
-                                splitter.setStretchFactor(1, 8)
-                            except Exception:
-                                pass
-                            try:
-                                # ensure sizes respect the current widget width by using proportions
-                                from qgis.PyQt.QtCore import QCoreApplication
-                                QCoreApplication.processEvents()
-                                total = splitter.width() or self.width() or 1000
-                                left = int(total * 0.2)
-                                right = max(1, total - left)
-                                splitter.setSizes([left, right])
-                            except Exception:
-                                try:
-                                    splitter.setSizes([200, 800])
-                                except Exception:
-                                    pass
-                    except Exception:
-                        pass
-                else:
-                    from qgis.PyQt.QtWidgets import QWidget, QHBoxLayout, QListWidget, QTextEdit, QListWidgetItem
-                    container = QWidget(self)
-                    layout = QHBoxLayout(container)
-                    list_widget = QListWidget(container)
-                    value_widget = QTextEdit(container)
-                    value_widget.setReadOnly(True)
-                    layout.addWidget(list_widget)
-                    layout.addWidget(value_widget)
-            except Exception:
-                return
-
-            # prepare combos if present
-            table_combo = getattr(self, 'formTableCombo', None)
-            column_combo = getattr(self, 'formColumnCombo', None)
-            top_combo = getattr(self, 'formAttributeCombo', None)
-
-            # helper to populate left list given a field name and feature list
-            def _populate_left_for_field(field_name, feats=None):
-                if feats is None:
-                    feats = features
-                self._form_feature_map = []
-                try:
-                    from qgis.PyQt.QtWidgets import QListWidgetItem
-                except Exception:
-                    QListWidgetItem = None
-                try:
-                    list_widget.clear()
-                except Exception:
-                    pass
-                for feat in (feats or []):
-                    try:
-                        if field_name:
-                            try:
-                                v = feat.attribute(field_name)
-                            except Exception:
-                                try:
-                                    v = feat[field_name]
-                                except Exception:
-                                    v = ''
-                        else:
-                            try:
-                                v = feat.id()
-                            except Exception:
-                                v = ''
-                        try:
-                            if QListWidgetItem is not None:
-                                item = QListWidgetItem(str(v))
-                                try:
-                                    item.setData(self.data_role, feat.id())
-                                except Exception:
-                                    pass
-                                list_widget.addItem(item)
-                            else:
-                                list_widget.addItem(str(v))
-                        except Exception:
-                            try:
-                                list_widget.addItem(str(v))
-                            except Exception:
-                                pass
-                        self._form_feature_map.append(feat)
-                    except Exception:
-                        continue
-
-            # initially populate with the first_field_name
-            _populate_left_for_field(first_field_name, features)
-
-            # connect selection -> show attributes of selected feature
-            def _on_select():
+            for i in range(len(fields)):
                 try:
-                    row = list_widget.currentRow()
-                    if row < 0 or row >= len(self._form_feature_map):
-                        value_widget.setPlainText('')
-                        return
-                    f = self._form_feature_map[row]
-                    # build attribute text
-                    lines = []
-                    # prefer fields order if available
-                    try:
-                        fld_objs = fields if fields else list(f.fields())
-                    except Exception:
-                        fld_objs = []
-                    if fld_objs:
-                        for fo in fld_objs:
-                            try:
-                                fname = fo.name() if hasattr(fo, 'name') else str(fo)
-                                try:
-                                    val = f.attribute(fname)
-                                except Exception:
-                                    try:
-                                        val = f[fname]
-                                    except Exception:
-                                        val = ''
-                                lines.append(f"{fname}: {val}")
-                            except Exception:
-                                continue
-                    else:
-                        # fallback: use attribute names from feature
-                        try:
-                            for k in f.fields():
-                                try:
-                                    kn = k.name() if hasattr(k, 'name') else str(k)
-                                    try:
-                                        val = f.attribute(kn)
-                                    except Exception:
-                                        val = ''
-                                    lines.append(f"{kn}: {val}")
-                                except Exception:
-                                    continue
-                        except Exception:
-                            # final fallback: attributes() list
-                            try:
-                                attrs = f.attributes()
-                                for i, v in enumerate(attrs):
-                                    lines.append(f"{i}: {v}")
-                            except Exception:
-                                lines = [str(f)]
-                    value_widget.setPlainText('\n'.join(lines))
+                    header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
                 except Exception:
                     try:
-                        value_widget.setPlainText('')
+                        header.setSectionResizeMode(i, QHeaderView.Stretch)
                     except Exception:
                         pass
-
-            list_widget.currentRowChanged.connect(lambda _: _on_select())
-
-            # Forward QListWidget selection/click signals to dialog-level signals
-            # so external callers (e.g., SearchFeature.zoom_items) receive the
-            # same events as when using table widgets and can perform pan/zoom.
-            try:
-                list_widget.currentRowChanged.connect(lambda _: self.selectionChanged.emit())
-            except Exception:
-                pass
             try:
-                # emit itemPressed when an item is pressed/clicked
-                list_widget.itemPressed.connect(lambda it: self.itemPressed.emit(it))
-            except Exception:
-                pass
-            try:
-                # also forward itemClicked for mouse click compatibility
-                list_widget.itemClicked.connect(lambda it: self.itemPressed.emit(it))
-            except Exception:
-                pass
-
-            # wire column_combo to update left list when available
-            try:
-                if column_combo is not None:
-                    def _on_column(idx):
-                        try:
-                            if idx < 0:
-                                return
-                            try:
-                                col = column_combo.itemText(idx)
-                            except Exception:
-                                col = None
-                            if col:
-                                _populate_left_for_field(col, self._form_feature_map or features)
-                        except Exception:
-                            pass
-                    column_combo.currentIndexChanged.connect(_on_column)
+                header.setStretchLastSection(True)
             except Exception:
                 pass
+        # connect signals
+        table.itemSelectionChanged.connect(lambda: self.selectionChanged.emit())
+        table.itemPressed.connect(lambda item: self.itemPressed.emit(item))
+        try:
+            page.layout().addWidget(table)
+        except Exception:
+            pass
+        tab["table"] = table
+        try:
+            from qgis.core import QgsMessageLog
+            QgsMessageLog.logMessage(f"_ensure_tab_table: built table for layer={getattr(tab.get('layer'), 'name', lambda: None)() if tab.get('layer') else 'None'} features={len(tab.get('features') or [])}", "GEO-search-plugin", 0)
+        except Exception:
+            pass
+        return table
 
-            # wire table_combo to switch feature set and refresh column list
-            try:
-                if table_combo is not None:
-                    try:
-                        table_combo.clear()
-                        for t in self._form_tabs:
-                            layer = t.get('layer')
-                            try:
-                                name = layer.name() if layer is not None else self.tr('Results')
-                            except Exception:
-                                name = str(layer)
-                            table_combo.addItem(str(name))
-
-                        def _on_table(idx):
-                            try:
-                                if idx < 0 or idx >= len(self._form_tabs):
-                                    return
-                                sel = self._form_tabs[idx]
-                                feats = sel.get('features') or []
-                                flds = sel.get('fields') or []
-                                # populate column combo
-                                if column_combo is not None:
-                                    try:
-                                        column_combo.clear()
-                                        cols = [f.name() if hasattr(f, 'name') else str(f) for f in flds]
-                                        for c in cols:
-                                            column_combo.addItem(str(c))
-                                    except Exception:
-                                        pass
-                                # repopulate left using first column or fid
-                                try:
-                                    if flds:
-                                        first = flds[0].name() if hasattr(flds[0], 'name') else str(flds[0])
-                                        _populate_left_for_field(first, feats)
-                                    else:
-                                        _populate_left_for_field(None, feats)
-                                except Exception:
-                                    _populate_left_for_field(None, feats)
-                            except Exception:
-                                pass
+    def set_form(self, fields, features):
+        """Set results for 'form' display mode (single layer)."""
+        # For single-layer form mode, delegate to set_form_by_layer with single entry
+        try:
+            self.set_form_by_layer([(None, fields, features)])
+        except Exception:
+            pass
 
-                        table_combo.currentIndexChanged.connect(_on_table)
-                        if table_combo.count() > 0:
-                            table_combo.setCurrentIndex(0)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+    def set_form_by_layer(self, layers_with_features):
+        """Set results and show them in 'form' display mode.
+        Tabs are prepared as for the table view; the form shows the active tab.
+        """
+        try:
+            self.set_features_by_layer(layers_with_features)
+        except Exception:
+            return
+        self._show_form()
+        try:
+            self.show()
+        except Exception:
+            pass
 
-            # wire top-level attribute combo to mirror column choices if present
+    def _tab_field_names(self, tab):
+        """タブのフィールド名一覧を返す（フォーム表示用にタブ単位でキャッシュ）"""
+        names = tab.get("field_names")
+        if names is not None:
+            return names
+        names = []
+        try:
+            for f in tab.get("fields") or []:
+                names.append(f.name() if hasattr(f, 'name') else str(f))
+        except Exception:
+            names = []
+        if not names:
+            # fallback derive from features
             try:
-                if top_combo is not None:
-                    try:
-                        # if column_combo exists, copy its items
-                        top_combo.clear()
-                        cols = []
-                        try:
-                            if column_combo is not None and column_combo.count() > 0:
-                                for i in range(column_combo.count()):
-                                    top_combo.addItem(column_combo.itemText(i))
-                            else:
-                                # derive from fields
-                                if fields:
-                                    for f in fields:
-                                        name = f.name() if hasattr(f, 'name') else (f.displayName() if hasattr(f, 'displayName') else str(f))
-                                        top_combo.addItem(str(name))
-                        except Exception:
-                            pass
-                        try:
-                            top_combo.setVisible(True)
-                        except Exception:
-                            pass
-                        def _on_top(idx):
-                            try:
-                                if idx < 0:
-                                    return
-                                try:
-                                    name = top_combo.itemText(idx)
-                                except Exception:
-                                    name = None
-                                if name and column_combo is not None:
-                                    # find same name in column_combo
-                                    try:
-                                        for i in range(column_combo.count()):
-                                            if column_combo.itemText(i) == name:
-                                                column_combo.setCurrentIndex(i)
-                                                return
-                                    except Exception:
-                                        pass
-                                    # fallback: directly populate left
-                                _populate_left_for_field(name)
-                            except Exception:
-                                pass
-                        try:
-                            top_combo.currentIndexChanged.connect(_on_top)
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
+                feats = tab.get("features") or []
+                if feats:
+                    names = [f.name() if hasattr(f, 'name') else str(f) for f in feats[0].fields()]
             except Exception:
-                pass
+                names = []
+        tab["field_names"] = names
+        return names
 
-            # clear existing tabs and insert the container as a single tab
-            try:
-                while self.tabWidget.count() > 0:
-                    self.tabWidget.removeTab(0)
-            except Exception:
-                pass
-            try:
-                self.tabWidget.addTab(container, self.tr('Form'))
-            except Exception:
+    def _show_form(self):
+        """フォーム表示に切り替える。
+        左のリストは遅延モデルで表示行のみ値を取得し、右側は選択地物のみ描画する。
+        同じタブへの再切り替えではモデルと項目一覧を作り直さない。
+        """
+        idx = self.tabWidget.currentIndex()
+        if idx < 0 or idx >= len(self._tabs):
+            return
+        tab = self._tabs[idx]
+        features = tab.get("features") or []
+        if self._form_tab is not tab:
+            names = self._tab_field_names(tab)
+            combo = getattr(self, 'formAttributeCombo', None)
+            if combo is not None:
                 try:
-                    self.tabWidget.insertTab(0, container, self.tr('Form'))
-                except Exception:
-                    pass
-
-            # update internal tab mapping to point to our list widget as table for selection handlers
+                    combo.blockSignals(True)
+                    combo.clear()
+                    for n in names:
+                        combo.addItem(str(n))
+                    if names:
+                        combo.setCurrentIndex(0)
+                finally:
+                    combo.blockSignals(False)
+            self._form_model.set_features(features, names[0] if names else None)
+            self._form_tab = tab
             try:
-                self._tabs = [{"layer": first_tab.get('layer'), "fields": fields, "features": features, "table": list_widget}]
-                self.current_table = list_widget
+                self.formValueText.setPlainText('')
             except Exception:
                 pass
-
-            # auto-select first item to show its attributes
+        try:
+            self.tabWidget.setVisible(False)
+            self.formWidget.setVisible(True)
+        except Exception:
+            pass
+        if not self._form_layout_done:
             try:
-                if list_widget.count() > 0:
-                    list_widget.setCurrentRow(0)
+                splitter = self.formWidget
+                splitter.setStretchFactor(0, 2)
+                splitter.setStretchFactor(1, 8)
+                total = splitter.width() or self.width() or 1000
+                left = int(total * 0.2)
+                splitter.setSizes([left, max(1, total - left)])
+                self._form_layout_done = True
             except Exception:
                 pass
+        self.current_table = self.formFieldList
+        self.display_mode = 'form'
+        try:
+            self.modeToggleButton.setText(self.tr('Table'))
+        except Exception:
+            pass
+        try:
+            self.formAttributeCombo.setVisible(True)
+        except Exception:
+            pass
+        # auto-select first item to show its attributes
+        try:
+            if not self.formFieldList.currentIndex().isValid() and self._form_model.rowCount() > 0:
+                self.formFieldList.setCurrentIndex(self._form_model.index(0))
+        except Exception:
+            pass
+        self.setWindowTitle(self.tr("Search Results (Form): {0} items").format(len(features)))
 
-            try:
-                from qgis.core import QgsMessageLog
-                QgsMessageLog.logMessage(f"set_form_by_layer: built form list with {len(self._form_feature_map)} items (first_field={first_field_name})", "GEO-search-plugin", 0)
-            except Exception:
-                pass
+    def _show_table(self):
+        """テーブル表示に戻す（既存のタブ・テーブルをそのまま再表示する）"""
+        try:
+            self.formWidget.setVisible(False)
+            self.tabWidget.setVisible(True)
+        except Exception:
+            pass
+        idx = self.tabWidget.currentIndex()
+        if 0 <= idx < len(self._tabs):
+            table = self._ensure_tab_table(self._tabs[idx])
+            if table is not None:
+                self.current_table = table
+        self.display_mode = 'table'
+        try:
+            self.modeToggleButton.setText(self.tr('Form'))
+        except Exception:
+            pass
+        try:
+            self.formAttributeCombo.setVisible(False)
+        except Exception:
+            pass
+        total = sum(len(t.get("features") or []) for t in self._tabs)
+        self.setWindowTitle(self.tr("Search Results: {0} items").format(total))
 
-            self.setWindowTitle(self.tr("Search Results (Form): {0} items").format(total))
-            try:
-                self.show()
-            except Exception:
-                pass
+    def _on_form_attribute_changed(self, idx):
+        # 左リストに表示する属性を切り替える（行は再作成しない）
+        if idx < 0:
+            return
+        try:
+            self._form_model.set_field_name(self.formAttributeCombo.itemText(idx))
         except Exception:
             pass
 
-    def set_feature_items(self, features, table=None, fields=None):
-        """Fill provided table with features using provided fields. If not given use current."""
+    def _on_form_current_changed(self, current, previous=None):
+        # render the attribute panel only for the selected feature
+        feature = self._form_model.feature(current.row()) if current.isValid() else None
+        if feature is None:
+            self.formValueText.setPlainText('')
+        else:
+            names = self._tab_field_names(self._form_tab) if self._form_tab is not None else []
+            lines = []
+            if names:
+                for name in names:
+                    try:
+                        lines.append(f"{name}: {format_attribute_value(feature.attribute(name))}")
+                    except Exception:
+                        continue
+            else:
+                # final fallback: attributes() list
+                try:
+                    for i, v in enumerate(feature.attributes()):
+                        lines.append(f"{i}: {v}")
+                except Exception:
+                    lines = [str(feature)]
+            self.formValueText.setPlainText('\n'.join(lines))
+        self.selectionChanged.emit()
+
+    def set_feature_items(self, features, table=None, fields=None, texts=None):
+        """Fill provided table with features using provided fields. If not given use current.
+        ``texts`` are prefetched cell strings (one list per feature) used instead of reading attributes.
+        """
         if table is None:
             table = self.current_table
         if fields is None:
@@ -888,10 +1100,20 @@ class ResultDialog(QDialog):
             QgsMessageLog.logMessage(f"set_feature_items: samples={sample_info}", "GEO-search-plugin", 0)
         except Exception:
             pass
-        for index, feature in enumerate(features):
-            for column, field in enumerate(fields):
-                item = self.create_item(field, feature)
-                table.setItem(index, column, item)
+        started = time.perf_counter()
+        elapsed = None
+        if texts is not None and len(texts) == len(features):
+            for index, feature in enumerate(features):
+                fid = feature.id()
+                for column, text in enumerate(texts[index][:len(fields)]):
+                    item = QTableWidgetItem(text)
+                    item.setData(self.data_role, fid)
+                    table.setItem(index, column, item)
+        else:
+            for index, feature in enumerate(features):
+                for column, field in enumerate(fields):
+                    item = self.create_item(field, feature)
+                    table.setItem(index, column, item)
         try:
             # ensure UI updates and columns are sized
             table.resizeColumnsToContents()
@@ -921,6 +1143,8 @@ class ResultDialog(QDialog):
                 pass
             # repaint and ensure the first cell is focused/visible
             table.repaint()
+            # 計測は同期の再描画まで（processEvents で処理される無関係なイベントは含めない）
+            elapsed = time.perf_counter() - started
             if table.rowCount() > 0 and table.columnCount() > 0:
                 try:
                     # make first cell current and visible
@@ -959,6 +1183,9 @@ class ResultDialog(QDialog):
                 pass
         except Exception:
             pass
+        # 項目の作成・列幅の調整・再描画を1ページの描画時間とする
+        if elapsed is not None:
+            self.pager.record(len(features), len(fields), elapsed)
 
     def create_item(self, field, feature):
         # 検索結果をテーブルにセットしていく
@@ -967,12 +1194,7 @@ class ResultDialog(QDialog):
         item = QTableWidgetItem()
         # アイテムに指定フィールドの属性をセット
         # 日付の場合の場合はも書式を指定して文字列に変換
-        val = feature.attribute(name)
-        if isinstance(val, QDate):
-            item.setText(QDate.toString(val, 'yyyy/M/d'))
-        else:
-            # その他はそのまま（Python3互換）
-            item.setText(str(val))
+        item.setText(format_attribute_value(feature.attribute(name)))
         item.setData(self.data_role, feature.id())
         return item
 
@@ -981,149 +1203,137 @@ class ResultDialog(QDialog):
         if index < 0 or index >= len(self._tabs):
             return
         tab = self._tabs[index]
-        self.current_table = tab.get("table")
-        # rewire table signals to dialog signals
+        # 初めて表示されたタブはここでテーブルを作成する
+        built = tab.get("table") is not None
+        table = self._ensure_tab_table(tab)
+        if table is None:
+            return
+        # table signals are connected once when the table is created
+        self.current_table = table
+        # update paging
+        self._update_page_controls(tab)
+        if not built and self.pageBox.value() == 1:
+            # valueChanged が発火しないため最初のページを直接描画する
+            self.move_page(1)
+        else:
+            self.pageBox.setValue(1)
+
+    def _result_dir(self):
+        # 既定の保存先は <project>/results（プロジェクト未保存ならホーム）
+        try:
+            from qgis.core import QgsProject
+            home = QgsProject.instance().homePath()
+        except Exception:
+            home = ''
+        if home:
+            return os.path.join(home, 'results')
+        return os.path.expanduser('~')
+
+    def save_result_set_dialog(self):
+        """現在の検索結果をファイルに保存する"""
+        from qgis.PyQt.QtWidgets import QFileDialog, QMessageBox
+        from .resultstore import RESULT_FILE_SUFFIX, build_layer_entry, save_result_set
+        tabs = [t for t in self._tabs if t.get("features")]
+        if not tabs:
+            QMessageBox.information(self, self.tr("Save Results"), self.tr("No results to save."))
+            return
+        default_dir = self._result_dir()
         try:
-            self.current_table.itemSelectionChanged.connect(lambda: self.selectionChanged.emit())
-            self.current_table.itemPressed.connect(lambda item: self.itemPressed.emit(item))
+            os.makedirs(default_dir, exist_ok=True)
         except Exception:
             pass
-        # update paging
-        features = tab.get("features") or []
-        max_page = math.ceil(len(features) / self.page_limit) if features else 1
-        self.pageBox.setMaximum(max_page)
-        self.pageLabel.setText(f" / {max_page}")
-        self.pageBox.setValue(1)
+        path, _ = QFileDialog.getSaveFileName(
+            self, self.tr("Save Results"), default_dir,
+            self.tr("GEO-search results (*{0})").format(RESULT_FILE_SUFFIX))
+        if not path:
+            return
+        try:
+            entries = [build_layer_entry(t.get("label"), t.get("layer"), t.get("fields"), t.get("features")) for t in tabs]
+            path = save_result_set(path, self.query, entries)
+            from qgis.core import QgsMessageLog
+            QgsMessageLog.logMessage(f"検索結果を保存しました: {path} ({sum(len(e['ids']) for e in entries)} 件)", "GEO-search-plugin", 0)
+        except Exception as e:
+            QMessageBox.warning(self, self.tr("Save Results"), self.tr("Failed to save results: {0}").format(e))
 
-    def _toggle_display_mode(self):
-        """Toggle between table and form display modes.
-        When switching to form mode we call the placeholder `set_form_by_layer`.
-        Switching back restores the table via `set_features_by_layer`.
+    def open_result_set_dialog(self):
+        """保存した検索結果ファイルを選んで開く"""
+        from qgis.PyQt.QtWidgets import QFileDialog
+        from .resultstore import RESULT_FILE_SUFFIX
+        path, _ = QFileDialog.getOpenFileName(
+            self, self.tr("Open Results"), self._result_dir(),
+            self.tr("GEO-search results (*{0})").format(RESULT_FILE_SUFFIX))
+        if path:
+            self.open_result_set(path)
+
+    def open_result_set(self, path):
+        """保存した検索結果を再検索なしで表示する。
+        保存後にレイヤが変更されていれば、変更分の再読込を確認する。
         """
+        from qgis.PyQt.QtWidgets import QMessageBox
+        from .resultstore import load_result_set, resolve_layer, is_stale, refresh_entry
         try:
-            if getattr(self, 'display_mode', 'table') == 'table':
-                # build layer tuples from current tabs
-                layers = []
-                for tab in getattr(self, '_tabs', []) or []:
-                    layers.append((tab.get('layer'), tab.get('fields'), tab.get('features')))
-                # call placeholder form API
+            data = load_result_set(path)
+        except Exception as e:
+            QMessageBox.warning(self, self.tr("Open Results"), self.tr("Failed to open results: {0}").format(e))
+            return
+        resolved = [(entry, resolve_layer(entry)) for entry in data["layers"]]
+        if not resolved:
+            return
+        self._show_result_entries(resolved)
+        self.query = data.get("query") or None
+        self.show()
+        stale = [(entry, layer) for entry, layer in resolved if is_stale(entry, layer)]
+        if not stale:
+            return
+        names = ', '.join(str(entry.get("label")) for entry, _ in stale)
+        answer = QMessageBox.question(
+            self, self.tr("Open Results"),
+            self.tr("These layers have changed since the results were saved:\n{0}\n\nRefresh the saved rows from the layers?").format(names))
+        if answer != QMessageBox.Yes:
+            return
+        changed = removed = 0
+        for entry, layer in stale:
+            try:
+                c, r = refresh_entry(entry, layer)
+                changed += c
+                removed += r
+            except Exception as e:
                 try:
-                    self.set_form_by_layer(layers)
+                    from qgis.core import QgsMessageLog
+                    QgsMessageLog.logMessage(f"検索結果の再読込に失敗しました: {entry.get('label')}: {e}", "GEO-search-plugin", 1)
                 except Exception:
                     pass
-                self.display_mode = 'form'
-                try:
-                    self.modeToggleButton.setText(self.tr('Table'))
-                except Exception:
-                    try:
-                        self.modeToggleButton.setText('Table')
-                    except Exception:
-                        pass
-                # populate and show the top-level attribute combo if present
-                try:
-                    combo = getattr(self, 'formAttributeCombo', None)
-                    if combo is not None:
-                        try:
-                            combo.clear()
-                            names = []
-                            try:
-                                tabs = getattr(self, '_form_tabs', []) or []
-                                if tabs:
-                                    flds = tabs[0].get('fields') or []
-                                    names = [ (f.displayName() if hasattr(f, 'displayName') else (f.name() if hasattr(f, 'name') else str(f))) for f in flds ]
-                                # fallback derive from features
-                                if not names:
-                                    try:
-                                        feats = tabs[0].get('features') or []
-                                        if feats:
-                                            ff = list(feats[0].fields())
-                                            names = [f.name() if hasattr(f, 'name') else str(f) for f in ff]
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                names = []
-                            for n in names:
-                                combo.addItem(str(n))
-                            try:
-                                combo.setVisible(True)
-                            except Exception:
-                                pass
-
-                            # sync selection to the internal formColumnCombo if present
-                            def _on_attr(idx):
-                                try:
-                                    if idx < 0:
-                                        return
-                                    try:
-                                        name = combo.itemText(idx)
-                                    except Exception:
-                                        name = None
-                                    if not name:
-                                        return
-                                    cc = getattr(self, 'formColumnCombo', None)
-                                    if cc is not None:
-                                        try:
-                                            for i in range(cc.count()):
-                                                if cc.itemText(i) == name:
-                                                    cc.setCurrentIndex(i)
-                                                    return
-                                            cc.addItem(name)
-                                            cc.setCurrentIndex(cc.count() - 1)
-                                        except Exception:
-                                            pass
-                                except Exception:
-                                    pass
+        self._show_result_entries(resolved)
+        try:
+            from qgis.core import QgsMessageLog
+            QgsMessageLog.logMessage(f"検索結果を再読込しました: 更新 {changed} 件, 削除 {removed} 件", "GEO-search-plugin", 0)
+        except Exception:
+            pass
 
-                            try:
-                                combo.currentIndexChanged.connect(_on_attr)
-                            except Exception:
-                                pass
-                            try:
-                                if combo.count() > 0:
-                                    combo.setCurrentIndex(0)
-                            except Exception:
-                                pass
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+    def _show_result_entries(self, resolved):
+        from .resultstore import snapshot_fields, snapshot_features
+        provider = self.query_provider
+        self.query_provider = None
+        try:
+            self.set_features_by_layer([((entry.get("label") or entry.get("layer_name") or "Results", layer),
+                                         snapshot_fields(entry), snapshot_features(entry))
+                                        for entry, layer in resolved])
+        finally:
+            self.query_provider = provider
+        # レイヤが見つからない結果は表示だけにし、ズーム・選択はしない（別のレイヤの同じIDを使わないため）
+        for index, (tab, (entry, layer)) in enumerate(zip(self._tabs, resolved)):
+            tab["unavailable"] = layer is None
+            if layer is None:
+                self.tabWidget.setTabToolTip(index, self.tr("Layer not found: {0}").format(entry.get("layer_name") or ""))
+
+    def _toggle_display_mode(self):
+        """Toggle between table and form display modes.
+        Both views are kept alive, so toggling only switches visibility.
+        """
+        try:
+            if getattr(self, 'display_mode', 'table') == 'table':
+                self._show_form()
             else:
-                # restore table view
-                # prefer using stored _form_tabs if available
-                source = getattr(self, '_form_tabs', None)
-                if source:
-                    layers = []
-                    for t in source:
-                        layers.append((t.get('layer'), t.get('fields'), t.get('features')))
-                    try:
-                        self.set_features_by_layer(layers)
-                    except Exception:
-                        pass
-                else:
-                    # fallback to current _tabs
-                    layers = []
-                    for tab in getattr(self, '_tabs', []) or []:
-                        layers.append((tab.get('layer'), tab.get('fields'), tab.get('features')))
-                    try:
-                        self.set_features_by_layer(layers)
-                    except Exception:
-                        pass
-                self.display_mode = 'table'
-                try:
-                    self.modeToggleButton.setText(self.tr('Form'))
-                except Exception:
-                    try:
-                        self.modeToggleButton.setText('Form')
-                    except Exception:
-                        pass
-                # hide top-level attribute combo when returning to table view
-                try:
-                    if getattr(self, 'formAttributeCombo', None) is not None:
-                        try:
-                            self.formAttributeCombo.setVisible(False)
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+                self._show_table()
         except Exception:
             pass
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+検索結果セットの保存・読み込み
+
+検索結果（検索条件・レイヤごとの地物ID・表示フィールドの値）を
+gzip 圧縮した JSON ファイルに保存し、再検索なしで結果ダイアログを
+復元できるようにする。
+
+ファイル形式:
+{
+  "format": "geo-search-result",
+  "version": 1,
+  "saved": "<ISO 日時>",
+  "query": {"title": ..., "values": [...]},
+  "layers": [
+    {
+      "label": タブ名,
+      "layer_id": ..., "layer_name": ..., "source": パスワードを除いたデータソース,
+      "fingerprint": 保存時のレイヤ指紋,
+      "fields": [フィールド名, ...],
+      "ids": [地物ID, ...],
+      "columns": [[1列目の値...], [2列目の値...], ...]
+    }
+  ]
+}
+
+値は列単位で保持する（行ごとの辞書を作らないためファイルもメモリも小さい）。
+QGIS に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+RESULT_FILE_FORMAT = "geo-search-result"
+RESULT_FILE_VERSION = 1
+RESULT_FILE_SUFFIX = ".georesult"
+
+
+def _json_value(val):
+    """属性値を JSON に保存できる値へ変換する"""
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    try:
+        # QVariant(NULL) は None として保存
+        if type(val).__name__ == "QVariant" and val.isNull():
+            return None
+    except Exception:
+        pass
+    try:
+        from .resultdialog import format_attribute_value
+
+        return format_attribute_value(val)
+    except Exception:
+        return str(val)
+
+
+def _layer_source_path(layer) -> Optional[str]:
+    """ファイルベースのレイヤならファイルパスを返す"""
+    try:
+        path = layer.source().split("|")[0]
+        if path and os.path.isfile(path):
+            return path
+    except Exception:
+        pass
+    return None
+
+
+_PASSWORD_RE = re.compile(r"""\bpassword\s*=\s*('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[^\s&|]*)\s*""", re.IGNORECASE)
+
+
+def safe_source(source) -> str:
+    """データソース URI からパスワードを除く（PostGIS・Oracle・WFS などの接続情報を保存しない）"""
+    if not source:
+        return source or ""
+    try:
+        from qgis.core import QgsDataSourceUri
+
+        source = QgsDataSourceUri.removePassword(source)
+    except Exception:
+        pass
+    # removePassword が扱わない形式（WFS の URL パラメータなど）も念のため除く
+    return _PASSWORD_RE.sub("", source).strip()
+
+
+def layer_fingerprint(layer) -> str:
+    """レイヤの変更検出用の指紋を返す。
+    ID・データソース・地物数・範囲、ファイルベースの場合は更新日時とサイズを使う。
+    """
+    parts = []
+    for getter in ("id", "source", "featureCount"):
+        try:
+            value = str(getattr(layer, getter)())
+            parts.append(safe_source(value) if getter == "source" else value)
+        except Exception:
+            parts.append("")
+    try:
+        parts.append(layer.extent().toString())
+    except Exception:
+        parts.append("")
+    path = _layer_source_path(layer)
+    if path:
+        try:
+            st = os.stat(path)
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+        except Exception:
+            pass
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _field_name(field) -> str:
+    return field.name() if hasattr(field, "name") else str(field)
+
+
+def build_layer_entry(label, layer, fields, features) -> Dict:
+    """結果タブ1つ分を保存用の辞書（列形式）に変換する"""
+    names = [_field_name(f) for f in (fields or [])]
+    ids = []
+    columns = [[] for _ in names]
+    for feat in features or []:
+        ids.append(feat.id())
+        for col, name in zip(columns, names):
+            try:
+                col.append(_json_value(feat.attribute(name)))
+            except Exception:
+                col.append(None)
+    entry = {
+        "label": label,
+        "layer_id": None,
+        "layer_name": None,
+        "source": None,
+        "fingerprint": None,
+        "fields": names,
+        "ids": ids,
+        "columns": columns,
+    }
+    if layer is not None:
+        try:
+            entry["layer_id"] = layer.id()
+            entry["layer_name"] = layer.name()
+            entry["source"] = safe_source(layer.source())
+            entry["fingerprint"] = layer_fingerprint(layer)
+        except Exception:
+            pass
+    return entry
+
+
+def save_result_set(path: str, query: Optional[Dict], entries: List[Dict]) -> str:
+    """結果セットを保存して保存先パスを返す"""
+    if not path.endswith(RESULT_FILE_SUFFIX):
+        path += RESULT_FILE_SUFFIX
+    data = {
+        "format": RESULT_FILE_FORMAT,
+        "version": RESULT_FILE_VERSION,
+        "saved": datetime.datetime.now().isoformat(timespec="seconds"),
+        "query": query or {},
+        "layers": entries,
+    }
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        fh.write(payload)
+    return path
+
+
+def load_result_set(path: str) -> Dict:
+    """保存した結果セットを読み込む。形式が違う場合は ValueError"""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, dict) or data.get("format") != RESULT_FILE_FORMAT:
+        raise ValueError(f"not a result set file: {path}")
+    data.setdefault("layers", [])
+    return data
+
+
+def resolve_layer(entry: Dict, project=None):
+    """保存時のレイヤをプロジェクトから探す（ID → 名前とソース）。
+
+    ソースが一致しない同名のレイヤは使わない（別のレイヤの地物IDにズームしないため）。
+    ソースを保存していない結果では、同名のレイヤが1つだけのときに限りそれを使う。
+    見つからなければ None。
+    """
+    if project is None:
+        from qgis.core import QgsProject
+
+        project = QgsProject.instance()
+    layer_id = entry.get("layer_id")
+    if layer_id:
+        layer = project.mapLayer(layer_id)
+        if layer is not None:
+            return layer
+    name = entry.get("layer_name")
+    if not name:
+        return None
+    candidates = project.mapLayersByName(name)
+    source = entry.get("source")
+    if not source:
+        return candidates[0] if len(candidates) == 1 else None
+    source = safe_source(source)
+    for layer in candidates:
+        try:
+            if safe_source(layer.source()) == source:
+                return layer
+        except Exception:
+            continue
+    return None
+
+
+def is_stale(entry: Dict, layer) -> bool:
+    """保存時からレイヤが変更されていれば True"""
+    if layer is None or not entry.get("fingerprint"):
+        return False
+    return layer_fingerprint(layer) != entry.get("fingerprint")
+
+
+class SnapshotField(object):
+    """保存された列名を QgsField と同じ呼び出しで扱うための軽量クラス"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        return self._name
+
+    def displayName(self):
+        return self._name
+
+
+class SnapshotFeature(object):
+    """保存された1行を QgsFeature と同じ呼び出しで扱うための軽量クラス。
+    値は entry の列リストを参照するだけでコピーしない。
+    """
+
+    __slots__ = ("_entry", "_row", "_index")
+
+    def __init__(self, entry, row, index):
+        self._entry = entry
+        self._row = row
+        self._index = index
+
+    def id(self):
+        return self._entry["ids"][self._row]
+
+    def attribute(self, name):
+        return self._entry["columns"][self._index[name]][self._row]
+
+    def __getitem__(self, name):
+        return self.attribute(name)
+
+    def attributes(self):
+        return [col[self._row] for col in self._entry["columns"]]
+
+    def fields(self):
+        return snapshot_fields(self._entry)
+
+
+def snapshot_fields(entry: Dict) -> List[SnapshotField]:
+    return [SnapshotField(n) for n in entry.get("fields", [])]
+
+
+def snapshot_features(entry: Dict) -> List[SnapshotFeature]:
+    index = {n: i for i, n in enumerate(entry.get("fields", []))}
+    return [SnapshotFeature(entry, row, index) for row in range(len(entry.get("ids", [])))]
+
+
+def refresh_entry(entry: Dict, layer) -> Tuple[int, int]:
+    """保存済みIDの地物だけをレイヤから読み直し、変更された行を更新する。
+
+    ジオメトリは読まず、表示フィールドのみを取得する。
+    削除された地物は結果から除く。戻り値は (更新行数, 削除行数)。
+    """
+    from qgis.core import QgsFeatureRequest
+
+    names = entry.get("fields", [])
+    ids = entry.get("ids", [])
+    request = QgsFeatureRequest().setFilterFids(ids)
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    try:
+        request.setSubsetOfAttributes(names, layer.fields())
+    except Exception:
+        pass
+    current = {}
+    for feat in layer.getFeatures(request):
+        current[feat.id()] = [_json_value(feat.attribute(n)) for n in names]
+
+    changed = 0
+    keep_rows = []
+    columns = entry.get("columns", [])
+    for row, fid in enumerate(ids):
+        values = current.get(fid)
+        if values is None:
+            continue
+        keep_rows.append(row)
+        if any(col[row] != v for col, v in zip(columns, values)):
+            changed += 1
+            for col, v in zip(columns, values):
+                col[row] = v
+    removed = len(ids) - len(keep_rows)
+    if removed:
+        entry["ids"] = [ids[r] for r in keep_rows]
+        entry["columns"] = [[col[r] for r in keep_rows] for col in columns]
+    entry["fingerprint"] = layer_fingerprint(layer)
+    return changed, removed
+
+
+__all__ = [
+    "RESULT_FILE_SUFFIX",
+    "safe_source",
+    "layer_fingerprint",
+    "build_layer_entry",
+    "save_result_set",
+    "load_result_set",
+    "resolve_layer",
+    "is_stale",
+    "SnapshotField",
+    "SnapshotFeature",
+    "snapshot_fields",
+    "snapshot_features",
+    "refresh_entry",
+]
@@ -24,6 +24,7 @@ from .constants import OTHER_GROUP_NAME
 UI_FILE = "dialog.ui"
 
 from .utils import set_project_variable, remove_entry_from_json_file
+from .themeregistry import shared_theme_registry
 
 
 class SearchDialog(QDialog):
@@ -1443,33 +1444,11 @@ class SearchDialog(QDialog):
                     from qgis.core import QgsProject
                     editor = QComboBox(edit_dialog)
                     editor.setObjectName(f"{field_name}_editor")
-                    # マップテーマ一覧を取得
+                    # マップテーマ一覧を取得（正規化済みの名前は登録簿から読む）
                     try:
-                        project = QgsProject.instance()
-                        theme_collection = project.mapThemeCollection()
-                        raw_themes = theme_collection.mapThemes() if theme_collection else []
+                        themes = shared_theme_registry().names()
                     except Exception:
-                        raw_themes = []
-
-                    # normalize theme list to names
-                    themes = []
-                    for t in (raw_themes or []):
-                        try:
-                            if isinstance(t, str):
-                                themes.append(t)
-                            else:
-                                if hasattr(t, 'name') and callable(getattr(t, 'name')):
-                                    themes.append(t.name())
-                                elif hasattr(t, 'name'):
-                                    themes.append(getattr(t, 'name'))
-                                elif hasattr(t, 'displayName') and callable(getattr(t, 'displayName')):
-                                    themes.append(t.displayName())
-                                elif hasattr(t, 'displayName'):
-                                    themes.append(getattr(t, 'displayName'))
-                                else:
-                                    themes.append(str(t))
-                        except Exception:
-                            continue
+                        themes = []
 
                     editor.addItem("")  # 空選択肢
                     for theme in themes:
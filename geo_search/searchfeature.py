@@ -17,9 +17,31 @@ from . import jaconv
 
 from .resultdialog import ResultDialog
 from .utils import name2layer, name2layers, unique_values, get_feature_by_id
+from .resultcache import unique_ids, merge_boxes, format_ids
+from .highlight import ResultHighlight
+from .layertree import shared_layer_tree_index
+from .themeregistry import shared_theme_registry
+from .overview import ClusterOverview
+from .navigation import NavigationCompositor, NavigationScheduler, ImagePanAnimation, set_canvas_center
+
+
+class _PressedItem(object):
+    """クリックされたアイテムの地物IDだけを保持する（item.data(role) と同じ呼び出しで使う）"""
+
+    __slots__ = ("_fid",)
+
+    def __init__(self, fid):
+        self._fid = fid
+
+    def data(self, role=None):
+        return self._fid
 
 
 class SearchFeature(object):
+    # zoom_features: これを超える未キャッシュ ID は地物ごとの範囲を読まず、プロバイダで範囲を集計する
+    ZOOM_FETCH_LIMIT = 500
+    # zoom_features: 詳細ログを出す地物数の上限
+    ZOOM_LOG_FEATURES = 5
 
     @property
     def layer(self):
@@ -48,16 +70,57 @@ class SearchFeature(object):
         self.features = []
         self.data_role = 15
         self.andor = andor
-        self.result_dialog = ResultDialog(widget.parent(), page_limit=page_limit)
+        # PageLimit: 1ページの上限行数, PageFillTargetMs: 1ページの目標描画時間 (0 で固定ページ)
+        self.result_dialog = ResultDialog(
+            widget.parent(),
+            page_limit=setting.get("PageLimit", page_limit),
+            page_target_ms=setting.get("PageFillTargetMs", 50),
+        )
+        self.result_dialog.query_provider = self.describe_query
+        try:
+            self.result_dialog.canvas = iface.mapCanvas()
+        except Exception:
+            pass
+        # extent, scale and rotation changes are composed into one canvas render per navigation
+        self.navigator = NavigationCompositor()
+        self._pan_animation = None
+        # HighlightMode: "highlight" draws results as one overlay (default),
+        # "selection" selects them on the layer (notifies the attribute table and other plugins)
+        self.highlight_mode = str(setting.get("HighlightMode", "highlight")).lower()
+        self.highlighter = ResultHighlight()
+        # (layer, ids, bucket) of a highlight still waiting for its geometries
+        self._pending_highlight = None
+        self._scale_connected = False
+        self.result_dialog.highlight_results = self.highlight_mode != "selection"
+        try:
+            self.result_dialog.finished.connect(self._clear_highlight)
+            # 強調表示は単純化前のジオメトリで先に描き、単純化が終わったら差し替える
+            self.result_dialog.geometriesReady.connect(self._on_geometries_ready)
+        except Exception:
+            pass
+        # clustered overview of large result sets (toggled from the result dialog)
+        self.overview = None
+        try:
+            self.result_dialog.overviewToggled.connect(self.show_overview)
+            self.result_dialog.finished.connect(self._close_overview)
+        except Exception:
+            pass
+        # bursts of selection changes (click = press + selection, held arrow keys) are coalesced
+        # into one zoom to the latest selection; NavigationIdleMs: idle window in milliseconds
+        self.nav_scheduler = NavigationScheduler(
+            self.zoom_items,
+            idle_ms=setting.get("NavigationIdleMs", 120),
+            on_cancel=self._cancel_navigation,
+        )
         # Connect to dialog-level signals (ResultDialog forwards table signals)
         try:
-            self.result_dialog.selectionChanged.connect(self.zoom_items)
-            self.result_dialog.itemPressed.connect(self.zoom_items)
+            self.result_dialog.selectionChanged.connect(self.request_zoom)
+            self.result_dialog.itemPressed.connect(self.request_zoom)
         except Exception:
             # fallback to legacy table widget signals if necessary
             try:
-                self.result_dialog.tableWidget.itemSelectionChanged.connect(self.zoom_items)
-                self.result_dialog.tableWidget.itemPressed.connect(self.zoom_items)
+                self.result_dialog.tableWidget.itemSelectionChanged.connect(self.request_zoom)
+                self.result_dialog.tableWidget.itemPressed.connect(self.request_zoom)
             except Exception:
                 pass
 
@@ -285,6 +348,16 @@ class SearchFeature(object):
             return False
         return True
 
+    def describe_query(self):
+        """検索条件（タイトルと入力値）を返す。検索結果の保存に使う"""
+        values = []
+        for w in getattr(self.widget, 'search_widgets', None) or []:
+            try:
+                values.append(w.text())
+            except Exception:
+                continue
+        return {"title": self.title, "values": values}
+
     def load(self):
         raise NotImplementedError
 
@@ -342,6 +415,39 @@ class SearchFeature(object):
         value = item.data(self.data_role)
         self.zoom_features([value])
 
+    def request_zoom(self, item=None):
+        """選択変更・クリックからのズーム要求。短い待ち時間の間の要求はまとめて最後の1回だけズームする"""
+        # 押された行の地物IDは今取り出しておく（ページ移動などでアイテムが破棄されても使えるように）
+        if item is not None:
+            try:
+                item = _PressedItem(item.data(self.data_role))
+            except Exception:
+                item = None
+        self.nav_scheduler.request(item)
+
+    def _cancel_navigation(self):
+        """実行中のパンアニメーションを止める（新しい選択が来たら待たせずに中止する）"""
+        animation = getattr(self, '_pan_animation', None)
+        if animation is not None:
+            animation.cancel()
+            self._pan_animation = None
+
+    def _current_tab_layer(self):
+        """現在のタブのレイヤ。保存した結果でレイヤが見つからないタブは None（ズームしない）"""
+        try:
+            idx = getattr(self.result_dialog, 'tabWidget', None).currentIndex()
+            tab = self.result_dialog._tabs[idx]
+        except Exception:
+            return self.layer
+        if tab.get('unavailable'):
+            try:
+                from qgis.core import QgsMessageLog
+                QgsMessageLog.logMessage(f"zoom_items: layer of saved results is not available: {tab.get('label')}", "GEO-search-plugin", 1)
+            except Exception:
+                pass
+            return None
+        return tab.get('layer') or self.layer
+
     def zoom_items(self, item=None):
         # support tabbed tables: prefer dialog's current_table if present
         table = getattr(self.result_dialog, 'current_table', None) or getattr(self.result_dialog, 'tableWidget', None)
@@ -357,25 +463,18 @@ class SearchFeature(object):
             except Exception:
                 pass
             # determine target layer for current tab
-            try:
-                idx = getattr(self.result_dialog, 'tabWidget', None).currentIndex()
-                tab = self.result_dialog._tabs[idx]
-                layer = tab.get('layer') or self.layer
-            except Exception:
-                layer = self.layer
-
+            layer = self._current_tab_layer()
+            if layer is None:
+                return
             self.zoom_features([fid], layer=layer)
             return
 
-        items = table.selectedItems()
+        # form mode uses a QListView (model based) which has no selectedItems()
+        items = table.selectedItems() if hasattr(table, 'selectedItems') else []
         # determine the layer associated with the currently visible tab (if available)
-        layer = None
-        try:
-            idx = getattr(self.result_dialog, 'tabWidget', None).currentIndex()
-            tab = self.result_dialog._tabs[idx]
-            layer = tab.get('layer') or self.layer
-        except Exception:
-            layer = self.layer
+        layer = self._current_tab_layer()
+        if layer is None:
+            return
 
         ids = [item.data(self.data_role) for item in items]
         # if no items returned (depends on selection mode), try to gather ids by selected rows/indexes
@@ -387,7 +486,15 @@ class SearchFeature(object):
                 pass
             rows = set()
             try:
-                indexes = table.selectedIndexes()
+                if not hasattr(table, 'item'):
+                    # list model: the feature id is exposed on the index itself
+                    indexes = table.selectionModel().selectedIndexes()
+                    for idx in indexes:
+                        v = idx.data(self.data_role)
+                        if v is not None:
+                            ids.append(v)
+                else:
+                    indexes = table.selectedIndexes()
                 for idx in indexes:
                     rows.add(idx.row())
             except Exception:
@@ -400,7 +507,7 @@ class SearchFeature(object):
                     rows = set()
 
             # collect ids from first non-empty column cell in each row
-            for r in sorted(rows):
+            for r in (sorted(rows) if hasattr(table, 'item') else []):
                 cols = table.columnCount()
                 fid = None
                 for c in range(cols):
@@ -419,7 +526,7 @@ class SearchFeature(object):
             # log selection and target layer
             from qgis.core import QgsMessageLog
             layer_name = layer.name() if layer is not None else 'None'
-            QgsMessageLog.logMessage(f"zoom_items: selected {len(ids)} items on layer={layer_name}, ids={ids}", "GEO-search-plugin", 0)
+            QgsMessageLog.logMessage(f"zoom_items: selected {len(ids)} items on layer={layer_name}, ids={format_ids(ids)}", "GEO-search-plugin", 0)
         except Exception:
             pass
 
@@ -435,14 +542,7 @@ class SearchFeature(object):
                 feature_ids = []
 
         # normalize ids to ints and remove duplicates
-        ids = []
-        for fid in feature_ids:
-            try:
-                i = int(fid)
-            except Exception:
-                continue
-            if i not in ids:
-                ids.append(i)
+        ids = unique_ids(feature_ids)
 
         if not ids:
             try:
@@ -483,26 +583,22 @@ class SearchFeature(object):
         try:
             from qgis.core import QgsMessageLog
             layer_name = getattr(target_layer, 'name', lambda: 'Unknown')()
-            QgsMessageLog.logMessage(f"zoom_features: attempting selectByIds on layer={layer_name} ids={ids}", "GEO-search-plugin", 0)
-            target_layer.selectByIds(ids)
-            try:
-                QgsMessageLog.logMessage(f"zoom_features: selectByIds called (ids count={len(ids)})", "GEO-search-plugin", 0)
-                # log actual selected ids on the layer to verify selection
+            select_layer = self.highlight_mode == "selection"
+            highlighted = False
+            if select_layer:
+                QgsMessageLog.logMessage(f"zoom_features: attempting selectByIds on layer={layer_name} ids={format_ids(ids)}", "GEO-search-plugin", 0)
+                target_layer.selectByIds(ids)
                 try:
-                    sel_ids = []
+                    QgsMessageLog.logMessage(f"zoom_features: selectByIds called (ids count={len(ids)})", "GEO-search-plugin", 0)
+                    # log the selection size on the layer to verify selection
                     try:
-                        sel_ids = list(target_layer.selectedFeatureIds())
+                        QgsMessageLog.logMessage(f"zoom_features: layer selected count after selectByIds={target_layer.selectedFeatureCount()}", "GEO-search-plugin", 0)
                     except Exception:
-                        try:
-                            # older API
-                            sel_ids = list(target_layer.selectedFeaturesIds())
-                        except Exception:
-                            sel_ids = []
-                    QgsMessageLog.logMessage(f"zoom_features: layer selected ids after selectByIds={sel_ids}", "GEO-search-plugin", 0)
+                        pass
                 except Exception:
                     pass
-            except Exception:
-                pass
+            else:
+                highlighted = self._highlight(target_layer, ids)
             mode = int(getattr(self, 'pan_mode', 0) or 0)
             # if mode==6 -> selection-only: do not change view
             if mode == 6:
@@ -515,39 +611,75 @@ class SearchFeature(object):
             except Exception:
                 canvas = None
 
-            # fetch feature objects for the requested ids
-            features = []
+            # 地物範囲（キャンバス CRS）は範囲キャッシュとメモリ上の検索結果から得る
+            extent_boxes = {}
+            missing = ids
             try:
-                from qgis.core import QgsFeatureRequest, QgsMessageLog
-                request = QgsFeatureRequest().setFilterFids(ids)
-                features = list(target_layer.getFeatures(request))
+                _, extent_boxes, missing = self.result_dialog.feature_extents(target_layer, ids)
+            except Exception:
+                extent_boxes, missing = {}, ids
+
+            # ids that are not part of the cached results: many of them are aggregated by the
+            # provider in one call, a few are read as per-id extents (no attributes), whatever
+            # the highlight mode
+            features = []
+            aggregate_bbox = None
+            if missing and highlighted and self.highlighter.extent is not None:
+                # 強調表示で読み込んだジオメトリの範囲（レイヤ CRS）を使い、地物は読み直さない
+                from qgis.core import QgsRectangle
+                aggregate_bbox = QgsRectangle(self.highlighter.extent)
+            elif len(missing) > self.ZOOM_FETCH_LIMIT:
+                # キャッシュ済みの分も含めた全体の範囲（レイヤ CRS）
+                aggregate_bbox = self._aggregate_extent(target_layer, ids, selected=select_layer)
+                if aggregate_bbox is not None:
+                    QgsMessageLog.logMessage(f"zoom_features: provider extent of {len(ids)} ids (uncached={len(missing)})", "GEO-search-plugin", 0)
+            if missing and aggregate_bbox is None:
+                # 少数の ID（または集計できなかった場合）は地物ごとの範囲を読んでキャッシュする
                 try:
-                    QgsMessageLog.logMessage(f"zoom_features: fetched features via getFeatures, count={len(features)}", "GEO-search-plugin", 0)
+                    fetched = self.result_dialog.fetch_extents(target_layer, missing)
                 except Exception:
-                    pass
-            except Exception:
-                # best-effort fallback
+                    fetched = None
+                if fetched is not None:
+                    extent_boxes.update(fetched)
+                    missing = []
+            if missing and aggregate_bbox is None:
                 try:
-                    from qgis.core import QgsMessageLog
-                    QgsMessageLog.logMessage("zoom_features: getFeatures with setFilterFids failed, using fallback get_feature_by_id", "GEO-search-plugin", 1)
+                    from qgis.core import QgsFeatureRequest, QgsMessageLog
+                    request = QgsFeatureRequest().setFilterFids(missing)
+                    features = list(target_layer.getFeatures(request))
+                    try:
+                        QgsMessageLog.logMessage(f"zoom_features: fetched features via getFeatures, count={len(features)}", "GEO-search-plugin", 0)
+                    except Exception:
+                        pass
                 except Exception:
-                    pass
-                for fid in ids:
+                    # best-effort fallback
                     try:
-                        f = get_feature_by_id(target_layer, fid)
-                        if f is not None:
-                            features.append(f)
+                        from qgis.core import QgsMessageLog
+                        QgsMessageLog.logMessage("zoom_features: getFeatures with setFilterFids failed, using fallback get_feature_by_id", "GEO-search-plugin", 1)
+                    except Exception:
+                        pass
+                    for fid in missing:
+                        try:
+                            f = get_feature_by_id(target_layer, fid)
+                            if f is not None:
+                                features.append(f)
+                                try:
+                                    from qgis.core import QgsMessageLog
+                                    QgsMessageLog.logMessage(f"zoom_features: fallback got feature id={f.id()}", "GEO-search-plugin", 0)
+                                except Exception:
+                                    pass
+                        except Exception:
                             try:
                                 from qgis.core import QgsMessageLog
-                                QgsMessageLog.logMessage(f"zoom_features: fallback got feature id={f.id()}", "GEO-search-plugin", 0)
+                                QgsMessageLog.logMessage(f"zoom_features: fallback failed to get feature for fid={fid}", "GEO-search-plugin", 2)
                             except Exception:
                                 pass
+
+                if features:
+                    try:
+                        extent_boxes.update(self.result_dialog.store_extents(target_layer, features))
                     except Exception:
-                        try:
-                            from qgis.core import QgsMessageLog
-                            QgsMessageLog.logMessage(f"zoom_features: fallback failed to get feature for fid={fid}", "GEO-search-plugin", 2)
-                        except Exception:
-                            pass
+                        pass
 
             # detailed debug: log per-feature info and CRS
             try:
@@ -580,7 +712,8 @@ class SearchFeature(object):
                     canvas_crs_id = 'unknown'
                 QgsMessageLog.logMessage(f"zoom_features: layer_crs={layer_crs_id} canvas_crs={canvas_crs_id}", "GEO-search-plugin", 0)
                 QgsMessageLog.logMessage(f"zoom_features: iterating features count={len(features)}", "GEO-search-plugin", 0)
-                for f in features:
+                # per-feature details only for the first few features
+                for f in features[:self.ZOOM_LOG_FEATURES]:
                     try:
                         fid = f.id()
                         has_geom = False
@@ -625,9 +758,21 @@ class SearchFeature(object):
                     pass
 
             # compute bbox of features if available
+            # bbox_cached: bbox はキャッシュ由来でキャンバス CRS に変換済み
+            bbox_cached = False
+            trans_center = None
+            trans_bbox = None
             try:
                 bbox = None
-                if features:
+                if extent_boxes and aggregate_bbox is None:
+                    from qgis.core import QgsRectangle
+                    bbox = QgsRectangle(*merge_boxes(extent_boxes.values()))
+                    trans_bbox = QgsRectangle(bbox)
+                    trans_center = bbox.center()
+                    bbox_cached = True
+                elif aggregate_bbox is not None:
+                    bbox = aggregate_bbox
+                elif features:
                     for f in features:
                         try:
                             if bbox is None:
@@ -640,8 +785,6 @@ class SearchFeature(object):
                 bbox = None
 
             # prepare coordinate transform: convert layer CRS geometries to canvas CRS when needed
-            trans_center = None
-            trans_bbox = None
             try:
                 from qgis.core import QgsCoordinateTransform, QgsProject, QgsPointXY, QgsRectangle, QgsMessageLog
                 # obtain layer and canvas CRS
@@ -664,14 +807,19 @@ class SearchFeature(object):
                     except Exception:
                         canvas_crs = None
 
-                if layer_crs is not None and canvas_crs is not None and layer_crs != canvas_crs:
+                if not bbox_cached and layer_crs is not None and canvas_crs is not None and layer_crs != canvas_crs:
                     try:
-                        transform = QgsCoordinateTransform(layer_crs, canvas_crs, QgsProject.instance())
+                        # 変換は結果ダイアログのキャッシュから取得する（変換コンテキスト変更で破棄される）
+                        transform = None
+                        try:
+                            transform = self.result_dialog.transform_cache.get(layer_crs, canvas_crs)
+                        except Exception:
+                            transform = None
+                        if transform is None:
+                            transform = QgsCoordinateTransform(layer_crs, canvas_crs, QgsProject.instance())
                         if bbox is not None:
                             try:
-                                pmin = transform.transform(QgsPointXY(bbox.xMinimum(), bbox.yMinimum()))
-                                pmax = transform.transform(QgsPointXY(bbox.xMaximum(), bbox.yMaximum()))
-                                trans_bbox = QgsRectangle(min(pmin.x(), pmax.x()), min(pmin.y(), pmax.y()), max(pmin.x(), pmax.x()), max(pmin.y(), pmax.y()))
+                                trans_bbox = transform.transformBoundingBox(bbox)
                             except Exception:
                                 trans_bbox = None
                         if bbox is not None:
@@ -694,212 +842,62 @@ class SearchFeature(object):
             except Exception:
                 pass
 
-            # Mode dispatch with robust fallback
+            # Mode dispatch: the view change, configured scale and rotation are composed
+            # by the navigator so every navigation renders the canvas exactly once
             try:
-                from qgis.core import QgsMessageLog
+                from qgis.core import QgsMessageLog, QgsRectangle
                 QgsMessageLog.logMessage(f"zoom_features: mode={mode} canvas_present={canvas is not None}", "GEO-search-plugin", 0)
-                view_changed = False
-                animation_scheduled = False
+                if canvas is None:
+                    return
+                center = trans_center
+                if center is None and bbox is not None:
+                    center = bbox.center()
+                # 結果の範囲（キャンバス CRS）。レイヤを選択しない場合は zoomToSelected の代わりに使う
+                result_extent = trans_bbox if trans_bbox is not None else bbox
+                if result_extent is not None:
+                    result_extent = QgsRectangle(result_extent)
+                if select_layer or result_extent is None:
+                    zoom_to_result = lambda c: c.zoomToSelected(target_layer)
+                else:
+                    zoom_to_result = lambda c: c.zoomToFeatureExtent(result_extent)
+                view = None
 
                 # 0: zoom to selected (default)
                 if mode == 0:
-                    if canvas is not None:
-                        try:
-                            canvas.zoomToSelected(target_layer)
-                            QgsMessageLog.logMessage(f"zoom_features: zoomed to selected on layer={layer_name}", "GEO-search-plugin", 0)
-                            view_changed = True
-                        except Exception as e:
-                            QgsMessageLog.logMessage(f"zoom_features: zoomToSelected failed: {e}", "GEO-search-plugin", 2)
+                    if bbox_cached:
+                        # 範囲がキャッシュ済みなら zoomToSelected と同じ余白で直接ズーム
+                        cached_extent = QgsRectangle(trans_bbox)
+                        view = lambda c: c.zoomToFeatureExtent(cached_extent)
+                    else:
+                        view = zoom_to_result
 
                 # 1: center pan, keep zoom
-                if not view_changed and mode == 1 and bbox is not None and canvas is not None:
-                    try:
-                        center = trans_center if trans_center is not None else bbox.center()
-                        if center is not None:
-                            if hasattr(canvas, 'setCenter'):
-                                canvas.setCenter(center)
-                            else:
-                                try:
-                                    canvas.centerAt(center)
-                                except Exception:
-                                    try:
-                                        canvas.centerAt(center.x(), center.y())
-                                    except Exception:
-                                        pass
-                            canvas.refresh()
-                            view_changed = True
-                    except Exception as e:
-                        try:
-                            QgsMessageLog.logMessage(f"zoom_features: center pan failed: {e}", "GEO-search-plugin", 2)
-                        except Exception:
-                            pass
-
-                # mode 2 (feature center) removed per configuration; fall through to fallback behavior
-
-                # mode 3 (bbox fit with margin) removed per configuration; fall through to fallback behavior
-
-                # 4: fixed scale display
-                if not view_changed and mode == 4 and bbox is not None and canvas is not None:
-                    try:
-                        fs = getattr(self, 'fixed_scale', None)
-                        # If fixed_scale is None -> behave like mode==1 (center pan, keep zoom)
-                        if fs is None:
-                            center = trans_center if trans_center is not None else bbox.center()
-                            if center is not None:
-                                try:
-                                    if hasattr(canvas, 'setCenter'):
-                                        canvas.setCenter(center)
-                                    else:
-                                        canvas.centerAt(center)
-                                except Exception:
-                                    try:
-                                        canvas.centerAt(center.x(), center.y())
-                                    except Exception:
-                                        pass
-                                canvas.refresh()
-                                view_changed = True
-                        else:
-                            center = trans_center if trans_center is not None else bbox.center()
-                            if center is not None:
-                                try:
-                                    if hasattr(canvas, 'setCenter'):
-                                        canvas.setCenter(center)
-                                    else:
-                                        canvas.centerAt(center)
-                                except Exception:
-                                    try:
-                                        canvas.centerAt(center.x(), center.y())
-                                    except Exception:
-                                        pass
-                            # center and refresh; scale/rotation will be applied once after mode dispatch
-                            canvas.refresh()
-                            view_changed = True
-                    except Exception as e:
-                        try:
-                            QgsMessageLog.logMessage(f"zoom_features: fixed scale (mode4) outer failed: {e}", "GEO-search-plugin", 2)
-                        except Exception:
-                            pass
+                # 4: fixed scale display (center pan; the fixed scale is applied by the navigator,
+                #    without fixed_scale it behaves like mode 1)
+                # mode 2 (feature center) and mode 3 (bbox fit with margin) removed per configuration
+                elif mode in (1, 4) and center is not None:
+                    view = lambda c: set_canvas_center(c, center)
 
                 # 5: animated pan
-                if not view_changed and mode == 5 and bbox is not None and canvas is not None:
-                    try:
-                        from qgis.core import QgsPointXY
-                        from qgis.PyQt.QtCore import QTimer
-                        start = canvas.extent().center()
-                        end = trans_center if trans_center is not None else bbox.center()
-                        # more steps and longer duration for a slower, smoother animation
-                        steps = 20
-                        duration_ms = 800
-                        interval = max(int(duration_ms / steps), 10)
-                        state = {'i': 0}
-
-                        def _step():
-                            state['i'] += 1
-                            t = state['i'] / steps
-                            try:
-                                x = start.x() + (end.x() - start.x()) * t
-                                y = start.y() + (end.y() - start.y()) * t
-                                pt = QgsPointXY(x, y)
-                                if hasattr(canvas, 'setCenter'):
-                                    canvas.setCenter(pt)
-                                else:
-                                    try:
-                                        canvas.centerAt(pt)
-                                    except Exception:
-                                        try:
-                                            canvas.centerAt(pt.x(), pt.y())
-                                        except Exception:
-                                            pass
-                                canvas.refresh()
-                            except Exception:
-                                pass
-                            if state['i'] >= steps:
-                                try:
-                                    from qgis.core import QgsRectangle
-                                    # Use transformed bbox when available (canvas CRS). If not, fall back to original bbox.
-                                    use_bbox = trans_bbox if 'trans_bbox' in locals() and trans_bbox is not None else bbox
-                                    if use_bbox is not None:
-                                        dx = use_bbox.width() * 0.05
-                                        dy = use_bbox.height() * 0.05
-                                        expanded = QgsRectangle(use_bbox.xMinimum() - dx, use_bbox.yMinimum() - dy,
-                                                                 use_bbox.xMaximum() + dx, use_bbox.yMaximum() + dy)
-                                        # Log which bbox was used for the final extent and its values
-                                        try:
-                                            QgsMessageLog.logMessage(f"zoom_features: animated pan final extent used_bbox={'trans_bbox' if use_bbox is trans_bbox else 'bbox'} expanded={expanded}", "GEO-search-plugin", 0)
-                                        except Exception:
-                                            pass
-                                        canvas.setExtent(expanded)
-                                        canvas.refresh()
-                                        # (Previously applied scale/rotation here on animation completion.)
-                                        # Centralized application after mode dispatch will handle both animated
-                                        # and non-animated modes, so do not apply here to avoid duplication.
-                                except Exception:
-                                    pass
+                elif mode == 5 and center is not None:
+                    use_bbox = trans_bbox if trans_bbox is not None else bbox
+                    if self._animate_pan(canvas, center, use_bbox, target_layer):
+                        return
 
-                        for s in range(steps):
-                            QTimer.singleShot(s * interval, _step)
-                        view_changed = True
-                        animation_scheduled = True
+                if view is not None:
+                    try:
+                        self._navigate(canvas, view, target_layer)
+                        QgsMessageLog.logMessage(f"zoom_features: navigated mode={mode} on layer={layer_name} renders={self.navigator.render_count}", "GEO-search-plugin", 0)
+                        return
                     except Exception as e:
-                        try:
-                            QgsMessageLog.logMessage(f"zoom_features: animated pan failed: {e}", "GEO-search-plugin", 2)
-                        except Exception:
-                            pass
-
-                # after mode dispatch: if a view change happened and no animation is scheduled,
-                # apply scale and rotation once here (centralized)
-                try:
-                    if canvas is not None and view_changed:
-                        try:
-                            self._apply_scale_if_configured(canvas)
-                        except Exception:
-                            pass
-                        try:
-                            self._apply_rotation_if_configured(canvas)
-                        except Exception:
-                            pass
-                        try:
-                            # only ensure layer visibility when feature property show_layer_name is True
-                            if getattr(self, 'show_layer_name', False):
-                                try:
-                                    self._ensure_layer_visible(target_layer)
-                                except Exception:
-                                    pass
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+                        QgsMessageLog.logMessage(f"zoom_features: navigation failed: {e}", "GEO-search-plugin", 2)
 
                 # if nothing changed the view, try a final forced zoomToSelected
-                if not view_changed:
-                    try:
-                        if canvas is not None:
-                            try:
-                                canvas.zoomToSelected(target_layer)
-                                QgsMessageLog.logMessage(f"zoom_features: fallback zoomToSelected on layer={layer_name}", "GEO-search-plugin", 0)
-                                # apply scale/rotation for fallback path as well
-                                try:
-                                    self._apply_scale_if_configured(canvas)
-                                except Exception:
-                                    pass
-                                try:
-                                    self._apply_rotation_if_configured(canvas)
-                                except Exception:
-                                    pass
-                                try:
-                                    # only ensure layer visibility when feature property show_layer_name is True
-                                    if getattr(self, 'show_layer_name', False):
-                                        try:
-                                            self._ensure_layer_visible(target_layer)
-                                        except Exception:
-                                            pass
-                                except Exception:
-                                    pass
-                                return
-                            except Exception as e:
-                                QgsMessageLog.logMessage(f"zoom_features: fallback zoomToSelected failed: {e}", "GEO-search-plugin", 2)
-                    except Exception:
-                        pass
+                try:
+                    self._navigate(canvas, zoom_to_result, target_layer)
+                    QgsMessageLog.logMessage(f"zoom_features: fallback zoomToSelected on layer={layer_name}", "GEO-search-plugin", 0)
+                except Exception as e:
+                    QgsMessageLog.logMessage(f"zoom_features: fallback zoomToSelected failed: {e}", "GEO-search-plugin", 2)
 
             except Exception:
                 # final fallback
@@ -911,196 +909,254 @@ class SearchFeature(object):
         except Exception as e:
             try:
                 from qgis.core import QgsMessageLog
-                QgsMessageLog.logMessage(f"zoom_features: failed to zoom on layer={getattr(target_layer, 'name', lambda: 'Unknown')()} ids={ids} error={e}", "GEO-search-plugin", 0)
+                QgsMessageLog.logMessage(f"zoom_features: failed to zoom on layer={getattr(target_layer, 'name', lambda: 'Unknown')()} ids={format_ids(ids)} error={e}", "GEO-search-plugin", 0)
             except Exception:
                 pass
             return
 
-    def _apply_rotation_if_configured(self, canvas=None):
-        """もし設定に角度があれば、与えられた canvas（または iface.mapCanvas()）に対して回転を適用する。
-        呼び出し元は例外を捕捉するので、このメソッド内でも安全に例外を吸収する。
+    def _aggregate_extent(self, layer, ids, selected=False):
+        """ids の地物全体の範囲（レイヤ CRS）をプロバイダの boundingBoxOfSelected 1回で求める。
+
+        selected が False の場合は一時的に ids を選択し、シグナルを止めたまま元の選択に戻す
+        （再描画や属性テーブルの更新は起きない）。求められなければ None
         """
         try:
-            angle = self.setting.get("angle")
-            if angle is None:
-                return
+            if selected:
+                bbox = layer.boundingBoxOfSelected()
+            else:
+                previous = layer.selectedFeatureIds()
+                blocked = layer.blockSignals(True)
+                try:
+                    layer.selectByIds(ids)
+                    bbox = layer.boundingBoxOfSelected()
+                finally:
+                    layer.selectByIds(previous)
+                    layer.blockSignals(blocked)
+        except Exception:
+            return None
+        if bbox is None or bbox.isNull():
+            return None
+        return bbox
+
+    def _highlight(self, layer, ids):
+        """レイヤを選択せずに検索結果を1つのオーバーレイで強調表示する。表示できたら True
+        ジオメトリは現在の縮尺バケットで単純化したもの（結果ダイアログのキャッシュ）を使う。
+        """
+        try:
+            canvas = self.iface.mapCanvas()
+            bucket = self.result_dialog.scale_bucket(layer)
+            geoms = self.result_dialog.simplified_geometries(layer, ids, bucket)
+            shown = self.highlighter.show(layer, geoms.values(), canvas=canvas, bucket=bucket)
+            self.highlighter.ids = list(ids)
+            # ジオメトリがまだ読めていなければ geometriesReady で描く
+            self._pending_highlight = None if shown else (layer, list(ids), bucket)
+            if shown and not getattr(self, '_scale_connected', False):
+                # 縮尺バケットが変わったら単純化の度合いを合わせて描き直す
+                canvas.scaleChanged.connect(self._on_canvas_scale_changed)
+                self._scale_connected = True
+            try:
+                from qgis.core import QgsMessageLog
+                QgsMessageLog.logMessage(f"zoom_features: highlighted {self.highlighter.feature_count} features on layer={layer.name()} bucket={bucket}", "GEO-search-plugin", 0)
+            except Exception:
+                pass
+            return shown
+        except Exception as e:
             try:
-                a = float(angle)
+                from qgis.core import QgsMessageLog
+                QgsMessageLog.logMessage(f"zoom_features: highlight failed: {e}", "GEO-search-plugin", 2)
             except Exception:
-                # 非数値設定は無視
+                pass
+            return False
+
+    def _on_canvas_scale_changed(self, *args):
+        highlighter = self.highlighter
+        if not highlighter.is_active() or highlighter.layer is None:
+            return
+        try:
+            layer = highlighter.layer
+            bucket = self.result_dialog.scale_bucket(layer)
+            if bucket == highlighter.bucket:
                 return
+            ids = highlighter.ids
+            geoms = self.result_dialog.simplified_geometries(layer, ids, bucket)
+            highlighter.show(layer, geoms.values(), bucket=bucket)
+            highlighter.ids = ids
+        except Exception:
+            pass
 
-            if canvas is None:
-                try:
-                    canvas = self.iface.mapCanvas()
-                except Exception:
-                    canvas = None
-            if canvas is None:
+    def _on_geometries_ready(self, layer_id, bucket):
+        """バックグラウンドの単純化が終わったら、表示中の強調表示を単純化したジオメトリで描き直す"""
+        highlighter = self.highlighter
+        if highlighter.is_active() and highlighter.layer is not None:
+            layer, ids, shown_bucket = highlighter.layer, highlighter.ids, highlighter.bucket
+        elif self._pending_highlight is not None:
+            layer, ids, shown_bucket = self._pending_highlight
+        else:
+            return
+        try:
+            if layer.id() != layer_id or shown_bucket != bucket:
                 return
+            geoms = self.result_dialog.simplified_geometries(layer, ids, bucket)
+            if highlighter.show(layer, geoms.values(), canvas=self.iface.mapCanvas(), bucket=bucket):
+                self._pending_highlight = None
+            highlighter.ids = ids
+        except Exception:
+            pass
 
+    def _clear_highlight(self, *args):
+        self.highlighter.clear()
+        self._pending_highlight = None
+        if getattr(self, '_scale_connected', False):
             try:
-                # QGIS の Canvas API はバージョンによって差があるため複数候補を試す
-                if hasattr(canvas, 'setRotation'):
-                    canvas.setRotation(a)
-                elif hasattr(canvas, 'setMapRotation'):
-                    canvas.setMapRotation(a)
-                else:
-                    # 明示的なセット関数がなければプロパティに代入してみる
-                    try:
-                        setattr(canvas, 'rotation', a)
-                    except Exception:
-                        pass
-
-                # UI更新を強制
-                try:
-                    from qgis.PyQt.QtWidgets import QApplication
-                    QApplication.processEvents()
-                except Exception:
-                    pass
+                self.iface.mapCanvas().scaleChanged.disconnect(self._on_canvas_scale_changed)
+            except Exception:
+                pass
+            self._scale_connected = False
 
-                try:
-                    from qgis.core import QgsMessageLog
-                    QgsMessageLog.logMessage(f"_apply_rotation_if_configured: applied rotation={a}", "GEO-search-plugin", 0)
-                except Exception:
-                    pass
+    def show_overview(self, enabled=True):
+        """全タブの検索結果を格子クラスタで表示する（全体にズームし、クラスタのクリックで拡大）"""
+        try:
+            from qgis.core import QgsMessageLog, QgsRectangle
+            canvas = self.iface.mapCanvas()
+            if not enabled:
+                if self.overview is not None:
+                    self.overview.clear()
+                return
+            xs, ys, extent = self.result_dialog.result_centers()
+            if not xs:
+                self._uncheck_overview()
+                return
+            if self.overview is None:
+                self.overview = ClusterOverview(canvas, on_zoom=self._zoom_to_cluster,
+                                                on_closed=self._uncheck_overview)
+            full_extent = QgsRectangle(*extent)
+            self._navigate(canvas, lambda c: c.zoomToFeatureExtent(full_extent))
+            self.overview.show(xs, ys)
+            QgsMessageLog.logMessage(f"show_overview: {len(xs)} results in {len(self.overview.clusters)} clusters ({self.overview.last_ms:.1f} ms)", "GEO-search-plugin", 0)
+        except Exception as e:
+            try:
+                from qgis.core import QgsMessageLog
+                QgsMessageLog.logMessage(f"show_overview: failed: {e}", "GEO-search-plugin", 2)
             except Exception:
-                try:
-                    from qgis.core import QgsMessageLog
-                    QgsMessageLog.logMessage(f"_apply_rotation_if_configured: failed to apply rotation", "GEO-search-plugin", 2)
-                except Exception:
-                    pass
+                pass
+            self._uncheck_overview()
+
+    def _zoom_to_cluster(self, rect):
+        try:
+            self._navigate(self.iface.mapCanvas(), lambda c: c.zoomToFeatureExtent(rect))
         except Exception:
-            # 最上位の例外は無視
             pass
 
-    def _apply_scale_if_configured(self, canvas=None):
-        """設定（JSON の 'scale' または feature の fixed_scale 属性）に従ってスケールを適用する。
-        JSON の 'scale' が優先され、なければ self.fixed_scale を使う。canvas が None の場合は iface.mapCanvas() を取得する。
-        """
+    def _uncheck_overview(self):
         try:
-            if canvas is None:
-                try:
-                    canvas = self.iface.mapCanvas()
-                except Exception:
-                    canvas = None
-            if canvas is None:
-                return
+            button = self.result_dialog.overviewButton
+            button.blockSignals(True)
+            button.setChecked(False)
+            button.blockSignals(False)
+        except Exception:
+            pass
 
-            # JSON 設定の 'scale' を優先
-            try:
-                scale_val = self.setting.get('scale')
-            except Exception:
-                scale_val = None
+    def _close_overview(self, *args):
+        if self.overview is not None:
+            self.overview.dispose()
+            self.overview = None
+        self._uncheck_overview()
 
-            applied = False
-            if scale_val is not None:
-                try:
-                    s = float(scale_val)
-                    try:
-                        canvas.zoomScale(s)
-                        applied = True
-                    except Exception:
-                        try:
-                            canvas.zoomScale(int(s))
-                            applied = True
-                        except Exception:
-                            applied = False
-                except Exception:
-                    applied = False
+    def _navigate(self, canvas, view, layer=None):
+        """view(canvas) による表示変更と設定の縮尺・回転を1回の描画で適用する。
+        show_layer_name が有効ならレイヤの表示もキャンバスを止めている間に切り替える。
+        """
+        show_layer = bool(getattr(self, 'show_layer_name', False))
 
-            # JSON 設定がなければインスタンス属性 fixed_scale を参照
-            if not applied:
-                try:
-                    fs = getattr(self, 'fixed_scale', None)
-                except Exception:
-                    fs = None
-                if fs is not None:
-                    try:
-                        if isinstance(fs, (int, float)) and fs > 0:
-                            canvas.zoomScale(fs)
-                            applied = True
-                    except Exception:
-                        applied = False
+        def _view(c):
+            if view is not None:
+                view(c)
+            if show_layer:
+                self._ensure_layer_visible(layer)
+
+        self.navigator.apply(_view, scale=self._configured_scale(),
+                             rotation=self._configured_rotation(), canvas=canvas)
 
-            # 最低限のフォールバック値は設定しない（既存のコードは各分岐でフォールバックしていたため）
+    def _animate_pan(self, canvas, center, extent, layer=None):
+        """直前の描画画像をずらして center へパンし、最後に extent に合わせて1回だけ描画する。
+        アニメーションを開始できたら True を返す。
+        """
+        try:
+            from qgis.core import QgsRectangle
+            final_extent = QgsRectangle(extent) if extent is not None else None
+
+            def _final(c):
+                # 最終フレームは表示範囲・縮尺・回転をまとめて1回で描画する
+                if final_extent is not None:
+                    self._navigate(c, lambda cv: cv.zoomToFeatureExtent(final_extent), layer)
+                else:
+                    self._navigate(c, lambda cv: set_canvas_center(cv, center), layer)
+
+            previous = getattr(self, '_pan_animation', None)
+            if previous is not None:
+                previous.cancel()
+            animation = ImagePanAnimation(canvas, center, duration_ms=800, on_finished=_final)
+            if not animation.start():
+                return False
+            self._pan_animation = animation
+            return True
+        except Exception as e:
             try:
                 from qgis.core import QgsMessageLog
-                if applied:
-                    QgsMessageLog.logMessage(f"_apply_scale_if_configured: applied scale={scale_val if scale_val is not None else getattr(self, 'fixed_scale', None)}", "GEO-search-plugin", 0)
+                QgsMessageLog.logMessage(f"zoom_features: animated pan failed: {e}", "GEO-search-plugin", 2)
             except Exception:
                 pass
+            return False
+
+    def _configured_rotation(self):
+        """設定の回転角（JSON の 'angle'）を返す。未設定・非数値なら None"""
+        try:
+            angle = self.setting.get("angle")
+            if angle is None:
+                return None
+            return float(angle)
         except Exception:
-            pass
+            # 非数値設定は無視
+            return None
+
+    def _configured_scale(self):
+        """設定の縮尺を返す。JSON の 'scale' を優先し、なければ fixed_scale 属性を使う。
+        どちらも無効なら None（縮尺は変えない）。
+        """
+        try:
+            scale_val = self.setting.get('scale')
+        except Exception:
+            scale_val = None
+        if scale_val is not None:
+            try:
+                return float(scale_val)
+            except Exception:
+                pass
+        # JSON 設定がなければインスタンス属性 fixed_scale を参照
+        fs = getattr(self, 'fixed_scale', None)
+        if isinstance(fs, (int, float)) and fs > 0:
+            return float(fs)
+        return None
 
     def _ensure_layer_visible(self, layer):
         """指定したレイヤをレイヤツリー上で可視化する（見えない場合は表示する）。
+        ノードと親グループの検索はレイヤツリーの索引を使い、表示の切り替えは1回でまとめて行う。
         失敗しても例外を投げず安全に終わる実装にする。
         """
         try:
             if layer is None:
                 return
-            try:
-                from qgis.core import QgsProject, QgsMessageLog
-            except Exception:
+            from qgis.core import QgsMessageLog
+            lid = layer.id() if hasattr(layer, 'id') else None
+            if not lid:
                 return
-
             try:
-                root = QgsProject.instance().layerTreeRoot()
+                changed = shared_layer_tree_index().ensure_visible(lid)
             except Exception:
+                QgsMessageLog.logMessage(f"_ensure_layer_visible: failed to set visible for layer id={lid}", "GEO-search-plugin", 2)
                 return
-
-            try:
-                lid = layer.id() if hasattr(layer, 'id') else None
-            except Exception:
-                lid = None
-
-            node = None
-            try:
-                if lid:
-                    node = root.findLayer(lid)
-            except Exception:
-                node = None
-
-            # fallback: iterate nodes to find matching layer object
-            if node is None:
-                try:
-                    for n in root.findLayers():
-                        try:
-                            if n.layer() is layer:
-                                node = n
-                                break
-                        except Exception:
-                            continue
-                except Exception:
-                    node = None
-
-            if node is not None:
-                try:
-                    # set item visible for the layer node and all its parent groups
-                    cur = node
-                    while cur is not None:
-                        try:
-                            # set visibility on this node (works for layer and group nodes)
-                            cur.setItemVisibilityChecked(True)
-                        except Exception:
-                            try:
-                                from qgis.core import QgsMessageLog
-                                QgsMessageLog.logMessage(f"_ensure_layer_visible: failed to set visibility on node {cur}", "GEO-search-plugin", 1)
-                            except Exception:
-                                pass
-                        try:
-                            cur = cur.parent()
-                        except Exception:
-                            break
-                    try:
-                        QgsMessageLog.logMessage(f"_ensure_layer_visible: set visible layer id={lid} name={getattr(layer, 'name', lambda: 'unknown')()}", "GEO-search-plugin", 0)
-                    except Exception:
-                        pass
-                except Exception:
-                    try:
-                        QgsMessageLog.logMessage(f"_ensure_layer_visible: failed to set visible for layer id={lid}", "GEO-search-plugin", 2)
-                    except Exception:
-                        pass
+            if changed:
+                QgsMessageLog.logMessage(f"_ensure_layer_visible: set visible layer id={lid} name={getattr(layer, 'name', lambda: 'unknown')()}", "GEO-search-plugin", 0)
         except Exception:
             # swallow all errors
             pass
@@ -1112,44 +1168,17 @@ class SearchFeature(object):
             from qgis.core import QgsMessageLog, QgsProject
             project = QgsProject.instance()
             theme_collection = project.mapThemeCollection()
-            # mapThemes() の返り値はQGISバージョンや実装により
-            # - テーマ名の文字列リスト
-            # - テーマオブジェクトのリスト
-            # のいずれかとなり得る。どちらにも対応できるように
-            # 安全に名前一覧を構築する。
-            try:
-                raw_themes = theme_collection.mapThemes()
-            except Exception:
-                raw_themes = []
-
-            theme_names = []
-            for t in (raw_themes or []):
-                try:
-                    if isinstance(t, str):
-                        theme_names.append(t)
-                    else:
-                        # テーマオブジェクトの場合、よく使われるアクセサを試す
-                        if hasattr(t, 'name') and callable(getattr(t, 'name')):
-                            theme_names.append(t.name())
-                        elif hasattr(t, 'name'):
-                            theme_names.append(getattr(t, 'name'))
-                        elif hasattr(t, 'displayName') and callable(getattr(t, 'displayName')):
-                            theme_names.append(t.displayName())
-                        elif hasattr(t, 'displayName'):
-                            theme_names.append(getattr(t, 'displayName'))
-                        else:
-                            theme_names.append(str(t))
-                except Exception:
-                    continue
+            # 正規化済みのテーマ名は登録簿から読む
+            registry = shared_theme_registry(theme_collection)
 
             # JSON設定からテーマ名を取得（なければNone）
             theme_name = self.setting.get("selectTheme")
 
             # 適用するテーマ名を決定（安全なメンバー判定）
             apply_theme_name = None
-            if theme_name and theme_name in theme_names:
+            if registry.has(theme_name):
                 apply_theme_name = theme_name
-            elif "検索前" in theme_names:
+            elif registry.has("検索前"):
                 apply_theme_name = "検索前"
             
             # テーマを適用（共通ヘルパーを使用）
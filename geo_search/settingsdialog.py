@@ -8,6 +8,7 @@ from qgis.PyQt.QtWidgets import QInputDialog, QMessageBox, QComboBox, QFileDialo
 import os
 import re
 from .utils import set_project_variable
+from .themeregistry import shared_theme_registry
 
 
 class SettingsDialog(QDialog):
@@ -129,30 +130,9 @@ class SettingsDialog(QDialog):
     def update_theme_list(self):
         """プロジェクトの map themes をコンボに読み込む"""
         try:
-            from qgis.core import QgsProject
-            project = QgsProject.instance()
-            tc = project.mapThemeCollection()
-            try:
-                raw = tc.mapThemes()
-            except Exception:
-                raw = []
+            names = shared_theme_registry().names()
         except Exception:
-            raw = []
-
-        names = []
-        for t in (raw or []):
-            try:
-                if isinstance(t, str):
-                    names.append(t)
-                else:
-                    if hasattr(t, 'name') and callable(getattr(t, 'name')):
-                        names.append(t.name())
-                    elif hasattr(t, 'title') and callable(getattr(t, 'title')):
-                        names.append(t.title())
-                    else:
-                        names.append(str(t))
-            except Exception:
-                continue
+            names = []
         # テーマ一覧は返す。UI 表示は不要なのでコンボ操作は行わない
         return names
 
@@ -6,6 +6,12 @@
 - 環境変数で変更可能な括弧取得
 - テーマ名から括弧で囲まれたグループ名を抽出する関数
 - テーマ名リストをグループ化する関数
+- ThemeBatch: テーマ操作中の再描画・通知をまとめて最後に1回だけ行う
+- 凡例項目の表示状態の適用（値・ラベル・ルールキーの索引で照合）
+- ThemeState: テーマの集合表現と加算・減算による合成（apply_composed_themes）
+- LegendStateCache: レイヤごとの凡例状態のキャッシュ（レイヤの変更シグナルで破棄）
+
+凡例適用のベンチマーク: ``python -m geo_search.theme`` （QGIS 不要）。
 
 環境変数:
  - THEME_BRACKET_OPEN  (開き括弧)
@@ -18,12 +24,189 @@ from __future__ import annotations
 import os
 import uuid
 import re
-from typing import Iterable, Dict, List, Optional, Tuple
+from typing import Callable, Iterable, Dict, List, Optional, Tuple
 
 # In-memory store for visible-layer snapshots (for later restore)
 # Keyed by snapshot name -> list of per-layer dicts
 _visible_layer_snapshots: Dict[str, List[Dict]] = {}
 
+# Stack of active ThemeBatch contexts (innermost last)
+_active_batches: List["ThemeBatch"] = []
+
+
+class ThemeBatch(object):
+    """テーマ操作（レイヤツリー・凡例・レンダラの変更）をまとめる。
+
+    with ThemeBatch() の間はキャンバスを freeze し、レイヤの再描画要求と
+    レンダラ差し替えの通知をレイヤごとに記録するだけにする。抜けるときに
+    記録したレイヤへ rendererChanged / styleChanged を1回ずつ送り、
+    キャンバスを1回だけ描画する。入れ子にした場合は一番外側でまとめて行う。
+
+    render_count はキャンバスが実際に始めた描画の回数（renderStarting）で、
+    with に入ってから、抜けるときに要求した描画が終わる（mapCanvasRefreshed）まで数える。
+    レイヤツリーのシグナルなどでまとめの途中に始まった描画も含まれる。
+    ThemeBatch.total_renders はその累計、ThemeBatch.total_refreshes はまとめが
+    描画を要求した回数の累計（テスト・ログ用）。
+    """
+
+    total_renders = 0
+    total_refreshes = 0
+    # 要求した描画が終わらない場合（キャンバスが非表示など）に数えるのをやめるまでの時間
+    COUNT_TIMEOUT_MS = 10000
+
+    def __init__(self, canvas=None):
+        self.canvas = canvas
+        self.render_count = 0
+        self._layers: Dict[str, list] = {}
+        self._outer = False
+        self._was_frozen = False
+        self._counting = False
+
+    def __enter__(self):
+        self._outer = not _active_batches
+        _active_batches.append(self)
+        if self._outer:
+            if self.canvas is None:
+                try:
+                    from qgis.utils import iface
+                    self.canvas = iface.mapCanvas() if iface is not None else None
+                except Exception:
+                    self.canvas = None
+            if self.canvas is not None:
+                self._start_counting()
+                try:
+                    self._was_frozen = bool(self.canvas.isFrozen())
+                    self.canvas.freeze(True)
+                except Exception:
+                    pass
+        return self
+
+    def _start_counting(self) -> None:
+        try:
+            self.canvas.renderStarting.connect(self._on_render_starting)
+            self._counting = True
+        except Exception:
+            self._counting = False
+
+    def _on_render_starting(self, *args) -> None:
+        self.render_count += 1
+        ThemeBatch.total_renders += 1
+
+    def _stop_counting(self, *args) -> None:
+        if not self._counting:
+            return
+        self._counting = False
+        for signal, slot in ((self.canvas.renderStarting, self._on_render_starting),
+                             (self.canvas.mapCanvasRefreshed, self._stop_counting)):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+
+    def mark(self, layer, renderer_changed: bool = False) -> None:
+        """layer の再描画（と renderer_changed ならレンダラ変更の通知）を後回しにする"""
+        try:
+            entry = self._layers.setdefault(layer.id(), [layer, False])
+            entry[1] = entry[1] or renderer_changed
+        except Exception:
+            pass
+
+    def layer_count(self) -> int:
+        return len(self._layers)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _active_batches.remove(self)
+        except ValueError:
+            pass
+        if not self._outer:
+            # 外側のまとめに引き継ぐ
+            if _active_batches:
+                outer = _active_batches[0]
+                for layer, renderer_changed in self._layers.values():
+                    outer.mark(layer, renderer_changed)
+            return False
+        self._flush()
+        return False
+
+    def _flush(self) -> None:
+        for layer, renderer_changed in self._layers.values():
+            try:
+                if renderer_changed:
+                    layer.rendererChanged.emit()
+                layer.emitStyleChanged()
+                layer.triggerRepaint()
+            except Exception:
+                continue
+        canvas = self.canvas
+        if canvas is None:
+            return
+        try:
+            self._release_canvas(canvas)
+        finally:
+            if not self._counting_until_refreshed():
+                self._stop_counting()
+
+    def _counting_until_refreshed(self) -> bool:
+        """要求した描画が終わるまで renderStarting を数え続ける。続けるなら True"""
+        if not self._counting or self._was_frozen:
+            return False
+        try:
+            from qgis.PyQt.QtCore import QTimer
+
+            self.canvas.mapCanvasRefreshed.connect(self._stop_counting)
+            QTimer.singleShot(self.COUNT_TIMEOUT_MS, self._stop_counting)
+            return True
+        except Exception:
+            return False
+
+    def _release_canvas(self, canvas) -> None:
+        # レイヤツリーの表示変更をキャンバスに反映してから解除する
+        try:
+            from qgis.utils import iface
+            bridge = iface.layerTreeCanvasBridge() if iface is not None else None
+            if bridge is not None:
+                bridge.setCanvasLayers()
+        except Exception:
+            pass
+        try:
+            canvas.freeze(self._was_frozen)
+            if not self._was_frozen:
+                canvas.refresh()
+                ThemeBatch.total_refreshes += 1
+        except Exception:
+            pass
+
+
+def current_theme_batch() -> Optional[ThemeBatch]:
+    """実行中の ThemeBatch（なければ None）"""
+    return _active_batches[-1] if _active_batches else None
+
+
+def _repaint_layer(layer, renderer_changed: bool = False) -> None:
+    """レイヤを再描画する。ThemeBatch の中では最後にまとめて行う"""
+    batch = current_theme_batch()
+    if batch is not None:
+        batch.mark(layer, renderer_changed)
+        return
+    if renderer_changed:
+        layer.emitStyleChanged()
+    layer.triggerRepaint()
+
+
+def _set_layer_renderer(layer, renderer) -> None:
+    """レンダラを差し替える。ThemeBatch の中では通知を止め、最後に1回だけ送る"""
+    batch = current_theme_batch()
+    if batch is None:
+        layer.setRenderer(renderer)
+        return
+    blocked = layer.blockSignals(True)
+    try:
+        layer.setRenderer(renderer)
+    finally:
+        layer.blockSignals(blocked)
+    batch.mark(layer, renderer_changed=True)
+
 def save_current_state_as_temp_theme(
     theme_collection,
     tmp_name: str,
@@ -171,7 +354,7 @@ def collect_visible_layer_snapshot(root, log_layer_legend_state_func=None, tag:
                     # Try to get legend state for storage (not only for logging)
                     legend_state = None
                     try:
-                        legend_state = get_layer_legend_state(layer)
+                        legend_state = cached_layer_legend_state(layer)
                     except Exception:
                         legend_state = None
                 except Exception:
@@ -380,12 +563,33 @@ def remove_temp_theme(theme_collection, tmp_name: str, log_func=None):
 
 
 def apply_theme(theme_collection, theme_name: str, root, model, additive: bool = False):
+    """テーマを適用する（ThemeBatch で再描画を1回にまとめる）。詳細は _apply_theme を参照
+
+    現在の表示がすでにテーマと同じなら何もしない（描画もしない）。
+    """
+    if theme_matches_view(theme_collection, theme_name, root, model):
+        try:
+            from qgis.core import QgsMessageLog
+            QgsMessageLog.logMessage(f"[テーマ] '{theme_name}' は現在の表示と同じため適用を省略しました", "GEO-search-plugin", 0)
+        except Exception:
+            pass
+        return 0
+    with ThemeBatch():
+        return _apply_theme(theme_collection, theme_name, root, model, additive=additive)
+
+
+def _apply_theme(theme_collection, theme_name: str, root, model, additive: bool = False):
     """Apply a map theme via the provided theme_collection.
 
+    In the normal (non-additive) mode only the layer-tree nodes and legend
+    items that differ from the current state are changed, and the number of
+    mutations is returned (``None`` when the theme was applied as a whole).
+
     If ``additive`` is True, the theme's visible layers are merged with the
     currently visible layers (so theme layers are added to the current view
-    rather than overwriting). Group visibility that had no visible layers is
-    also preserved.
+    rather than overwriting). The merge is a set union of layer ids and legend
+    keys (see ``apply_composed_themes``), applied as one diff; the older
+    snapshot-based merge is kept as a fallback.
 
     This function centralizes the additive application logic used by the
     plugin toolbar and search-time theme application.
@@ -483,7 +687,17 @@ def apply_theme(theme_collection, theme_name: str, root, model, additive: bool =
         return
 
     if additive:
-        # 追加表示モード（試験実装）:
+        # 追加表示モード: 現在の表示とテーマの和集合（レイヤID・凡例キーの集合演算）を
+        # 1回の差分適用で反映する。合成できない場合は以下の従来の方法で行う。
+        try:
+            mutations = apply_composed_themes(theme_collection, root, model, [('add', theme_name)], log_func=_log)
+        except Exception as e:
+            _log(f"テーマの合成に失敗したため従来の方法で追加表示します: {e}", 1)
+            mutations = None
+        if mutations is not None:
+            return mutations
+
+        # 従来の追加表示（試験実装）:
         # - 選択テーマを一時的に適用して、表示されるレイヤと
         #   かつシンボルのアルファが0でないルールのみをログ出力します。
         # - それ以外の追加表示（和集合）ロジックはまだ実装しません。
@@ -630,14 +844,20 @@ def apply_theme(theme_collection, theme_name: str, root, model, additive: bool =
                     pass
         return
 
-    # 非 additivemode: 通常適用
+    # 非 additivemode: 現在の状態との差分だけを適用する（差分を取れなければ通常適用）
     try:
-        theme_collection.applyTheme(theme_name, root, model)
-        if QgsMessageLog:
-            try:
-                QgsMessageLog.logMessage(f"テーマ '{theme_name}' を適用しました", "GEO-search-plugin", 0)
-            except Exception:
-                pass
+        mutations = None
+        try:
+            mutations = apply_theme_diff(theme_collection, theme_name, root, model, log_func=_log)
+        except Exception as e:
+            _log(f"テーマ差分適用に失敗したため通常適用します: {e}", 1)
+            mutations = None
+        if mutations is None:
+            theme_collection.applyTheme(theme_name, root, model)
+            _log(f"テーマ '{theme_name}' を適用しました", 0)
+        else:
+            _log(f"テーマ '{theme_name}' を適用しました（変更 {mutations} 件）", 0)
+        return mutations
     except Exception as e:
         if QgsMessageLog:
             try:
@@ -646,6 +866,375 @@ def apply_theme(theme_collection, theme_name: str, root, model, additive: bool =
                 pass
 
 
+def _layer_tree_group_id(node) -> str:
+    """グループノードの識別子（QgsMapThemeCollection と同じく root からの名前を / で連結）"""
+    names = []
+    while node is not None and node.parent() is not None:
+        names.insert(0, node.name())
+        node = node.parent()
+    return "/".join(names)
+
+
+def _legend_check_states(renderer) -> Optional[Dict[str, bool]]:
+    """レンダラの凡例項目 {ルールキー: チェック状態}。チェックできない項目は含めない"""
+    if renderer is None:
+        return None
+    states = {}
+    try:
+        items = renderer.legendSymbolItems()
+    except Exception:
+        return None
+    for item in items:
+        try:
+            if not item.isCheckable():
+                continue
+            key = item.ruleKey()
+            states[key] = bool(renderer.legendSymbolItemChecked(key))
+        except Exception:
+            continue
+    return states
+
+
+class ThemeState(object):
+    """テーマ（または現在の表示）を集合で表したもの。
+
+    layers は表示するレイヤID、legend はレイヤID → チェックする凡例キーの frozenset
+    （含まれないレイヤは全項目をチェック）、styles はレイヤID → スタイル名。
+    groups はチェックするグループID（None はグループを変更しない）。
+    expanded_layers / expanded_groups は展開状態（None は変更しない）。
+    union / difference は新しい ThemeState を返し、元のオブジェクトは変更しない
+    （登録簿にキャッシュしたものをそのまま使えるようにするため）。
+    """
+
+    def __init__(self, layers=(), legend=None, styles=None, groups=None,
+                 expanded_layers=None, expanded_groups=None):
+        self.layers = frozenset(layers)
+        self.legend: Dict[str, frozenset] = dict(legend or {})
+        self.styles: Dict[str, str] = dict(styles or {})
+        self.groups = frozenset(groups) if groups is not None else None
+        self.expanded_layers = dict(expanded_layers) if expanded_layers is not None else None
+        self.expanded_groups = frozenset(expanded_groups) if expanded_groups is not None else None
+
+    def union(self, other: "ThemeState") -> "ThemeState":
+        """加算: other の表示レイヤ・凡例項目・グループを加える。両方にあるレイヤのスタイルは other を使う"""
+        legend = {}
+        for lid in self.layers | other.layers:
+            mine = self.legend.get(lid) if lid in self.layers else frozenset()
+            theirs = other.legend.get(lid) if lid in other.layers else frozenset()
+            # どちらかが全項目なら全項目
+            if (lid in self.layers and mine is None) or (lid in other.layers and theirs is None):
+                continue
+            legend[lid] = mine | theirs
+        styles = {lid: s for lid, s in self.styles.items() if lid in self.layers}
+        styles.update({lid: s for lid, s in other.styles.items() if lid in other.layers})
+        if self.groups is None and other.groups is None:
+            groups = None
+        else:
+            groups = (self.groups or frozenset()) | (other.groups or frozenset())
+        return ThemeState(self.layers | other.layers, legend, styles, groups)
+
+    def difference(self, other: "ThemeState", all_keys: Optional[Callable] = None) -> "ThemeState":
+        """減算: other が表示するものを取り除く。
+
+        other が凡例項目を指定しているレイヤはその項目だけ外し、残りがなくなれば非表示にする。
+        all_keys(lid) はレイヤの全凡例キー（self がそのレイヤを全項目で表示している場合に使う）。
+        """
+        layers = set(self.layers)
+        legend = {lid: keys for lid, keys in self.legend.items() if lid in layers}
+        for lid in self.layers & other.layers:
+            removed = other.legend.get(lid)
+            if removed is None:
+                layers.discard(lid)
+                legend.pop(lid, None)
+                continue
+            keys = legend.get(lid)
+            if keys is None:
+                keys = frozenset(all_keys(lid)) if all_keys is not None else frozenset()
+            keys = keys - removed
+            if keys:
+                legend[lid] = keys
+            else:
+                layers.discard(lid)
+                legend.pop(lid, None)
+        styles = {lid: s for lid, s in self.styles.items() if lid in layers}
+        return ThemeState(layers, legend, styles, self.groups)
+
+
+def theme_state_from_record(record) -> ThemeState:
+    """QgsMapThemeCollection.MapThemeRecord から ThemeState を作る"""
+    layers = []
+    legend = {}
+    styles = {}
+    expanded = {} if record.hasExpandedStateInfo() else None
+    for rec in record.layerRecords():
+        try:
+            layer = rec.layer()
+            if layer is None:
+                continue
+            lid = layer.id()
+        except Exception:
+            continue
+        if expanded is not None:
+            expanded[lid] = bool(rec.expandedLayerNode)
+        if not bool(getattr(rec, 'isVisible', True)):
+            continue
+        layers.append(lid)
+        if rec.usingLegendItems:
+            legend[lid] = frozenset(rec.checkedLegendItems)
+        if rec.usingCurrentStyle and rec.currentStyle:
+            styles[lid] = rec.currentStyle
+    groups = record.checkedGroupNodes() if record.hasCheckedStateInfo() else None
+    expanded_groups = record.expandedGroupNodes() if record.hasExpandedStateInfo() else None
+    return ThemeState(layers, legend, styles, groups, expanded, expanded_groups)
+
+
+def _theme_layer_diff(layer, state: ThemeState, visible: bool) -> Tuple[Optional[str], Dict[str, bool]]:
+    """目標の状態と現在のレイヤの差分を返す: (切り替えるスタイル名, {ルールキー: 目標チェック状態})"""
+    style = None
+    legend = {}
+    if not visible:
+        return style, legend
+    lid = layer.id()
+    try:
+        target_style = state.styles.get(lid)
+        if target_style and target_style != layer.styleManager().currentStyle():
+            style = target_style
+    except Exception:
+        pass
+    try:
+        renderer = layer.renderer()
+    except Exception:
+        renderer = None
+    states = _legend_check_states(renderer)
+    if states:
+        checked = state.legend.get(lid)
+        for key, cur in states.items():
+            target = True if checked is None else key in checked
+            if target != cur:
+                legend[key] = target
+    return style, legend
+
+
+def apply_theme_state(state: ThemeState, root, model=None) -> int:
+    """ThemeState を現在のレイヤツリーと凡例に適用し、変更した件数を返す。
+
+    現在の状態と違うノード・凡例項目だけを変更し、凡例を変えたレイヤは
+    レイヤごとに1回だけ再描画と凡例の更新を行う（ThemeBatch の中なら最後にまとめて）。
+    """
+    from qgis.core import QgsLayerTree
+
+    mutations = 0
+    renderer_changed = []
+    for node in root.findLayers():
+        layer = node.layer()
+        if layer is None:
+            continue
+        lid = layer.id()
+        visible = lid in state.layers
+        if node.itemVisibilityChecked() != visible:
+            node.setItemVisibilityChecked(visible)
+            mutations += 1
+        style, legend = _theme_layer_diff(layer, state, visible)
+        if style is not None:
+            layer.styleManager().setCurrentStyle(style)
+            mutations += 1
+            # スタイル切り替え後の凡例状態で比べ直す
+            style, legend = _theme_layer_diff(layer, state, visible)
+        if legend:
+            renderer = layer.renderer()
+            for key, checked in legend.items():
+                renderer.checkLegendSymbolItem(key, checked)
+            mutations += len(legend)
+            renderer_changed.append((node, layer))
+        try:
+            if state.expanded_layers is not None and lid in state.expanded_layers:
+                if node.isExpanded() != state.expanded_layers[lid]:
+                    node.setExpanded(state.expanded_layers[lid])
+        except Exception:
+            pass
+
+    if state.groups is not None or state.expanded_groups is not None:
+        for group in root.findGroups(True):
+            if not QgsLayerTree.isGroup(group):
+                continue
+            gid = _layer_tree_group_id(group)
+            if state.groups is not None:
+                target = gid in state.groups
+                if group.itemVisibilityChecked() != target:
+                    group.setItemVisibilityChecked(target)
+                    mutations += 1
+            if state.expanded_groups is not None:
+                target = gid in state.expanded_groups
+                if group.isExpanded() != target:
+                    group.setExpanded(target)
+
+    for node, layer in renderer_changed:
+        try:
+            _repaint_layer(layer, renderer_changed=True)
+        except Exception:
+            pass
+        try:
+            if model is not None:
+                model.refreshLayerLegend(node)
+        except Exception:
+            pass
+    return mutations
+
+
+def apply_theme_diff(theme_collection, theme_name: str, root, model=None, log_func=None) -> Optional[int]:
+    """マップテーマのうち現在の表示と異なる部分だけを適用し、変更した件数を返す。
+
+    QgsMapThemeCollection.applyTheme と同じ規則（レイヤの表示・スタイル・凡例項目、
+    記録があればグループの表示と展開状態）で目標状態を決め、現在のレイヤツリーと
+    凡例の状態と比べて違うノード・項目だけを変更する。
+    テーマが見つからない、または API が使えない場合は None（呼び出し側で通常適用する）。
+    """
+    if theme_collection is None or root is None or not theme_name:
+        return None
+    if not theme_collection.hasMapTheme(theme_name):
+        return None
+    state = theme_state_from_record(theme_collection.mapThemeState(theme_name))
+    mutations = apply_theme_state(state, root, model)
+    if callable(log_func):
+        try:
+            log_func(f"[テーマ差分] '{theme_name}': layers={len(state.layers)} mutations={mutations}", 0)
+        except Exception:
+            pass
+    return mutations
+
+
+def _with_layer_groups(state: ThemeState, root) -> ThemeState:
+    """グループの記録がないテーマは、表示レイヤの親グループをチェックするものとして扱う"""
+    if state.groups is not None:
+        return state
+    from .layertree import shared_layer_tree_index
+
+    index = shared_layer_tree_index(root)
+    groups = set()
+    for lid in state.layers:
+        node = index.node(lid)
+        if node is None:
+            continue
+        groups.update(_layer_tree_group_id(g) for g in index.ancestors(node))
+    return ThemeState(state.layers, state.legend, state.styles, groups)
+
+
+def _layer_legend_keys(layer_id) -> List[str]:
+    from qgis.core import QgsProject
+
+    layer = QgsProject.instance().mapLayer(layer_id)
+    states = _legend_check_states(layer.renderer()) if layer is not None else None
+    return list(states or [])
+
+
+def compose_theme_states(base: ThemeState, operations: Iterable[Tuple[str, ThemeState]],
+                         all_keys: Optional[Callable] = None) -> ThemeState:
+    """base に ('add' | 'subtract', ThemeState) を順に適用した結果を返す"""
+    result = base
+    for op, state in operations:
+        if op == 'add':
+            result = result.union(state)
+        elif op == 'subtract':
+            result = result.difference(state, all_keys=all_keys)
+        else:
+            raise ValueError(f"unknown theme operation: {op}")
+    return result
+
+
+def apply_composed_themes(theme_collection, root, model, operations: Iterable[Tuple[str, str]],
+                          base: Optional[str] = None, log_func=None) -> Optional[int]:
+    """複数のテーマを集合演算で合成し、結果を1回の差分適用で反映する。変更した件数を返す。
+
+    operations は ('add' | 'subtract', テーマ名) の並び。base はもとにするテーマ名で、
+    None なら現在の表示（例: 基本テーマ + 重ねるテーマ A + 重ねるテーマ B）。
+    テーマの記録は登録簿のキャッシュを使う。合成できない場合は None。
+    """
+    from .themeregistry import shared_theme_registry
+
+    if theme_collection is None or root is None:
+        return None
+    registry = shared_theme_registry(theme_collection)
+    if base is None:
+        if model is None:
+            return None
+        base_state = theme_state_from_record(theme_collection.createThemeFromCurrentState(root, model))
+    else:
+        base_state = registry.state(base)
+        if base_state is None:
+            return None
+        base_state = _with_layer_groups(base_state, root)
+    steps = []
+    for op, name in operations:
+        state = registry.state(name)
+        if state is None:
+            return None
+        steps.append((op, _with_layer_groups(state, root) if op == 'add' else state))
+    target = compose_theme_states(base_state, steps, all_keys=_layer_legend_keys)
+    with ThemeBatch():
+        mutations = apply_theme_state(target, root, model)
+    if callable(log_func):
+        try:
+            desc = " ".join(f"{'+' if op == 'add' else '-'} {name}" for op, name in operations)
+            log_func(f"[テーマ合成] {base or '(現在の表示)'} {desc}: layers={len(target.layers)} mutations={mutations}", 0)
+        except Exception:
+            pass
+    return mutations
+
+
+def theme_fingerprint(record) -> Optional[Tuple]:
+    """テーマの記録から表示に効く内容（レイヤの表示・スタイル・チェックされた凡例項目、
+    グループの表示）だけを取り出した比較用の値を返す。展開状態は含めない。
+    """
+    if record is None:
+        return None
+    layers = []
+    try:
+        for rec in record.layerRecords():
+            try:
+                layer = rec.layer()
+                if layer is None:
+                    continue
+                style = rec.currentStyle if rec.usingCurrentStyle else None
+                legend = tuple(sorted(rec.checkedLegendItems)) if rec.usingLegendItems else None
+                layers.append((layer.id(), bool(getattr(rec, 'isVisible', True)), style, legend))
+            except Exception:
+                continue
+    except Exception:
+        return None
+    try:
+        groups = tuple(sorted(record.checkedGroupNodes())) if record.hasCheckedStateInfo() else None
+    except Exception:
+        groups = None
+    layers.sort(key=lambda t: t[0])
+    return (tuple(layers), groups)
+
+
+def current_view_fingerprint(theme_collection, root, model) -> Optional[Tuple]:
+    """現在のレイヤツリーと凡例の状態の theme_fingerprint を返す"""
+    if theme_collection is None or root is None or model is None:
+        return None
+    try:
+        return theme_fingerprint(theme_collection.createThemeFromCurrentState(root, model))
+    except Exception:
+        return None
+
+
+def theme_matches_view(theme_collection, theme_name: str, root, model) -> bool:
+    """テーマを適用しても表示が変わらない（現在の状態と同じ）なら True"""
+    try:
+        from .themeregistry import shared_theme_registry
+
+        registry = shared_theme_registry(theme_collection)
+        if not registry.has(theme_name):
+            return False
+        current = current_view_fingerprint(theme_collection, root, model)
+        if current is None:
+            return False
+        return registry.fingerprint(theme_name) == current
+    except Exception:
+        return False
+
+
 def _get_theme_brackets() -> Tuple[str, str]:
     """環境変数からテーマのグループ括弧を取得する。
 
@@ -886,7 +1475,11 @@ def _save_rulebased_renderer_state(renderer):
         except Exception:
             label = None
         visible = _call_bool_methods(r, ('active', 'renderState', 'isVisible'))
-        items.append({'index': i, 'type': 'rule', 'label': label, 'visible': visible})
+        try:
+            key = r.ruleKey()
+        except Exception:
+            key = None
+        items.append({'index': i, 'type': 'rule', 'label': label, 'key': key, 'visible': visible})
     return items
 
 
@@ -896,14 +1489,127 @@ def _save_single_renderer_state(renderer, layer_name=None):
     return items
 
 
+def _legend_label(obj):
+    try:
+        return obj.label() if callable(getattr(obj, 'label', None)) else getattr(obj, 'label', None)
+    except Exception:
+        return getattr(obj, 'label', None)
+
+
+def _category_value_keys(val) -> List[str]:
+    """カテゴリ値から保存状態と照合するキーの候補を返す（先頭ほど優先）。
+
+    複数値カテゴリ（list/tuple/set）は各要素、カンマ区切りの文字列は
+    文字列そのものと各トークンを候補にする。None は空文字列。
+    """
+    if val is None:
+        return [""]
+    keys = []
+    if isinstance(val, (list, tuple, set)):
+        for e in val:
+            try:
+                keys.append(str(e))
+            except Exception:
+                try:
+                    keys.append(repr(e))
+                except Exception:
+                    continue
+        return keys
+    try:
+        sval = str(val)
+    except Exception:
+        try:
+            sval = repr(val)
+        except Exception:
+            return keys
+    keys.append(sval)
+    if ',' in sval:
+        for tok in [t.strip() for t in sval.split(',') if t.strip()]:
+            if tok not in keys:
+                keys.append(tok)
+    return keys
+
+
+def _saved_visibility_index(items) -> Tuple[Dict[str, bool], Dict[str, bool]]:
+    """保存された凡例項目から (値 → 表示状態, ラベル → 表示状態) の索引を作る。
+
+    値が None の項目は空文字列（_category_value_keys と同じ）で引く。カンマ区切りの値は
+    各トークンでも引けるようにする（先に登録したものを優先）。ラベルの索引には
+    保存項目の中で重複しないラベルだけを入れる（同じラベルの別カテゴリと取り違えないため）。
+    """
+    by_value: Dict[str, bool] = {}
+    labels: Dict[str, bool] = {}
+    label_counts: Dict[str, int] = {}
+    for it in items:
+        visible = bool(it.get('visible') is True)
+        label = it.get('label')
+        if label is not None:
+            try:
+                label = str(label)
+                labels[label] = visible
+                label_counts[label] = label_counts.get(label, 0) + 1
+            except Exception:
+                pass
+        raw = it.get('value')
+        try:
+            key = "" if raw is None else str(raw)
+        except Exception:
+            continue
+        if key not in by_value:
+            by_value[key] = visible
+        if ',' in key:
+            for tok in [t.strip() for t in key.split(',') if t.strip()]:
+                if tok not in by_value:
+                    by_value[tok] = visible
+    by_label = {label: vis for label, vis in labels.items() if label_counts[label] == 1}
+    return by_value, by_label
+
+
+def _legend_label_index(objs) -> Dict[str, List[int]]:
+    """ラベル → 位置（同じラベルが複数あれば全て）の索引"""
+    index: Dict[str, List[int]] = {}
+    for i, obj in enumerate(objs):
+        label = _legend_label(obj)
+        if label is not None:
+            index.setdefault(label, []).append(i)
+    return index
+
+
+def _legend_item_state(obj) -> Optional[bool]:
+    """カテゴリ・範囲・ルールの現在の表示状態（取得できなければ None）"""
+    try:
+        if callable(getattr(obj, 'renderState', None)):
+            return bool(obj.renderState())
+    except Exception:
+        pass
+    return _call_bool_methods(obj, ('renderState', 'isVisible', 'active'))
+
+
+def _set_legend_item_state(obj, enable: bool, setters=('setRenderState', 'setActive', 'setEnabled', 'setVisible')) -> bool:
+    """最初に使えるセッターで表示状態を設定する。設定できたら True"""
+    for name in setters:
+        meth = getattr(obj, name, None)
+        if not callable(meth):
+            continue
+        try:
+            meth(bool(enable))
+            return True
+        except Exception:
+            continue
+    return False
+
+
 def _apply_categorized_visibility(layer, items, overwrite_all=False, log_func=None):
     """Apply categorized renderer visibility by rebuilding renderer when possible.
 
-    This prefers the approach in the user's example: update category renderState
-    by value and create a new QgsCategorizedSymbolRenderer with the modified
-    categories, then set it on the layer and trigger repaint. If the
-    QgsCategorizedSymbolRenderer class is not available, best-effort in-place
-    updates are performed.
+    Saved items are indexed once by value and each category is looked up
+    through that index, so the cost is linear in the number of categories.
+    The label is used only when the value lookup fails and the label is
+    unique among both the saved items and the current categories. When a
+    state changes, a new QgsCategorizedSymbolRenderer is built from the
+    modified categories and set on the layer (inside a ThemeBatch the
+    notification is deferred). If the class is not available, best-effort
+    in-place updates are performed.
     """
     if layer is None:
         return
@@ -915,39 +1621,8 @@ def _apply_categorized_visibility(layer, items, overwrite_all=False, log_func=No
     if renderer is None:
         return
 
-    # Build a mapping of stringified category value -> desired visible state.
-    # Use str(...) for keys so multi-value categories (lists/tuples/QVariants)
-    # are matched reliably during restore. Fall back to label when value
-    # is not present.
-    mapping = {}
-    for it in items:
-        if 'value' in it and it.get('value') is not None:
-            try:
-                key = str(it['value'])
-                mapping[key] = bool(it.get('visible') is True)
-                # If the saved value is a comma-joined list, also expose individual tokens
-                try:
-                    if isinstance(key, str) and ',' in key:
-                        for tok in [t.strip() for t in key.split(',') if t.strip()]:
-                            if tok not in mapping:
-                                mapping[tok] = mapping[key]
-                except Exception:
-                    pass
-            except Exception:
-                pass
-        elif 'label' in it and it.get('label') is not None:
-            try:
-                key = str(it['label'])
-                mapping[key] = bool(it.get('visible') is True)
-                try:
-                    if isinstance(key, str) and ',' in key:
-                        for tok in [t.strip() for t in key.split(',') if t.strip()]:
-                            if tok not in mapping:
-                                mapping[tok] = mapping[key]
-                except Exception:
-                    pass
-            except Exception:
-                pass
+    by_value, by_label = _saved_visibility_index(items)
+
     # local logger helper
     def _dbg(msg: str, level: int = 0):
         try:
@@ -995,312 +1670,84 @@ def _apply_categorized_visibility(layer, items, overwrite_all=False, log_func=No
         elif type_name == 'categorizedSymbol' or type(renderer).__name__ == 'QgsCategorizedSymbolRenderer':
             is_categorized = True
 
-        if is_categorized:
-            # Retrieve classification attribute and categories
-            try:
-                attr = renderer.classAttribute() if callable(getattr(renderer, 'classAttribute', None)) else getattr(renderer, 'classAttribute', None)
-            except Exception:
-                attr = None
-            try:
-                categories = renderer.categories()
-            except Exception:
-                categories = []
+        if not is_categorized:
+            return
 
-            new_categories = []
-            modified_any = False
+        # Retrieve classification attribute and categories
+        try:
+            attr = renderer.classAttribute() if callable(getattr(renderer, 'classAttribute', None)) else getattr(renderer, 'classAttribute', None)
+        except Exception:
+            attr = None
+        try:
+            categories = renderer.categories()
+        except Exception:
+            categories = []
+
+        # ラベルは値で引けなかったときだけ使い、現在のカテゴリでも一意なものに限る
+        label_index = _legend_label_index(categories)
 
-            # Debug: show mapping keys
+        matched = 0
+        changed = 0
+        for cat in categories:
             try:
-                _dbg(f"[カテゴリ復元] mapping_keys={list(mapping.keys())}")
+                val = cat.value() if callable(getattr(cat, 'value', None)) else getattr(cat, 'value', None)
             except Exception:
-                pass
-
-            # (旧: 簡易追加モード用の早期 return ブロックを削除)
-            # ここから先は現在のカテゴリ可視状態を読み取り、
-            # 保存された状態(saved)と現在の状態(cur)を比較して
-            # 最終的な desired を決めて適用する共通経路になります。
-
-            # Read current renderer visibility for each existing category
-            current_map = {}
-            for cat in categories:
-                try:
-                    val = cat.value() if callable(getattr(cat, 'value', None)) else getattr(cat, 'value', None)
-                except Exception:
-                    val = getattr(cat, 'value', None)
-                cur_vis = None
-                try:
-                    if callable(getattr(cat, 'renderState', None)):
-                        cur_vis = bool(cat.renderState())
-                except Exception:
-                    cur_vis = None
-                if cur_vis is None:
-                    cur_vis = _call_bool_methods(cat, ('renderState', 'isVisible', 'active'))
-                # Normalize current category value to comparable string keys
-                try:
-                    key_strs = []
-                    if val is None:
-                        key_strs = [""]
-                    elif isinstance(val, (list, tuple, set)):
-                        key_str = ",".join([str(x).strip() for x in val])
-                        key_strs = [key_str] + [str(x).strip() for x in val]
-                    else:
-                        if hasattr(val, 'toList'):
-                            try:
-                                lst = val.toList()
-                                if isinstance(lst, (list, tuple, set)):
-                                    key_str = ",".join([str(x).strip() for x in lst])
-                                    key_strs = [key_str] + [str(x).strip() for x in lst]
-                                else:
-                                    key_strs = [str(val)]
-                            except Exception:
-                                key_strs = [str(val)]
-                        else:
-                            key_strs = [str(val)]
-                except Exception:
-                    try:
-                        key_strs = [str(val)]
-                    except Exception:
-                        key_strs = [""]
-                # populate current_map for all normalized keys
-                for ks in key_strs:
-                    if ks not in current_map:
-                        current_map[ks] = cur_vis
-
-            # Apply per-category changes. For additive (overwrite_all=False):
-            # - keep existing visibility unless saved mapping explicitly True
-            # - enable saved True categories; do not disable others
-            for cat in categories:
-                try:
-                    val = cat.value() if callable(getattr(cat, 'value', None)) else getattr(cat, 'value', None)
-                except Exception:
-                    val = getattr(cat, 'value', None)
-
-                # Build list of candidate keys to try for matching saved mapping.
-                # Handle None, list/tuple/set (multi-value categories), and
-                # comma-separated strings by expanding tokens.
-                keys_to_try = []
-                try:
-                    if val is None:
-                        # saved mapping sometimes contains an empty string key
-                        keys_to_try = [""]
-                    elif isinstance(val, (list, tuple, set)):
-                        for e in val:
-                            try:
-                                keys_to_try.append(str(e))
-                            except Exception:
-                                try:
-                                    keys_to_try.append(repr(e))
-                                except Exception:
-                                    continue
-                    else:
-                        sval = None
-                        try:
-                            sval = str(val)
-                        except Exception:
-                            try:
-                                sval = repr(val)
-                            except Exception:
-                                sval = None
-                        if sval is not None:
-                            keys_to_try.append(sval)
-                            # if the saved value is a comma-joined composite, also test tokens
-                            try:
-                                if ',' in sval:
-                                    for tok in [t.strip() for t in sval.split(',') if t.strip()]:
-                                        if tok not in keys_to_try:
-                                            keys_to_try.append(tok)
-                            except Exception:
-                                pass
-                except Exception:
-                    keys_to_try = []
-
-                # Debug: per-category info
-                try:
-                    _dbg(f"[カテゴリ復元] label={getattr(cat,'label',None)} val={val} keys={keys_to_try} mapping_has_any={any(k in mapping for k in keys_to_try)}")
-                except Exception:
-                    pass
-
-                # Determine current visibility (treat None as False)
-                try:
-                    cur_vis = None
-                    if callable(getattr(cat, 'renderState', None)):
-                        try:
-                            cur_vis = bool(cat.renderState())
-                        except Exception:
-                            cur_vis = None
-                except Exception:
-                    cur_vis = None
-                if cur_vis is None:
-                    cur_vis = _call_bool_methods(cat, ('renderState', 'isVisible', 'active'))
-                if cur_vis is None:
-                    cur_vis = False
-
-                # Decide if any saved mapping explicitly requests True
-                try:
-                    should_enable = any((k in mapping and mapping.get(k) is True) for k in keys_to_try)
-                except Exception:
-                    should_enable = False
-
-                # Additive mode: only enable saved True, do not disable existing
-                if not overwrite_all:
-                    if should_enable:
-                        try:
-                            if callable(getattr(cat, 'setRenderState', None)):
-                                cat.setRenderState(True)
-                            elif hasattr(cat, 'setActive'):
-                                cat.setActive(True)
-                            elif hasattr(cat, 'setEnabled'):
-                                cat.setEnabled(True)
-                            elif hasattr(cat, 'setVisible'):
-                                cat.setVisible(True)
-                        except Exception:
-                            pass
-                        if not cur_vis:
-                            modified_any = True
-                    # keep the existing category object (modified or not)
-                    try:
-                        new_categories.append(cat)
-                    except Exception:
-                        pass
+                val = getattr(cat, 'value', None)
+            # saved states of the category's value keys (a multi-value category has several)
+            hits = [by_value[k] for k in _category_value_keys(val) if k in by_value]
+            if not hits:
+                label = _legend_label(cat)
+                if label is not None and len(label_index.get(label, ())) == 1:
+                    saved_label = by_label.get(str(label))
+                    if saved_label is not None:
+                        hits = [saved_label]
+
+            cur_vis = bool(_legend_item_state(cat))
+            if not hits:
+                # unmatched categories keep their state
+                continue
+            if not overwrite_all:
+                # Additive mode: enable when any of its keys was saved True, do not disable existing
+                if not any(v is True for v in hits):
                     continue
+                desired = True
+            else:
+                # first matching key wins
+                desired = bool(hits[0])
+            matched += 1
+            if desired != cur_vis and _set_legend_item_state(cat, desired):
+                changed += 1
+
+        _dbg(f"[カテゴリ復元] categories={len(categories)} saved_keys={len(by_value)} matched={matched} changed={changed}")
+        if not changed:
+            return
 
-                # overwrite_all == True: keep previous overwrite logic
-                # saved desired visibility (may be None)
-                # Determine saved visibility by trying candidate keys (same
-                # expansion strategy as above). First matching key wins.
-                saved_vis = None
-                try:
-                    # reuse keys_to_try logic for overwrite path
-                    keys_try_overwrite = []
-                    if val is None:
-                        keys_try_overwrite = [""]
-                    elif isinstance(val, (list, tuple, set)):
-                        for e in val:
-                            try:
-                                keys_try_overwrite.append(str(e))
-                            except Exception:
-                                try:
-                                    keys_try_overwrite.append(repr(e))
-                                except Exception:
-                                    continue
-                    else:
-                        sval = None
-                        try:
-                            sval = str(val)
-                        except Exception:
-                            try:
-                                sval = repr(val)
-                            except Exception:
-                                sval = None
-                        if sval is not None:
-                            keys_try_overwrite.append(sval)
-                            try:
-                                if ',' in sval:
-                                    for tok in [t.strip() for t in sval.split(',') if t.strip()]:
-                                        if tok not in keys_try_overwrite:
-                                            keys_try_overwrite.append(tok)
-                            except Exception:
-                                pass
-                    for k in keys_try_overwrite:
-                        if k in mapping:
-                            saved_vis = mapping.get(k)
-                            break
-                except Exception:
-                    saved_vis = None
-
-                # current visibility
-                cur_vis = current_map.get(val, None)
-                if cur_vis is None:
-                    try:
-                        cur_vis = current_map.get(str(val), None)
-                    except Exception:
-                        cur_vis = None
-
-                if saved_vis is None:
-                    desired = cur_vis
-                else:
-                    desired = bool(saved_vis)
-
-                applied_state = False
-                try:
-                    if callable(getattr(cat, 'setRenderState', None)):
-                        try:
-                            cat.setRenderState(bool(desired))
-                            applied_state = True
-                        except Exception:
-                            applied_state = False
-                    if not applied_state and hasattr(cat, 'setActive'):
-                        try:
-                            cat.setActive(bool(desired))
-                            applied_state = True
-                        except Exception:
-                            applied_state = False
-                    if not applied_state and hasattr(cat, 'setEnabled'):
-                        try:
-                            cat.setEnabled(bool(desired))
-                            applied_state = True
-                        except Exception:
-                            applied_state = False
-                    if not applied_state and hasattr(cat, 'setVisible'):
-                        try:
-                            cat.setVisible(bool(desired))
-                            applied_state = True
-                        except Exception:
-                            applied_state = False
-                except Exception:
-                    applied_state = False
-
-                if applied_state:
-                    modified_any = True
-
-                new_categories.append(cat)
-
-            # After updating category objects, construct new renderer to ensure
-            # QGIS picks up the modified category objects (some QGIS versions
-            # require setting a new renderer instance to refresh internal state).
+        # After updating category objects, construct new renderer to ensure
+        # QGIS picks up the modified category objects (categories() returns
+        # copies, so the layer needs a new renderer instance).
+        if QgsCategorizedSymbolRenderer is not None:
             try:
-                from qgis.core import QgsCategorizedSymbolRenderer
-            except Exception:
-                QgsCategorizedSymbolRenderer = None
-
-            if QgsCategorizedSymbolRenderer is not None:
+                new_renderer = QgsCategorizedSymbolRenderer(attr, categories)
                 try:
-                    _dbg(f"[カテゴリ復元] attempting to build new QgsCategorizedSymbolRenderer attr={attr} categories={len(new_categories)}")
-                    new_renderer = QgsCategorizedSymbolRenderer(attr, new_categories)
-                    try:
-                        layer.setRenderer(new_renderer)
-                        _dbg("[カテゴリ復元] layer.setRenderer(new_renderer) succeeded")
-                    except Exception as e_set:
-                        _dbg(f"[カテゴリ復元] layer.setRenderer failed first attempt: {e_set}")
-                        try:
-                            layer.setRenderer(new_renderer)
-                            _dbg("[カテゴリ復元] layer.setRenderer(new_renderer) succeeded on retry")
-                        except Exception as e_set2:
-                            _dbg(f"[カテゴリ復元] layer.setRenderer failed on retry: {e_set2}")
-                    try:
-                        layer.triggerRepaint()
-                        _dbg("[カテゴリ復元] layer.triggerRepaint() called")
-                    except Exception as e_rp:
-                        _dbg(f"[カテゴリ復元] layer.triggerRepaint() failed: {e_rp}")
+                    _set_layer_renderer(layer, new_renderer)
+                except Exception as e_set:
+                    _dbg(f"[カテゴリ復元] layer.setRenderer failed: {e_set}")
                     return
-                except Exception as e:
-                    _dbg(f"[カテゴリ復元] building new renderer failed: {e}")
-                    # If building new renderer failed, fall back to relying on
-                    # in-place modifications already applied to category objects.
-                    pass
+                _repaint_layer(layer)
+                return
+            except Exception as e:
+                _dbg(f"[カテゴリ復元] building new renderer failed: {e}")
+                # If building new renderer failed, fall back to relying on
+                # in-place modifications already applied to category objects.
 
-            # If we couldn't make a new renderer, at least trigger repaint
-            if modified_any:
-                try:
-                    layer.triggerRepaint()
-                except Exception:
-                    pass
-            return
+        try:
+            _repaint_layer(layer, renderer_changed=True)
+        except Exception:
+            pass
     except Exception:
         pass
 
 
-
 def _apply_graduated_visibility(renderer, items, overwrite_all=False, log_func=None):
     try:
         ranges_fn = getattr(renderer, 'ranges', None)
@@ -1310,6 +1757,11 @@ def _apply_graduated_visibility(renderer, items, overwrite_all=False, log_func=N
             ranges = renderer.ranges()
         except Exception:
             ranges = []
+        index = _legend_label_index(ranges)
+        if not index:
+            return
+        # ranges() はコピーを返すため、レンダラの状態は位置で更新する
+        update = getattr(renderer, 'updateRangeRenderState', None)
         for it in items:
             label = it.get('label')
             if label is None:
@@ -1317,23 +1769,15 @@ def _apply_graduated_visibility(renderer, items, overwrite_all=False, log_func=N
             desired = True if it.get('visible') is True else False
             if not overwrite_all and not desired:
                 continue
-            for r in ranges:
+            for i in index.get(label, ()):
                 try:
-                    lab = r.label() if callable(getattr(r, 'label', None)) else getattr(r, 'label', None)
+                    if callable(update):
+                        update(i, bool(desired))
+                    else:
+                        _set_legend_item_state(ranges[i], desired,
+                                               ('setActive', 'setEnabled', 'setVisible', 'setRenderState'))
                 except Exception:
-                    lab = None
-                if lab == label:
-                    try:
-                        if hasattr(r, 'setActive'):
-                            r.setActive(bool(desired))
-                        elif hasattr(r, 'setEnabled'):
-                            r.setEnabled(bool(desired))
-                        elif hasattr(r, 'setVisible'):
-                            r.setVisible(bool(desired))
-                        elif hasattr(r, 'setRenderState'):
-                            r.setRenderState(bool(desired))
-                    except Exception:
-                        continue
+                    continue
     except Exception:
         pass
 
@@ -1364,36 +1808,38 @@ def _apply_rulebased_visibility(renderer, items, overwrite_all=False, log_func=N
                 all_rules = _collect_rules(root_rule)
             except Exception:
                 all_rules = []
+        if not all_rules:
+            return
+
+        # ルールキー → ルール、ラベル → ルール の索引をレンダラごとに1回だけ作る
+        by_key: Dict[str, object] = {}
+        for r in all_rules:
+            try:
+                key = r.ruleKey()
+            except Exception:
+                key = None
+            if key:
+                by_key[key] = r
+        by_label = _legend_label_index(all_rules)
 
         for it in items:
             label = it.get('label')
-            if label is None:
+            rule = by_key.get(it.get('key')) if it.get('key') else None
+            if rule is not None:
+                targets = [rule]
+            elif label is not None:
+                targets = [all_rules[i] for i in by_label.get(label, ())]
+            else:
                 continue
             desired = True if it.get('visible') is True else False
             if not overwrite_all and not desired:
                 continue
-            for r in all_rules:
-                try:
-                    lab = r.label() if callable(getattr(r, 'label', None)) else getattr(r, 'label', None)
-                except Exception:
-                    lab = None
-                if lab == label:
-                    try:
-                        if hasattr(r, 'setActive'):
-                            r.setActive(bool(desired))
-                        elif hasattr(r, 'setEnabled'):
-                            r.setEnabled(bool(desired))
-                        elif hasattr(r, 'setVisible'):
-                            r.setVisible(bool(desired))
-                        elif hasattr(r, 'setRenderState'):
-                            r.setRenderState(bool(desired))
-                    except Exception:
-                        continue
+            for r in targets:
+                _set_legend_item_state(r, desired, ('setActive', 'setEnabled', 'setVisible', 'setRenderState'))
     except Exception:
         pass
 
 
-
 def _apply_layer_style_by_name(layer, style_name: str, log_func=None) -> bool:
     """Try to apply a style (by name or id) to a layer in a best-effort way.
 
@@ -1582,6 +2028,104 @@ def get_layer_legend_state(layer):
     return result
 
 
+class LegendStateCache(object):
+    """レイヤID → get_layer_legend_state() の結果のキャッシュ。
+
+    最初に読んだときにそのレイヤの rendererChanged / styleChanged / legendChanged /
+    nameChanged に接続し、シグナルが来たらそのレイヤの分だけ捨てる（次に読むときに
+    読み直す）。凡例のチェック操作は styleChanged で通知される。
+    返す dict は共有されるため呼び出し側で変更しないこと。
+    hits / misses はキャッシュの利用状況（テスト・ログ用）。
+    """
+
+    SIGNALS = ('rendererChanged', 'styleChanged', 'legendChanged', 'nameChanged')
+
+    def __init__(self):
+        self._states: Dict[str, Dict] = {}
+        self._connections: Dict[str, List[Tuple[object, object]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layer) -> Dict:
+        try:
+            lid = layer.id()
+        except Exception:
+            lid = None
+        if lid is None:
+            return get_layer_legend_state(layer)
+        state = self._states.get(lid)
+        if state is not None:
+            self.hits += 1
+            return state
+        self.misses += 1
+        state = get_layer_legend_state(layer)
+        if lid not in self._connections:
+            if not self._connect(layer, lid):
+                # 変更を検知できないレイヤはキャッシュしない
+                return state
+        self._states[lid] = state
+        return state
+
+    def _connect(self, layer, lid) -> bool:
+        connections = []
+        for name in self.SIGNALS:
+            signal = getattr(layer, name, None)
+            if signal is None:
+                continue
+            slot = (lambda *args, _lid=lid: self.invalidate(_lid))
+            try:
+                signal.connect(slot)
+                connections.append((signal, slot))
+            except Exception:
+                continue
+        if not connections:
+            return False
+        try:
+            slot = (lambda *args, _lid=lid: self._forget(_lid))
+            layer.willBeDeleted.connect(slot)
+            connections.append((layer.willBeDeleted, slot))
+        except Exception:
+            pass
+        self._connections[lid] = connections
+        return True
+
+    def invalidate(self, layer_id) -> None:
+        self._states.pop(layer_id, None)
+
+    def is_cached(self, layer_id) -> bool:
+        return layer_id in self._states
+
+    def _forget(self, layer_id) -> None:
+        self._states.pop(layer_id, None)
+        for signal, slot in self._connections.pop(layer_id, []):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        """全て捨ててシグナルの接続も解除する"""
+        for lid in list(self._connections):
+            self._forget(lid)
+        self._states = {}
+
+
+_legend_state_cache = LegendStateCache()
+
+
+def cached_layer_legend_state(layer) -> Dict:
+    """get_layer_legend_state() のキャッシュ版（変更されたレイヤだけ読み直す）"""
+    try:
+        return _legend_state_cache.get(layer)
+    except Exception:
+        return get_layer_legend_state(layer)
+
+
+def release_legend_state_cache() -> None:
+    """凡例状態のキャッシュを破棄する（プラグインのアンロード時）"""
+    _legend_state_cache.clear()
+
+
 def log_layer_legend_state(layer, tag: str = "GEO-search-plugin"):
     """`get_layer_legend_state` の結果をログ出力する。
 
@@ -1589,7 +2133,7 @@ def log_layer_legend_state(layer, tag: str = "GEO-search-plugin"):
     - それ以外は `print` による出力を行う。
     """
     try:
-        state = get_layer_legend_state(layer)
+        state = cached_layer_legend_state(layer)
     except Exception:
         state = None
 
@@ -1761,12 +2305,24 @@ def apply_legend_visibility(layer, legend_state: Optional[Dict], log_func=None,
         _apply_rulebased_visibility(renderer, items, overwrite_all=overwrite_all, log_func=log_func)
     except Exception:
         pass
+    # graduated / rule-based はレンダラ内の状態を変更するだけなので再描画を要求する
+    try:
+        if renderer.type() in ('graduatedSymbol', 'RuleRenderer'):
+            _repaint_layer(layer, renderer_changed=True)
+    except Exception:
+        pass
 
     # Single-symbol: nothing to enable besides layer visibility
     return
 
 
 def collect_visible_layer_reload(snapshot_name: str, project=None, root=None, tag: str = "GEO-search-plugin", log_func=None) -> bool:
+    """スナップショットの表示状態を反映する（ThemeBatch で再描画を1回にまとめる）。詳細は _collect_visible_layer_reload を参照"""
+    with ThemeBatch():
+        return _collect_visible_layer_reload(snapshot_name, project=project, root=root, tag=tag, log_func=log_func)
+
+
+def _collect_visible_layer_reload(snapshot_name: str, project=None, root=None, tag: str = "GEO-search-plugin", log_func=None) -> bool:
     """Restore visible-layer state from an in-memory snapshot by making those
     layers visible in the current layer tree.
 
@@ -2119,6 +2675,12 @@ def load_user_theme(path: str):
 
 
 def apply_user_theme(data: dict, overwrite_legend: bool = False, project=None, log_func=None):
+    """ユーザーテーマを適用する（ThemeBatch で再描画を1回にまとめる）。詳細は _apply_user_theme を参照"""
+    with ThemeBatch():
+        return _apply_user_theme(data, overwrite_legend=overwrite_legend, project=project, log_func=log_func)
+
+
+def _apply_user_theme(data: dict, overwrite_legend: bool = False, project=None, log_func=None):
     """
     Apply a loaded user-theme dict to the current project.
     - Lookup layers by id first, fallback to name.
@@ -2214,12 +2776,91 @@ def apply_user_theme(data: dict, overwrite_legend: bool = False, project=None, l
     return applied
 
 
+def benchmark_legend_visibility(n: int = 10000) -> Dict[str, float]:
+    """凡例の表示状態適用のベンチマーク（ミリ秒、QGIS 不要）。
+
+    n 個のカテゴリ・範囲を持つ疑似レンダラに、半分を表示とする保存状態を上書き適用する。
+    """
+    import time
+
+    class _Item(object):
+        def __init__(self, value, label):
+            self._value = value
+            self._label = label
+            self._state = True
+
+        def value(self):
+            return self._value
+
+        def label(self):
+            return self._label
+
+        def renderState(self):
+            return self._state
+
+        def setRenderState(self, state):
+            self._state = state
+
+    class _Renderer(object):
+        def __init__(self, kind, objs):
+            self.kind = kind
+            self.objs = objs
+
+        def type(self):
+            return self.kind
+
+        def categories(self):
+            return self.objs
+
+        def ranges(self):
+            return self.objs
+
+        def updateRangeRenderState(self, i, state):
+            self.objs[i].setRenderState(state)
+
+    class _Layer(object):
+        def __init__(self, renderer):
+            self._renderer = renderer
+
+        def renderer(self):
+            return self._renderer
+
+        def triggerRepaint(self):
+            pass
+
+    saved = [{'value': f"v{i}", 'label': f"class {i}", 'visible': i % 2 == 0} for i in range(n)]
+    result = {}
+    layer = _Layer(_Renderer('categorizedSymbol', [_Item(f"v{i}", f"class {i}") for i in range(n)]))
+    t0 = time.perf_counter()
+    _apply_categorized_visibility(layer, saved, overwrite_all=True, log_func=lambda *a: None)
+    result['categorized'] = (time.perf_counter() - t0) * 1000.0
+    assert sum(1 for c in layer.renderer().objs if c.renderState()) == (n + 1) // 2
+
+    renderer = _Renderer('graduatedSymbol', [_Item(None, f"class {i}") for i in range(n)])
+    t0 = time.perf_counter()
+    _apply_graduated_visibility(renderer, saved, overwrite_all=True)
+    result['graduated'] = (time.perf_counter() - t0) * 1000.0
+    assert sum(1 for r in renderer.objs if r.renderState()) == (n + 1) // 2
+    return result
+
+
 __all__ = [
     "apply_theme",
+    "ThemeState",
+    "theme_state_from_record",
+    "apply_theme_state",
+    "compose_theme_states",
+    "apply_composed_themes",
+    "theme_fingerprint",
+    "current_view_fingerprint",
+    "theme_matches_view",
     "_get_theme_brackets",
     "parse_theme_group",
     "group_themes",
     "get_layer_legend_state",
+    "LegendStateCache",
+    "cached_layer_legend_state",
+    "release_legend_state_cache",
     "log_layer_legend_state",
     "log_layer_legend_state_by_name",
     "get_visible_layer_snapshot",
@@ -2228,4 +2869,10 @@ __all__ = [
     "save_user_theme",
     "load_user_theme",
     "apply_user_theme",
+    "benchmark_legend_visibility",
 ]
+
+
+if __name__ == "__main__":
+    for name, ms in benchmark_legend_visibility().items():
+        print(f"{name:>12}: {ms:8.1f} ms")
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+マップテーマの一覧の登録簿
+
+ThemeRegistry はプロジェクトのマップテーマ名（正規化済み）、グループ分け
+（group_themes / parse_theme_group）とテーマごとの情報（グループ名・表示レイヤ・
+theme_fingerprint・集合演算用の ThemeState）を保持する。QgsMapThemeCollection の mapThemesChanged /
+mapThemeChanged / mapThemeRenamed で無効にし、次に読むときに作り直す。
+コンボボックスの更新や検索時のテーマ判定はここから読む。
+QGIS に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from .theme import group_themes, parse_theme_group, theme_fingerprint, theme_state_from_record
+
+_shared_registry = None
+_project_signal = None
+
+
+def normalize_theme_name(theme) -> Optional[str]:
+    """mapThemes() の要素（文字列またはテーマオブジェクト）をテーマ名にする"""
+    if theme is None:
+        return None
+    if isinstance(theme, str):
+        return theme
+    for attr in ('name', 'displayName', 'title'):
+        value = getattr(theme, attr, None)
+        if value is None:
+            continue
+        try:
+            return value() if callable(value) else value
+        except Exception:
+            continue
+    return str(theme)
+
+
+def theme_names_of(theme_collection) -> List[str]:
+    """テーマコレクションのテーマ名一覧（登録簿を使わずに読む）"""
+    try:
+        raw = theme_collection.mapThemes() if theme_collection is not None else []
+    except Exception:
+        raw = []
+    names = []
+    for t in (raw or []):
+        try:
+            name = normalize_theme_name(t)
+        except Exception:
+            continue
+        if name is not None:
+            names.append(name)
+    return names
+
+
+class ThemeRegistry(object):
+    """マップテーマ名・グループ・テーマごとの情報のキャッシュ。
+
+    rebuilds は名前一覧を作り直した回数（テスト・ログ用）。
+    """
+
+    def __init__(self, theme_collection):
+        self.collection = theme_collection
+        self.rebuilds = 0
+        self._names: Optional[List[str]] = None
+        self._name_set = frozenset()
+        self._groups: Dict[Optional[str], List[str]] = {}
+        self._info: Dict[str, Dict] = {}
+        self._connections = []
+        for name, slot in (('mapThemesChanged', self.invalidate),
+                           ('mapThemeChanged', self.invalidate_theme),
+                           ('mapThemeRenamed', self._on_renamed)):
+            signal = getattr(theme_collection, name, None)
+            if signal is None:
+                continue
+            try:
+                signal.connect(slot)
+                self._connections.append((signal, slot))
+            except Exception:
+                pass
+
+    def disconnect(self) -> None:
+        for signal, slot in self._connections:
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._connections = []
+
+    def invalidate(self, *args) -> None:
+        """全て作り直す（テーマの追加・削除）"""
+        self._names = None
+        self._info = {}
+
+    def invalidate_theme(self, name=None) -> None:
+        """1つのテーマの情報だけ捨てる（テーマの内容の変更）"""
+        if name is None:
+            self.invalidate()
+            return
+        self._info.pop(name, None)
+        if self._names is not None and name not in self._name_set:
+            # 追加されたテーマ
+            self._names = None
+
+    def _on_renamed(self, old_name, new_name):
+        self.invalidate()
+
+    def _ensure(self) -> None:
+        if self._names is not None:
+            return
+        self._names = theme_names_of(self.collection)
+        self._name_set = frozenset(self._names)
+        self._groups = group_themes(self._names)
+        self.rebuilds += 1
+
+    def names(self) -> List[str]:
+        """テーマ名一覧（mapThemes() の順）"""
+        self._ensure()
+        return list(self._names)
+
+    def has(self, name) -> bool:
+        if not name:
+            return False
+        self._ensure()
+        return name in self._name_set
+
+    def groups(self) -> Dict[Optional[str], List[str]]:
+        """group_themes() と同じ形式 {グループ名 or None: [テーマ名, ...]}"""
+        self._ensure()
+        return {k: list(v) for k, v in self._groups.items()}
+
+    def info(self, name) -> Optional[Dict]:
+        """テーマの情報 {'name', 'group', 'layers'（表示レイヤID）, 'fingerprint', 'state'（ThemeState）}。なければ None"""
+        if not self.has(name):
+            return None
+        info = self._info.get(name)
+        if info is not None:
+            return info
+        layers = []
+        fingerprint = None
+        state = None
+        try:
+            record = self.collection.mapThemeState(name)
+            fingerprint = theme_fingerprint(record)
+            if fingerprint is not None:
+                layers = [lid for lid, visible, _, _ in fingerprint[0] if visible]
+            state = theme_state_from_record(record)
+        except Exception:
+            pass
+        info = {
+            'name': name,
+            'group': parse_theme_group(name),
+            'layers': layers,
+            'fingerprint': fingerprint,
+            'state': state,
+        }
+        self._info[name] = info
+        return info
+
+    def fingerprint(self, name):
+        info = self.info(name)
+        return info.get('fingerprint') if info else None
+
+    def state(self, name):
+        """テーマの ThemeState（集合演算による合成用。変更しないこと）"""
+        info = self.info(name)
+        return info.get('state') if info else None
+
+
+def shared_theme_registry(theme_collection=None) -> ThemeRegistry:
+    """プロジェクトのマップテーマの登録簿（プラグイン全体で1つ）を返す"""
+    global _shared_registry, _project_signal
+    project = None
+    try:
+        from qgis.core import QgsProject
+
+        project = QgsProject.instance()
+    except Exception:
+        project = None
+    if theme_collection is None:
+        theme_collection = project.mapThemeCollection()
+    if _shared_registry is None or _shared_registry.collection is not theme_collection:
+        release_shared_theme_registry()
+        _shared_registry = ThemeRegistry(theme_collection)
+        if project is not None:
+            # プロジェクトの読み直しでテーマコレクション自体が作り直される
+            # （コレクションを渡された場合も接続する）
+            try:
+                project.mapThemeCollectionChanged.connect(release_shared_theme_registry)
+                _project_signal = project.mapThemeCollectionChanged
+            except Exception:
+                _project_signal = None
+    return _shared_registry
+
+
+def release_shared_theme_registry(*args) -> None:
+    """共有の登録簿を破棄する（テーマコレクションの入れ替え時・プラグインのアンロード時）"""
+    global _shared_registry, _project_signal
+    if _project_signal is not None:
+        try:
+            _project_signal.disconnect(release_shared_theme_registry)
+        except Exception:
+            pass
+        _project_signal = None
+    if _shared_registry is not None:
+        _shared_registry.disconnect()
+        _shared_registry = None
+
+
+__all__ = [
+    "ThemeRegistry",
+    "normalize_theme_name",
+    "theme_names_of",
+    "shared_theme_registry",
+    "release_shared_theme_registry",
+]
@@ -0,0 +1,703 @@
+# -*- coding: utf-8 -*-
+"""
+マップテーマの事前描画キャッシュ
+
+ツールバーでテーマを切り替えると、キャンバス全体をデータソースから描画し直すため
+航空写真・地番図などの重いテーマでは切り替え後しばらく古い表示のままになる。
+ThemeRenderCache は最近使ったテーマを現在の表示範囲でバックグラウンド描画
+（QgsMapRendererParallelJob）しておき、切り替え時はその画像をすぐにキャンバスへ重ねる。
+本来の描画が終わったら（mapCanvasRefreshed）画像を外す。
+
+事前描画はキャンバスの描画が終わってから1テーマずつ行い、キャンバスが描画を
+始めたら中止する。中止はブロックしない cancelWithoutBlocking で行い、ジョブは
+finished が来るまで保持してから deleteLater で破棄する（描画中のジョブを破棄すると
+GUI スレッドで中止を待つため）。次の事前描画はその後で始める。画像は表示範囲・画面サイズ・回転・テーマの内容ごとに保持し、
+件数を超えたら古いものから捨てる。
+既定では無効。QSettings の GEO-search-plugin/themePrerender を true にすると有効になる
+（GEO-search-plugin/themePrerenderCount で保持するテーマ数、既定 3）。
+
+ThemeThumbnailer はテーマごとの小さな縮図を QgsMapRendererTask（タスクマネージャの
+ワーカースレッド）で PNG に描画し、ディスクにキャッシュする。ファイル名はテーマの内容の
+ハッシュと表示範囲のバケットで決まるため、テーマを変更すると別のファイルになり、
+古いファイルは新しい縮図ができたときに削除する。mapThemeChanged でそのテーマだけ
+描画し直す。キャッシュのファイル数と合計サイズには上限があり、使っていないものから
+削除する（LRU、使うたびに更新日時を更新する）。描画もキャッシュの走査・削除も
+ワーカースレッドのタスクで行い、GUI スレッドではファイルを操作しない。
+QSettings の GEO-search-plugin/themeThumbnails を true にすると有効になる（既定は無効）。
+qgis.core に依存する処理は関数内で import する。
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from qgis.PyQt.QtCore import QTimer
+
+from .navigation import _PanOverlay
+
+SETTINGS_ENABLED = "GEO-search-plugin/themePrerender"
+SETTINGS_COUNT = "GEO-search-plugin/themePrerenderCount"
+SETTINGS_THUMBNAILS = "GEO-search-plugin/themeThumbnails"
+DEFAULT_COUNT = 3
+THUMBNAIL_SIZE = 96
+# 縮図のディスクキャッシュの上限
+THUMBNAIL_MAX_FILES = 500
+THUMBNAIL_MAX_BYTES = 20 * 1024 * 1024
+# 検索結果の先読みなどより後に実行する
+THUMBNAIL_TASK_PRIORITY = -1
+
+
+def _settings_value(key, default):
+    try:
+        from qgis.PyQt.QtCore import QSettings
+
+        return QSettings().value(key, default)
+    except Exception:
+        return default
+
+
+def _settings_flag(key) -> bool:
+    value = _settings_value(key, False)
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def prerender_enabled() -> bool:
+    """テーマの事前描画が有効か（QSettings、既定は無効）"""
+    return _settings_flag(SETTINGS_ENABLED)
+
+
+def thumbnails_enabled() -> bool:
+    """テーマの縮図の生成が有効か（QSettings、既定は無効）"""
+    return _settings_flag(SETTINGS_THUMBNAILS)
+
+
+def prerender_count() -> int:
+    try:
+        return max(1, int(_settings_value(SETTINGS_COUNT, DEFAULT_COUNT)))
+    except (TypeError, ValueError):
+        return DEFAULT_COUNT
+
+
+def theme_map_settings(map_settings, theme_collection, theme_name):
+    """map_settings（キャンバスの設定）をテーマのレイヤとスタイルで描画する設定にする"""
+    from qgis.core import QgsMapSettings
+
+    settings = QgsMapSettings(map_settings)
+    settings.setLayers(theme_collection.mapThemeVisibleLayers(theme_name))
+    settings.setLayerStyleOverrides(theme_collection.mapThemeStyleOverrides(theme_name))
+    return settings
+
+
+def view_key(map_settings) -> tuple:
+    """描画結果を使い回せる表示の識別子（範囲・画面サイズ・回転・CRS）"""
+    extent = map_settings.visibleExtent()
+    size = map_settings.outputSize()
+    try:
+        crs = map_settings.destinationCrs().authid()
+    except Exception:
+        crs = None
+    return (
+        round(extent.xMinimum(), 6), round(extent.yMinimum(), 6),
+        round(extent.xMaximum(), 6), round(extent.yMaximum(), 6),
+        size.width(), size.height(),
+        round(map_settings.rotation(), 6),
+        crs,
+    )
+
+
+class ThemeRenderCache(object):
+    """最近使ったテーマの描画結果を保持し、テーマ切り替え時にすぐ表示する。
+
+    hits / misses は切り替え時にキャッシュの画像を使えたかどうか、
+    renders はバックグラウンドで描画した回数（テスト・ログ用）。
+    """
+
+    SAFETY_MS = 5000
+
+    def __init__(self, canvas, theme_collection=None, max_themes: Optional[int] = None):
+        self.canvas = canvas
+        self.theme_collection = theme_collection
+        self.max_themes = max_themes if max_themes is not None else prerender_count()
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self._images = OrderedDict()
+        self._recent: List[str] = []
+        self._queue: List[str] = []
+        self._job = None
+        self._job_key = None
+        self._job_cancelled = False
+        # deleteLater 済みで破棄を待つジョブ（Python 側の参照で先に破棄しないため保持する）
+        self._retired: Dict[int, object] = {}
+        self._overlay = None
+        self._connected = False
+
+    def _collection(self):
+        if self.theme_collection is not None:
+            return self.theme_collection
+        from qgis.core import QgsProject
+
+        return QgsProject.instance().mapThemeCollection()
+
+    def start(self) -> None:
+        """キャンバスのシグナルに接続する（描画が終わったら事前描画、始まったら中止）"""
+        if self._connected:
+            return
+        self.canvas.mapCanvasRefreshed.connect(self.schedule)
+        self.canvas.renderStarting.connect(self._cancel_job)
+        self._connected = True
+
+    def stop(self) -> None:
+        if self._connected:
+            for signal, slot in ((self.canvas.mapCanvasRefreshed, self.schedule),
+                                 (self.canvas.renderStarting, self._cancel_job)):
+                try:
+                    signal.disconnect(slot)
+                except Exception:
+                    pass
+            self._connected = False
+        self._queue = []
+        # アンロード時はジョブの終了を待ってから破棄する
+        job, self._job = self._job, None
+        self._job_key = None
+        if job is not None:
+            try:
+                job.finished.disconnect(self._on_job_finished)
+            except Exception:
+                pass
+            try:
+                job.cancel()
+            except Exception:
+                pass
+            self._retire(job)
+        self.hide()
+        self._images.clear()
+
+    def _key(self, theme_name, map_settings=None):
+        from .themeregistry import shared_theme_registry
+
+        if map_settings is None:
+            map_settings = self.canvas.mapSettings()
+        fingerprint = shared_theme_registry(self._collection()).fingerprint(theme_name)
+        if fingerprint is None:
+            return None
+        return (theme_name, fingerprint, view_key(map_settings))
+
+    def note_used(self, theme_name) -> None:
+        """テーマを使ったことを記録する（事前描画の対象は最近使ったものから max_themes 件）"""
+        if not theme_name:
+            return
+        if theme_name in self._recent:
+            self._recent.remove(theme_name)
+        self._recent.insert(0, theme_name)
+        del self._recent[self.max_themes:]
+
+    def schedule(self, *args) -> None:
+        """最近使ったテーマのうち現在の表示範囲の画像がないものを順に描画する"""
+        self._queue = [name for name in self._recent if not self.is_cached(name)]
+        if self._job is None:
+            self._start_next()
+
+    def is_cached(self, theme_name) -> bool:
+        try:
+            key = self._key(theme_name)
+        except Exception:
+            return False
+        return key is not None and key in self._images
+
+    def _start_next(self) -> None:
+        from qgis.core import QgsMapRendererParallelJob
+
+        while self._queue:
+            name = self._queue.pop(0)
+            try:
+                collection = self._collection()
+                if not collection.hasMapTheme(name):
+                    continue
+                settings = theme_map_settings(self.canvas.mapSettings(), collection, name)
+                key = self._key(name, settings)
+            except Exception:
+                continue
+            if key is None or key in self._images:
+                continue
+            job = QgsMapRendererParallelJob(settings)
+            job.finished.connect(self._on_job_finished)
+            self._job = job
+            self._job_key = key
+            self._job_cancelled = False
+            job.start()
+            return
+
+    def _on_job_finished(self) -> None:
+        job, key, cancelled = self._job, self._job_key, self._job_cancelled
+        self._job = None
+        self._job_key = None
+        self._job_cancelled = False
+        if job is None:
+            return
+        image = None
+        if not cancelled:
+            try:
+                image = job.renderedImage()
+            except Exception:
+                image = None
+        # 終了したジョブはイベントループに戻ってから破棄する（finished の処理中のため）
+        self._retire(job)
+        if image is not None and not image.isNull():
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_themes:
+                self._images.popitem(last=False)
+            self.renders += 1
+        self._start_next()
+
+    def _retire(self, job) -> None:
+        key = id(job)
+        self._retired[key] = job
+        try:
+            job.destroyed.connect(functools.partial(self._forget_job, key))
+        except Exception:
+            pass
+        job.deleteLater()
+
+    def _forget_job(self, key, *args) -> None:
+        self._retired.pop(key, None)
+
+    def _cancel_job(self, *args) -> None:
+        """キャンバスが描画を始めたら事前描画は中止する（描画が終わったら schedule で再開）。
+
+        ジョブは finished（_on_job_finished）まで保持し、そこで破棄する。
+        """
+        self._queue = []
+        job = self._job
+        if job is None or self._job_cancelled:
+            return
+        self._job_cancelled = True
+        try:
+            job.cancelWithoutBlocking()
+        except Exception:
+            pass
+
+    def show_cached(self, theme_name) -> bool:
+        """現在の表示範囲のテーマの画像があればキャンバスに重ねる。重ねたら True
+
+        画像は次の mapCanvasRefreshed（本来の描画の完了）で外す。
+        """
+        try:
+            key = self._key(theme_name)
+        except Exception:
+            key = None
+        image = self._images.get(key) if key is not None else None
+        if image is None:
+            self.misses += 1
+            return False
+        from qgis.PyQt.QtGui import QPixmap
+
+        self.hide()
+        pixmap = QPixmap.fromImage(image)
+        try:
+            pixmap.setDevicePixelRatio(self.canvas.mapSettings().devicePixelRatio())
+        except Exception:
+            pass
+        viewport = self.canvas.viewport()
+        self._overlay = _PanOverlay(viewport, pixmap, self.canvas.canvasColor())
+        self._overlay.show()
+        # テーマの適用は同期処理なので先に描いておく
+        self._overlay.repaint()
+        self._images.move_to_end(key)
+        try:
+            self.canvas.mapCanvasRefreshed.connect(self.hide)
+        except Exception:
+            pass
+        QTimer.singleShot(self.SAFETY_MS, self.hide)
+        self.hits += 1
+        return True
+
+    def hide(self, *args) -> None:
+        """重ねた画像を外す"""
+        try:
+            self.canvas.mapCanvasRefreshed.disconnect(self.hide)
+        except Exception:
+            pass
+        if self._overlay is not None:
+            self._overlay.hide()
+            self._overlay.deleteLater()
+            self._overlay = None
+
+    def clear(self) -> None:
+        """保持している画像を全て捨てる"""
+        self._images.clear()
+
+
+def extent_bucket(xmin: float, ymin: float, xmax: float, ymax: float) -> Tuple[int, int, int]:
+    """表示範囲をバケット (大きさの段階, 格子 x, 格子 y) にまとめる。
+
+    大きさは 2 のべき乗に切り上げ、中心はその 1/4 の格子に丸めるので、
+    少しのパン・ズームでは同じバケット（同じ縮図）になる。
+    """
+    size = max(xmax - xmin, ymax - ymin, 1e-9)
+    level = int(math.ceil(math.log2(size)))
+    cell = 2.0 ** level / 4.0
+    cx = (xmin + xmax) / 2.0
+    cy = (ymin + ymax) / 2.0
+    return (level, int(math.floor(cx / cell)), int(math.floor(cy / cell)))
+
+
+def bucket_extent(bucket: Tuple[int, int, int]) -> Tuple[float, float, float, float]:
+    """バケットが表す正方形の範囲 (xmin, ymin, xmax, ymax)"""
+    level, ix, iy = bucket
+    size = 2.0 ** level
+    cell = size / 4.0
+    cx = (ix + 0.5) * cell
+    cy = (iy + 0.5) * cell
+    return (cx - size / 2.0, cy - size / 2.0, cx + size / 2.0, cy + size / 2.0)
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()[:16]
+
+
+def default_thumbnail_dir() -> str:
+    from qgis.core import QgsApplication
+
+    return os.path.join(QgsApplication.qgisSettingsDirPath(), 'cache', 'geo_search_theme_thumbnails')
+
+
+def maintain_thumbnail_cache(task, directory, max_files, max_bytes, touch=(), remove=(), keep=()) -> Optional[Dict]:
+    """縮図キャッシュのディレクトリを整理する。
+
+    QgsTask.fromFunction から呼ばれ、ワーカースレッドで実行される。ディレクトリを作り、
+    使った縮図（touch）の更新日時を新しくし、中止した描画の書きかけ（remove）と、
+    新しく描画した縮図（keep）と同じテーマで内容が古い縮図を削除する。ファイル数・合計サイズが
+    上限を超えたら使っていないものから削除する（keep は削除しない）。
+    残ったファイル名の一覧（files）と上限で削除した数（evicted）を返す。キャンセルされた場合は None。
+    """
+    os.makedirs(directory, exist_ok=True)
+    for path in touch:
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+    for path in remove:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+    keep = set(keep)
+    # テーマ名のハッシュ -> 新しい内容のハッシュ
+    fresh: Dict[str, set] = {}
+    for path in keep:
+        parts = os.path.basename(path).split('_')
+        if len(parts) >= 2:
+            fresh.setdefault(parts[0], set()).add(parts[1])
+    entries = []
+    for name in os.listdir(directory):
+        if task is not None and task.isCanceled():
+            return None
+        if not name.endswith('.png'):
+            continue
+        full = os.path.join(directory, name)
+        parts = name.split('_')
+        if full not in keep and len(parts) >= 2 and parts[1] not in fresh.get(parts[0], (parts[1],)):
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+            continue
+        try:
+            st = os.stat(full)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+    entries.sort()
+    count = len(entries)
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    files = []
+    for _, size, name in entries:
+        if (count > max_files or total > max_bytes) and os.path.join(directory, name) not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+                count -= 1
+                total -= size
+                evicted += 1
+                continue
+            except OSError:
+                pass
+        files.append(name)
+    return {'files': files, 'evicted': evicted}
+
+
+class ThemeThumbnailer(object):
+    """テーマの縮図をバックグラウンドで描画し、ディスクにキャッシュする。
+
+    on_ready(theme_name, path) は縮図ができたとき（キャッシュにあったときも）GUI スレッドで呼ばれる。
+    start() でキャッシュのディレクトリを走査するタスクを登録し、走査が終わるまでの要求は待たせる。
+    キャッシュの有無は走査で得たファイル名の一覧で判定し、ファイル操作はすべて
+    maintain_thumbnail_cache のタスクで行う。
+    rendered は描画したタスクの数、cached はディスクのキャッシュを使った数、
+    evicted は上限を超えて削除したファイルの数（テスト・ログ用）。
+    """
+
+    def __init__(self, canvas, on_ready: Optional[Callable] = None, cache_dir: Optional[str] = None,
+                 size: int = THUMBNAIL_SIZE, theme_collection=None,
+                 max_files: int = THUMBNAIL_MAX_FILES, max_bytes: int = THUMBNAIL_MAX_BYTES):
+        self.canvas = canvas
+        self.on_ready = on_ready
+        self.cache_dir = cache_dir
+        self.size = int(size)
+        self.theme_collection = theme_collection
+        self.max_files = max(1, int(max_files))
+        self.max_bytes = max(1, int(max_bytes))
+        self.rendered = 0
+        self.cached = 0
+        self.evicted = 0
+        # テーマ名 -> (タスク, 書き出し先)
+        self._tasks: Dict[str, Tuple[object, str]] = {}
+        self._watched = None
+        # キャッシュにあるファイル名（走査が終わるまで None）と、それまでに要求されたテーマ
+        self._files: Optional[set] = None
+        self._waiting: List[str] = []
+        # 次の整理タスクに渡すパス
+        self._touched: set = set()
+        self._to_remove: set = set()
+        self._keep: set = set()
+        self._maintenance = None
+        self._again = False
+
+    def _collection(self):
+        if self.theme_collection is not None:
+            return self.theme_collection
+        from qgis.core import QgsProject
+
+        return QgsProject.instance().mapThemeCollection()
+
+    def start(self) -> None:
+        """キャッシュの走査を始め、テーマの内容の変更（mapThemeChanged）でそのテーマの縮図を描画し直すようにする"""
+        try:
+            self._dir()
+        except Exception:
+            return
+        if self._files is None and self._maintenance is None:
+            self._schedule_maintenance()
+        if self._watched is not None:
+            return
+        try:
+            collection = self._collection()
+            collection.mapThemeChanged.connect(self._on_theme_changed)
+            self._watched = collection
+        except Exception:
+            self._watched = None
+
+    def stop(self) -> None:
+        """シグナルを切り、描画タスクを中止する"""
+        if self._watched is not None:
+            try:
+                self._watched.mapThemeChanged.disconnect(self._on_theme_changed)
+            except Exception:
+                pass
+            self._watched = None
+        self._waiting = []
+        self.cancel()
+
+    def _on_theme_changed(self, theme_name) -> None:
+        from .themeregistry import shared_theme_registry
+
+        if not theme_name:
+            return
+        try:
+            # 登録簿のシグナルより先に呼ばれても新しい内容で縮図のパスを決める
+            shared_theme_registry(self._collection()).invalidate_theme(theme_name)
+            path = self.path_for(theme_name)
+        except Exception:
+            return
+        pending = self._tasks.get(theme_name)
+        if pending is not None and pending[1] != path:
+            # 古い内容で描画中のタスクは捨てる
+            del self._tasks[theme_name]
+            try:
+                pending[0].cancel()
+            except Exception:
+                pass
+        self.request([theme_name])
+
+    def _dir(self) -> str:
+        # ディレクトリは整理タスクが作る
+        if self.cache_dir is None:
+            self.cache_dir = default_thumbnail_dir()
+        return self.cache_dir
+
+    def path_for(self, theme_name, bucket=None) -> Optional[str]:
+        """テーマの縮図のファイルパス（テーマ名・内容のハッシュ・範囲のバケット）。テーマがなければ None"""
+        from .themeregistry import shared_theme_registry
+
+        fingerprint = shared_theme_registry(self._collection()).fingerprint(theme_name)
+        if fingerprint is None:
+            return None
+        if bucket is None:
+            e = self.canvas.extent()
+            bucket = extent_bucket(e.xMinimum(), e.yMinimum(), e.xMaximum(), e.yMaximum())
+        try:
+            crs = self.canvas.mapSettings().destinationCrs().authid()
+        except Exception:
+            crs = ''
+        level, ix, iy = bucket
+        name = "%s_%s_%d_%d_%d.png" % (_digest(theme_name), _digest((fingerprint, crs, self.size)), level, ix, iy)
+        return os.path.join(self._dir(), name)
+
+    def _has_file(self, path) -> bool:
+        return self._files is not None and os.path.basename(path) in self._files
+
+    def thumbnail(self, theme_name) -> Optional[str]:
+        """現在の範囲の縮図がディスクにあればそのパス"""
+        try:
+            path = self.path_for(theme_name)
+        except Exception:
+            return None
+        return path if path and self._has_file(path) else None
+
+    def request(self, theme_names) -> None:
+        """縮図のないテーマについて描画タスクを登録する（キャッシュにあれば on_ready をすぐ呼ぶ）"""
+        if self._files is None:
+            # キャッシュの走査が終わってから判定する
+            for name in theme_names:
+                if name and name not in self._waiting:
+                    self._waiting.append(name)
+            if self._maintenance is None:
+                self._schedule_maintenance()
+            return
+        for name in theme_names:
+            if not name or name in self._tasks:
+                continue
+            try:
+                path = self.path_for(name)
+            except Exception:
+                continue
+            if path is None:
+                continue
+            if self._has_file(path):
+                self.cached += 1
+                # 使った縮図の更新日時を新しくする（LRU の順序）
+                self._touched.add(path)
+                self._schedule_maintenance()
+                self._notify(name, path)
+                continue
+            self._start_task(name, path)
+
+    def _start_task(self, theme_name, path) -> None:
+        from qgis.core import QgsApplication, QgsMapRendererTask, QgsRectangle
+        from qgis.PyQt.QtCore import QSize
+
+        collection = self._collection()
+        if not collection.hasMapTheme(theme_name):
+            return
+        settings = theme_map_settings(self.canvas.mapSettings(), collection, theme_name)
+        e = self.canvas.extent()
+        box = bucket_extent(extent_bucket(e.xMinimum(), e.yMinimum(), e.xMaximum(), e.yMaximum()))
+        settings.setRotation(0)
+        settings.setOutputSize(QSize(self.size, self.size))
+        settings.setExtent(QgsRectangle(*box))
+        # 描画は QgsMapRendererTask がワーカースレッドで行い、PNG を直接書き出す
+        task = QgsMapRendererTask(settings, path, 'PNG')
+        task.taskCompleted.connect(lambda: self._on_completed(theme_name, path))
+        task.taskTerminated.connect(lambda: self._on_terminated(theme_name, path))
+        self._tasks[theme_name] = (task, path)
+        QgsApplication.taskManager().addTask(task, THUMBNAIL_TASK_PRIORITY)
+
+    def _forget_task(self, theme_name, path) -> None:
+        # 同じテーマの新しいタスクは残す
+        pending = self._tasks.get(theme_name)
+        if pending is not None and pending[1] == path:
+            del self._tasks[theme_name]
+
+    def _on_completed(self, theme_name, path) -> None:
+        self._forget_task(theme_name, path)
+        self.rendered += 1
+        if self._files is not None:
+            self._files.add(os.path.basename(path))
+        # 同じテーマの古い縮図の削除と上限の確認は整理タスクで行う
+        self._keep.add(path)
+        self._schedule_maintenance()
+        self._notify(theme_name, path)
+
+    def _on_terminated(self, theme_name, path) -> None:
+        self._forget_task(theme_name, path)
+        if self._files is not None:
+            self._files.discard(os.path.basename(path))
+        self._to_remove.add(path)
+        self._schedule_maintenance()
+
+    def _schedule_maintenance(self) -> None:
+        """キャッシュの整理タスクを登録する（実行中なら終わってからもう一度）"""
+        from qgis.core import QgsApplication, QgsTask
+
+        if self._maintenance is not None:
+            self._again = True
+            return
+        try:
+            directory = self._dir()
+        except Exception:
+            return
+        touch, self._touched = list(self._touched), set()
+        remove, self._to_remove = list(self._to_remove), set()
+        keep, self._keep = list(self._keep), set()
+        self._again = False
+        task = QgsTask.fromFunction("テーマの縮図キャッシュの整理", maintain_thumbnail_cache, directory,
+                                    self.max_files, self.max_bytes, touch, remove, keep,
+                                    on_finished=self._on_maintained)
+        self._maintenance = task
+        QgsApplication.taskManager().addTask(task, THUMBNAIL_TASK_PRIORITY)
+
+    def _on_maintained(self, exception, result=None) -> None:
+        self._maintenance = None
+        if result:
+            files = set(result.get('files') or ())
+            self.evicted += result.get('evicted', 0)
+        else:
+            files = set(self._files or ())
+        # 走査中に描画・中止されたものを反映する
+        files.update(os.path.basename(path) for path in self._keep)
+        files.difference_update(os.path.basename(path) for path in self._to_remove)
+        self._files = files
+        waiting, self._waiting = self._waiting, []
+        if waiting:
+            self.request(waiting)
+        if self._again:
+            self._schedule_maintenance()
+
+    def _notify(self, theme_name, path) -> None:
+        if self.on_ready is None:
+            return
+        try:
+            self.on_ready(theme_name, path)
+        except Exception:
+            pass
+
+    def cancel(self) -> None:
+        """実行中・待機中の描画タスクを中止する"""
+        tasks, self._tasks = self._tasks, {}
+        for task, _ in tasks.values():
+            try:
+                task.cancel()
+            except Exception:
+                pass
+
+
+__all__ = [
+    "ThemeRenderCache",
+    "ThemeThumbnailer",
+    "prerender_enabled",
+    "thumbnails_enabled",
+    "extent_bucket",
+    "bucket_extent",
+    "prerender_count",
+    "theme_map_settings",
+    "view_key",
+]
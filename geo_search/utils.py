@@ -5,7 +5,7 @@ import shutil
 import tempfile
 import datetime
 
-from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtCore import QTimer, QVariant
 
 from qgis.core import QgsProject, QgsFeatureRequest
 from qgis.utils import iface
@@ -53,6 +53,50 @@ def get_feature_by_id(layer, feature_id):
 # `parse_theme_group` と `group_themes` は `geo_search.theme` に移しました。
 
 
+class IdleCoalescer(object):
+    """続けて届いた要求をまとめ、イベントループが空いたときに callback() を1回だけ呼ぶ。
+
+    テーマの一括読み込みなどでシグナルが連続しても、処理（コンボボックスの
+    作り直しなど）は1回になる。requested は要求回数、executed は実行回数、
+    coalesced はまとめて捨てた要求の回数（テスト・ログ用）。
+    """
+
+    def __init__(self, callback, delay_ms=0):
+        self.callback = callback
+        self.requested = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._pending = False
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(int(delay_ms), 0))
+        self._timer.timeout.connect(self.flush)
+
+    def request(self, *args):
+        self.requested += 1
+        if self._pending:
+            self.coalesced += 1
+            return
+        self._pending = True
+        self._timer.start()
+
+    def flush(self):
+        """待っている要求があればすぐに実行する"""
+        self._timer.stop()
+        if not self._pending:
+            return
+        self._pending = False
+        self.executed += 1
+        self.callback()
+
+    def cancel(self):
+        self._timer.stop()
+        self._pending = False
+
+    def is_pending(self):
+        return self._pending
+
+
 def set_project_variable(project, key, value, group='GEO-search-plugin'):
     """Robustly set a project-scoped variable across QGIS versions.
 